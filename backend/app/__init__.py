@@ -0,0 +1,4 @@
+import time
+
+# Start of the app's import, for the startup-time budget (see app/main.py lifespan)
+IMPORT_STARTED = time.perf_counter()
@@ -0,0 +1,52 @@
+"""
+Backups from the command line (see docs/backend/operations/backup.md):
+
+    cd backend
+    BACKUP_ROOT=/mnt/backup python -m app.backup create
+    BACKUP_ROOT=/mnt/backup python -m app.backup list
+    BACKUP_ROOT=/mnt/backup python -m app.backup restore 20261019T020000Z [--force]
+    BACKUP_ROOT=/mnt/backup python -m app.backup prune [--keep 7]
+
+`restore` writes the database named by DATABASE_URL and the blobs into STORAGE_ROOT: stop the server first.
+"""
+import argparse
+import asyncio
+import json
+import sys
+
+async def _progress(done: int, total: int, message: str) -> None:
+    if done == total or done % 1000 == 0:
+        print(message, flush=True)
+
+async def _run(args) -> int:
+    from app.utils.backup import BackupError, create_backup, list_backups, prune_backups, restore_backup
+
+    try:
+        if args.command == "create":
+            result = await create_backup(progress=_progress)
+        elif args.command == "list":
+            result = list_backups()
+        elif args.command == "prune":
+            result = await prune_backups(args.keep)
+        else:
+            result = await restore_backup(args.snapshot, force=args.force, progress=_progress)
+    except BackupError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    print(json.dumps(result, indent=2))
+    return 1 if isinstance(result, dict) and (result.get("failed") or result.get("missing") or result.get("corrupt")) else 0
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="Back up / restore the database and the blobs")
+    sub = p.add_subparsers(dest="command", required=True)
+    sub.add_parser("create", help="snapshot the database and copy new blobs")
+    sub.add_parser("list", help="complete snapshots, newest first")
+    prune = sub.add_parser("prune", help="drop old snapshots and unreferenced blob copies")
+    prune.add_argument("--keep", type=int, default=None, help="default: BACKUP_KEEP")
+    restore = sub.add_parser("restore", help="restore a snapshot (server stopped)")
+    restore.add_argument("snapshot")
+    restore.add_argument("--force", action="store_true", help="overwrite the existing database")
+    sys.exit(asyncio.run(_run(p.parse_args(argv))))
+
+if __name__ == "__main__":
+    main()
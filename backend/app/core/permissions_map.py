@@ -1,4 +1,4 @@
-# Resources: user_account, own_user_account, file, own_file
+# Resources: user_account, own_user_account, file, own_file, shared_file (granted to the user, see app/utils/grants.py)
 # Actions: read, update, delete, create
 
 PERMISSIONS_MAP = {
@@ -17,5 +17,7 @@ PERMISSIONS_MAP = {
         "file": ["create"],
         # Can read/download/delete their own files
         "own_file": ["read", "update", "delete"],
+        # Files shared with them: up to the granted level (read, or write = update)
+        "shared_file": ["read", "update"],
     },
 }
\ No newline at end of file
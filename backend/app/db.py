@@ -1,29 +1,117 @@
+import os
+import re
+from sqlalchemy import event, text
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker
 from importlib import import_module
 from .models.base import Base
+from .utils.metrics import instrument_engine
+from .utils.config import DATABASE_URL, DB_SCHEMA_MODE, WEB_WORKERS, DB_MAX_CONNECTIONS, DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_BUSY_TIMEOUT_MS
+
+def _pool_options() -> dict:
+    # Every worker process has its own pool: split the DB_MAX_CONNECTIONS budget between them.
+    # One worker gets 5 + 10 overflow (SQLAlchemy's defaults); 8 workers of 60 get 2 + 5 each.
+    if ":memory:" in DATABASE_URL:
+        return {}
+    per_worker = min(15, max(3, DB_MAX_CONNECTIONS // max(WEB_WORKERS, 1)))
+    pool_size = DB_POOL_SIZE if DB_POOL_SIZE is not None else max(1, per_worker // 3)
+    max_overflow = DB_MAX_OVERFLOW if DB_MAX_OVERFLOW is not None else per_worker - pool_size
+    return {"pool_size": pool_size, "max_overflow": max_overflow}
+
+engine = create_async_engine(DATABASE_URL, echo=False, future=True, **_pool_options())
+instrument_engine(engine)
+
+if engine.dialect.name == "sqlite":
+    @event.listens_for(engine.sync_engine, "connect")
+    def _sqlite_pragmas(dbapi_connection, _):
+        # WAL: readers don't block the (single) writer, across processes too;
+        # busy_timeout: a worker waits for the write lock instead of failing with "database is locked"
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute(f"PRAGMA busy_timeout={DB_BUSY_TIMEOUT_MS}")
+        cursor.close()
 
-DATABASE_URL = "sqlite+aiosqlite:///./dev.db"  # dev!!!!; later replace with Postgres
-engine = create_async_engine(DATABASE_URL, echo=False, future=True)
 AsyncSessionLocal = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
 
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_REVISION_RE = re.compile(r"^revision\b[^=]*=\s*['\"]([^'\"]+)['\"]", re.M)
+_DOWN_REVISION_RE = re.compile(r"^down_revision\b[^=]*=\s*['\"]([^'\"]+)['\"]", re.M)
+
 async def get_session():
     async with AsyncSessionLocal() as session:
         yield session
 
+class SchemaVersionError(RuntimeError):
+    pass
+
 async def init_db():
-    _import_models()
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
+    """
+    Boot-time schema bootstrap. The schema is owned by Alembic (backend/migrations):
+    - DB_SCHEMA_MODE=check (default): one SELECT on alembic_version; refuses to start on a mismatch,
+      migrations are run out-of-band (`alembic upgrade head`) before the workers start,
+    - DB_SCHEMA_MODE=migrate: runs `upgrade head` in-process (single instance / development).
+    """
+    if DB_SCHEMA_MODE == "migrate":
+        async with engine.begin() as conn:
+            await conn.run_sync(_upgrade_to_head)
+        return
+
+    expected = schema_head()
+    async with engine.connect() as conn:
+        current = await conn.run_sync(_current_revision)
+    if current != expected:
+        raise SchemaVersionError(
+            f"Database schema is at revision {current or '(none)'}, the code expects {expected}. "
+            f"Run `alembic upgrade head` in backend/ (or start with DB_SCHEMA_MODE=migrate)."
+        )
+
+def schema_head() -> str:
+    # Reads `revision` / `down_revision` from the version files with a regex instead of loading
+    # Alembic's script machinery at boot; the head is the revision nothing points back to
+    versions = os.path.join(BACKEND_DIR, "migrations", "versions")
+    revisions, parents = set(), set()
+    for name in os.listdir(versions):
+        if not name.endswith(".py"):
+            continue
+        with open(os.path.join(versions, name)) as f:
+            source = f.read()
+        revisions.update(_REVISION_RE.findall(source))
+        parents.update(_DOWN_REVISION_RE.findall(source))
+    heads = revisions - parents
+    if len(heads) != 1:
+        raise SchemaVersionError(f"Expected one migration head, found {sorted(heads)} (run `alembic merge heads`)")
+    return heads.pop()
+
+def _current_revision(sync_conn):
+    if not sync_conn.dialect.has_table(sync_conn, "alembic_version"):
+        return None
+    return sync_conn.execute(text("SELECT version_num FROM alembic_version")).scalar()
+
+def _upgrade_to_head(sync_conn) -> None:
+    from alembic import command
+    from alembic.config import Config
+
+    cfg = Config(os.path.join(BACKEND_DIR, "alembic.ini"))
+    cfg.set_main_option("script_location", os.path.join(BACKEND_DIR, "migrations"))
+    cfg.attributes["connection"] = sync_conn
+    command.upgrade(cfg, "head")
 
 def _import_models():
+    # Every model module, so Base.metadata is complete for Alembic autogenerate
     for m in (
         ("app.models.user"),
-        ("app.models.file")
+        ("app.models.folder"),
+        ("app.models.file"),
+        ("app.models.file_version"),
+        ("app.models.log_book"),
+        ("app.models.blob"),
+        ("app.models.blob_check"),
+        ("app.models.retention_policy"),
+        ("app.models.share_link"),
+        ("app.models.job"),
+        ("app.models.upload_session"),
+        ("app.models.file_change"),
+        ("app.models.group"),
+        ("app.models.grant"),
     ):
         import_module(m)
-
-async def init_db():
-    _import_models()
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
@@ -0,0 +1,48 @@
+"""
+Server-side import of a directory tree, without going through the API:
+
+    cd backend
+    python -m app.import_tree /srv/old-share --user alice [--folder-id 12] [--link-mode hardlink]
+
+Same work as POST /api/admin/import (app/utils/importer.py), in this process; IMPORT_ALLOWED_ROOTS does not
+apply. Interrupted runs are resumed by running the same command again. Run `alembic upgrade head` first.
+"""
+import argparse
+import asyncio
+import os
+import sys
+
+async def _run(args) -> int:
+    from sqlalchemy import select
+
+    from app.db import AsyncSessionLocal
+    from app.models.user import User
+    from app.utils.importer import LINK_MODES, import_tree
+
+    async def _progress(done: int, total: int, message: str) -> None:
+        print(f"[{done * 100 // max(total, 1):3d}%] {message}", flush=True)
+
+    async with AsyncSessionLocal() as db:
+        user = (await db.execute(select(User).where(User.username == args.user))).scalars().first()
+        if user is None:
+            print(f"User not found: {args.user}", file=sys.stderr)
+            return 1
+        stats = await import_tree(db, user.id, os.path.realpath(args.source), args.folder_id, args.link_mode, progress=_progress)
+    for failure in stats.pop("failures"):
+        print(f"FAILED {failure['path']}: {failure['detail']}", file=sys.stderr)
+    print(stats)
+    return 1 if stats["failed"] else 0
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="Import a server-local directory tree into a user's storage")
+    p.add_argument("source", help="directory to import")
+    p.add_argument("--user", required=True, help="username of the owner")
+    p.add_argument("--folder-id", type=int, default=None, help="target folder of the owner (default: top level)")
+    p.add_argument("--link-mode", choices=("reflink", "hardlink", "copy"), default=None, help="default: IMPORT_LINK_MODE")
+    args = p.parse_args(argv)
+    if not os.path.isdir(args.source):
+        p.error(f"not a directory: {args.source}")
+    sys.exit(asyncio.run(_run(args)))
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,4 @@
+import time
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from .routes import (
@@ -7,20 +8,83 @@ from .routes import (
     files as files_router,
     log as logbook_router,
     share as share_router,
-    admin as admin_router
+    share_links as share_links_router,
+    admin as admin_router,
+    metrics as metrics_router,
+    jobs as jobs_router,
+    folders as folders_router,
+    previews as previews_router,
+    changes as changes_router,
+    grants as grants_router,
+    trash as trash_router
 )
+from . import IMPORT_STARTED
 from .db import init_db
+from .utils.background import start_periodic, stop_background_tasks
+from .utils.cluster import start_cluster_listener, stop_cluster_listener
+from .utils.retention import run_scheduled_prune
+from .utils.share_cache import run_scheduled_flush
+from .utils.bundle_cache import run_scheduled_bundle_sweep
+from .utils.scrubber import run_scheduled_scrub
+from .utils.changes import run_scheduled_journal_compaction
+from .utils.tiering import run_scheduled_access_flush, run_scheduled_tiering
+from .utils.file_ops import run_scheduled_trash_purge
+from .utils.backup import run_scheduled_backup
+from .utils.previews import shutdown_preview_pool
+from .utils.jobs import start_job_runner, stop_job_runner, expire_job_artifacts
+from .utils import job_handlers  # registers job types
+from .utils.metrics import MetricsMiddleware, make_event_loop_lag_probe, APP_STARTUP_SECONDS
+from .utils.config import RETENTION_PRUNE_INTERVAL_SECONDS, SHARE_COUNTER_FLUSH_SECONDS, EVENT_LOOP_LAG_PROBE_SECONDS
+from .utils.config import JOB_ARTIFACT_TTL_SECONDS, BUNDLE_CACHE_SWEEP_SECONDS, SCRUB_INTERVAL_SECONDS, STARTUP_BUDGET_SECONDS
+from .utils.config import CHANGE_JOURNAL_COMPACT_INTERVAL_SECONDS, BLOB_ACCESS_FLUSH_SECONDS, TIER_SWEEP_INTERVAL_SECONDS
+from .utils.config import TRASH_PURGE_INTERVAL_SECONDS, BACKUP_ROOT, BACKUP_INTERVAL_SECONDS
 from contextlib import asynccontextmanager
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    print("Creating database and tables...")
+    lifespan_started = time.perf_counter()
     await init_db()
-    
+    start_cluster_listener()
+    # Per worker: its own counters and event loop
+    start_periodic("share-download-counters", SHARE_COUNTER_FLUSH_SECONDS, run_scheduled_flush)
+    start_periodic("blob-access-counters", BLOB_ACCESS_FLUSH_SECONDS, run_scheduled_access_flush)
+    start_periodic("event-loop-lag", EVENT_LOOP_LAG_PROBE_SECONDS, make_event_loop_lag_probe(EVENT_LOOP_LAG_PROBE_SECONDS))
+    # Once per host (maintenance leader)
+    start_periodic("version-retention", RETENTION_PRUNE_INTERVAL_SECONDS, run_scheduled_prune, leader_only=True)
+    start_periodic("job-artifacts", max(JOB_ARTIFACT_TTL_SECONDS // 4, 60), expire_job_artifacts, leader_only=True)
+    start_periodic("zip-bundles", BUNDLE_CACHE_SWEEP_SECONDS, run_scheduled_bundle_sweep, leader_only=True)
+    start_periodic("integrity-scrub", SCRUB_INTERVAL_SECONDS, run_scheduled_scrub, leader_only=True)
+    start_periodic("change-journal", CHANGE_JOURNAL_COMPACT_INTERVAL_SECONDS, run_scheduled_journal_compaction, leader_only=True)
+    start_periodic("storage-tiering", TIER_SWEEP_INTERVAL_SECONDS, run_scheduled_tiering, leader_only=True)
+    start_periodic("trash-purge", TRASH_PURGE_INTERVAL_SECONDS, run_scheduled_trash_purge, leader_only=True)
+    if BACKUP_ROOT:
+        # Checks hourly so a restarted leader does not postpone the next backup by a full interval
+        start_periodic("backup", min(3600, BACKUP_INTERVAL_SECONDS), run_scheduled_backup, leader_only=True)
+    start_job_runner()
+    _record_startup(lifespan_started)
+
     yield
 
+    await stop_job_runner()
+    await stop_background_tasks()
+    shutdown_preview_pool()
+    stop_cluster_listener()
+    # Don't lose share downloads / blob reads counted since the last periodic flush
+    await run_scheduled_flush()
+    await run_scheduled_access_flush()
     print("Application shutdown.")
 
+def _record_startup(lifespan_started: float) -> None:
+    ready = time.perf_counter()
+    APP_STARTUP_SECONDS.set(lifespan_started - IMPORT_STARTED, phase="import")
+    APP_STARTUP_SECONDS.set(ready - lifespan_started, phase="lifespan")
+    total = ready - IMPORT_STARTED
+    if total > STARTUP_BUDGET_SECONDS:
+        print(f"WARNING: startup took {total * 1000:.0f} ms (budget {STARTUP_BUDGET_SECONDS * 1000:.0f} ms): "
+              f"import {(lifespan_started - IMPORT_STARTED) * 1000:.0f} ms, lifespan {(ready - lifespan_started) * 1000:.0f} ms")
+    else:
+        print(f"Startup: {total * 1000:.0f} ms")
+
 app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
@@ -30,15 +94,24 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(MetricsMiddleware)
 
 # Attach routers
 app.include_router(users_router.router)
 app.include_router(auth_router.router)
+app.include_router(grants_router.router)
 app.include_router(files_router.router)
 app.include_router(fileversion_router.router)
 app.include_router(logbook_router.router)
 app.include_router(share_router.router)
+app.include_router(share_links_router.router)
 app.include_router(admin_router.router)
+app.include_router(metrics_router.router)
+app.include_router(jobs_router.router)
+app.include_router(folders_router.router)
+app.include_router(previews_router.router)
+app.include_router(changes_router.router)
+app.include_router(trash_router.router)
 
 @app.get("/api")
 def root():
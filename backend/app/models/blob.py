@@ -0,0 +1,28 @@
+from datetime import datetime, timezone
+from sqlalchemy import Column, Integer, BigInteger, String, DateTime, Boolean, Index, LargeBinary
+from sqlalchemy.orm import deferred
+from .base import Base
+
+class Blob(Base):
+    # One row per physical file under LOCAL_ROOT (or its copy under COLD_ROOT when tier == "cold").
+    # Deduplicated versions share a blob; ref_count tracks how many FileVersion rows point at it.
+    __tablename__ = "blobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    checksum = Column(String(64), nullable=False, index=True)
+    # app/utils/hashing.py; tree algorithms keep their leaf digests for ranged checks (not loaded by default)
+    checksum_algo = Column(String(16), nullable=False, default="sha256", server_default="sha256")
+    chunk_digests = deferred(Column(LargeBinary, nullable=True))
+    filepath = Column(String(1024), nullable=False, unique=True)
+    size = Column(BigInteger, nullable=True)
+    ref_count = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc), nullable=False)
+    # Placement and access statistics (app/utils/tiering.py); counters are flushed from memory periodically
+    tier = Column(String(8), nullable=False, default="hot", server_default="hot")
+    compressed = Column(Boolean, nullable=False, default=False, server_default="0")
+    access_count = Column(BigInteger, nullable=False, default=0, server_default="0")
+    last_accessed_at = Column(DateTime, default=lambda: datetime.now(timezone.utc), nullable=True)
+
+    __table_args__ = (
+        Index("ix_blobs_tier_last_accessed", "tier", "last_accessed_at"),
+    )
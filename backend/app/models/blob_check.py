@@ -0,0 +1,12 @@
+from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey
+from .base import Base
+
+class BlobCheck(Base):
+    # Last integrity scrub result per blob (see app/utils/scrubber.py)
+    __tablename__ = "blob_checks"
+
+    blob_id = Column(Integer, ForeignKey("blobs.id", ondelete="CASCADE"), primary_key=True)
+    status = Column(String(20), nullable=False, index=True)  # "ok", "missing", "corrupt" (quarantined)
+    verified_at = Column(DateTime, nullable=False, index=True)
+    detail = Column(Text, nullable=True)
+    quarantine_path = Column(String(1024), nullable=True)  # relative to STORAGE_ROOT
@@ -9,6 +9,10 @@ from sqlalchemy.orm import declarative_base, Mapped, mapped_column, relationship
 from .base import Base
 from .user import User
 from .file_version import FileVersion
+from .share_link import ShareLink
+
+# deleted_at of files marked "delete permanently": picked up by the next purge regardless of the retention window
+TRASH_PURGE_NOW = datetime(1970, 1, 1)
 
 class File(Base):
     __tablename__ = "files"
@@ -19,14 +23,28 @@ class File(Base):
     uploaded_by: Mapped[Optional[int]] = mapped_column(ForeignKey("users.id"))
     uploaded_at: Mapped[DateTime] = mapped_column(DateTime(timezone=True), server_default=func.now())
     current_version: Mapped[Optional[int]] = mapped_column(Integer)
+    # NULL = top level; versioning identity is (uploaded_by, folder_id, filename)
+    folder_id: Mapped[Optional[int]] = mapped_column(ForeignKey("folders.id", ondelete="SET NULL"), nullable=True)
 
     share_link_id: Mapped[Optional[str]] = mapped_column(String(36), nullable=True, unique=True, index=True)
+    # Set = in the trash (hidden everywhere, restorable); the purger removes it for good after TRASH_RETENTION_DAYS
+    deleted_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
 
     uploader: Mapped[Optional[User]] = relationship()
 
     __table_args__ = (
         # Helpful for list views by newest file first
         Index("ix_files_uploaded_at_desc", uploaded_at.desc()),
+        # Folder listing (keyset on filename, id) and name lookups on upload; live files only
+        Index(
+            "ix_files_folder_filename", "folder_id", "filename", "id",
+            sqlite_where=deleted_at.is_(None), postgresql_where=deleted_at.is_(None),
+        ),
+        # The trash: listing and purging by deletion time, without touching live rows
+        Index(
+            "ix_files_trash", "deleted_at", "id",
+            sqlite_where=deleted_at.is_not(None), postgresql_where=deleted_at.is_not(None),
+        ),
     )
 
     versions = relationship(
@@ -34,4 +52,10 @@ class File(Base):
         back_populates="file",
         cascade="all, delete-orphan",
         order_by="FileVersion.version_number"
+    )
+
+    share_links = relationship(
+        "ShareLink",
+        back_populates="file",
+        cascade="all, delete-orphan",
     )
\ No newline at end of file
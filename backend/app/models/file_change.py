@@ -0,0 +1,20 @@
+from datetime import datetime
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Index
+from .base import Base
+
+class FileChange(Base):
+    # Append-only change journal, read by GET /api/changes (see app/utils/changes.py).
+    # id is the sync cursor; file_id has no FK: "deleted" entries outlive their file
+    __tablename__ = "file_changes"
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)  # file owner
+    file_id = Column(Integer, nullable=False)
+    op = Column(String(10), nullable=False)  # "created", "updated", "deleted"
+    changed_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+    __table_args__ = (
+        Index("idx_file_changes_user_id", "user_id", "id"),
+        Index("idx_file_changes_user_file", "user_id", "file_id"),
+        {"sqlite_autoincrement": True},  # cursors must never be reused after compaction
+    )
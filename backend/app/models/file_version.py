@@ -14,6 +14,7 @@ class FileVersion(Base):
     uploaded_at = Column(DateTime, default=lambda: datetime.now(timezone.utc), nullable=False)
     notes = Column(Text, nullable=True)
     checksum = Column(String(64), nullable=True, index=True)
+    checksum_algo = Column(String(16), nullable=False, default="sha256", server_default="sha256")
 
     file = relationship("File", back_populates="versions")
 
@@ -0,0 +1,25 @@
+from datetime import datetime
+from sqlalchemy import Column, Integer, BigInteger, String, DateTime, ForeignKey, Index, UniqueConstraint
+from .base import Base
+
+class Folder(Base):
+    __tablename__ = "folders"
+
+    id = Column(Integer, primary_key=True, index=True)
+    owner_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    parent_id = Column(Integer, ForeignKey("folders.id", ondelete="CASCADE"), nullable=True)  # NULL = top level
+    name = Column(String(255), nullable=False)
+    # Materialized path of folder ids, root first, e.g. "/3/17/42/" (own id last).
+    # Ids never change, so renames don't touch it; a move rewrites the prefix of the subtree's folders only.
+    path = Column(String(2048), nullable=False, default="")
+    # Current size / number of files in the whole subtree, kept up to date incrementally
+    total_size = Column(BigInteger, nullable=False, default=0)
+    file_count = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        UniqueConstraint("owner_id", "parent_id", "name", name="uq_folders_owner_parent_name"),
+        Index("idx_folders_owner_path", "owner_id", "path"),
+        # Keyset listing of subfolders
+        Index("idx_folders_parent_name", "parent_id", "name", "id"),
+    )
@@ -0,0 +1,38 @@
+from datetime import datetime
+from sqlalchemy import Column, Integer, SmallInteger, DateTime, ForeignKey, Index, UniqueConstraint, CheckConstraint
+from .base import Base
+
+# Access levels, ordered: write implies read
+LEVEL_READ = 1
+LEVEL_WRITE = 2
+
+class FileGrant(Base):
+    # Source of truth: one file shared with one user or one group
+    __tablename__ = "file_grants"
+
+    id = Column(Integer, primary_key=True)
+    file_id = Column(Integer, ForeignKey("files.id", ondelete="CASCADE"), nullable=False)
+    grantee_user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=True)
+    grantee_group_id = Column(Integer, ForeignKey("groups.id", ondelete="CASCADE"), nullable=True)
+    level = Column(SmallInteger, nullable=False)
+    created_by = Column(Integer, ForeignKey("users.id", ondelete="SET NULL"), nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        CheckConstraint("(grantee_user_id IS NULL) <> (grantee_group_id IS NULL)", name="ck_file_grants_one_grantee"),
+        UniqueConstraint("file_id", "grantee_user_id", name="uq_file_grants_file_user"),
+        UniqueConstraint("file_id", "grantee_group_id", name="uq_file_grants_file_group"),
+        Index("idx_file_grants_group", "grantee_group_id"),
+        Index("idx_file_grants_user", "grantee_user_id"),
+    )
+
+class FileAccess(Base):
+    # Materialized access index: the highest level any grant gives user_id on file_id
+    # (owners are not listed, ownership is checked on files.uploaded_by). Rebuilt by app/utils/grants.py.
+    __tablename__ = "file_access"
+
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    file_id = Column(Integer, ForeignKey("files.id", ondelete="CASCADE"), primary_key=True)
+    level = Column(SmallInteger, nullable=False)
+
+    __table_args__ = (Index("idx_file_access_file", "file_id"),)
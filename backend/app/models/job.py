@@ -0,0 +1,35 @@
+from datetime import datetime, timezone
+from sqlalchemy import Column, Integer, String, DateTime, Float, Text, JSON, ForeignKey, Index
+from .base import Base
+
+def _utcnow():
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+class Job(Base):
+    # Background job persisted so progress and results survive the request and a worker restart
+    __tablename__ = "jobs"
+
+    id = Column(String(36), primary_key=True)
+    type = Column(String(50), nullable=False)  # "download_zip", "delete_files", "logbook_export", ...
+    status = Column(String(20), nullable=False, default="queued")  # queued, running, succeeded, failed, cancelled
+    priority = Column(Integer, nullable=False, default=0)  # higher runs first
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=True, index=True)
+    params = Column(JSON, nullable=True)
+
+    progress = Column(Float, nullable=False, default=0.0)  # 0.0 - 1.0
+    progress_message = Column(String(255), nullable=True)
+    result = Column(JSON, nullable=True)
+    result_path = Column(String(1024), nullable=True)  # artifact relative to STORAGE_ROOT
+    result_filename = Column(String(255), nullable=True)
+    error = Column(Text, nullable=True)
+    cancel_requested = Column(Integer, nullable=False, default=0)
+
+    created_at = Column(DateTime, default=_utcnow, nullable=False)
+    started_at = Column(DateTime, nullable=True)
+    heartbeat_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        # Claim query: next queued job by priority, oldest first
+        Index("idx_jobs_status_priority", "status", "priority", "created_at"),
+    )
@@ -0,0 +1,13 @@
+from sqlalchemy import Column, Integer, BigInteger, ForeignKey
+from .base import Base
+
+class VersionRetentionPolicy(Base):
+    # Per-user override of the global retention settings from app.utils.config.
+    # A NULL column means "no limit" for that rule; a user row fully replaces the global policy.
+    __tablename__ = "version_retention_policies"
+
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    keep_last = Column(Integer, nullable=True)        # newest N versions
+    keep_daily_days = Column(Integer, nullable=True)  # newest version per day for D days
+    keep_monthly_months = Column(Integer, nullable=True)  # newest version per month for M months after that
+    max_history_bytes = Column(BigInteger, nullable=True)  # cap on the size of non-current versions
@@ -0,0 +1,20 @@
+from datetime import datetime, timezone
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Index
+from sqlalchemy.orm import relationship
+from .base import Base
+
+class ShareLink(Base):
+    __tablename__ = "share_links"
+
+    id = Column(String(36), primary_key=True)  # uuid4, used in /share/{id}
+    file_id = Column(Integer, ForeignKey("files.id", ondelete="CASCADE"), nullable=False, index=True)
+    created_by = Column(Integer, ForeignKey("users.id", ondelete="SET NULL"), nullable=True)
+    created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc), nullable=False)
+    expires_at = Column(DateTime, nullable=True)         # NULL = never expires
+    max_downloads = Column(Integer, nullable=True)       # NULL = unlimited
+    download_count = Column(Integer, nullable=False, default=0)
+    version_number = Column(Integer, nullable=True)      # NULL = always the current version
+
+    file = relationship("File", back_populates="share_links")
+
+    __table_args__ = (Index("idx_share_links_file_version", "file_id", "version_number"),)
@@ -0,0 +1,22 @@
+from datetime import datetime
+from sqlalchemy import Column, Integer, String, DateTime, BigInteger, Text, ForeignKey, JSON
+from .base import Base
+
+class UploadSession(Base):
+    # Handed out by POST /api/upload/preflight when the content isn't stored yet
+    __tablename__ = "upload_sessions"
+
+    id = Column(String(36), primary_key=True)  # uuid4
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    filename = Column(String(255), nullable=False)
+    checksum = Column(String(64), nullable=False)  # declared by the client, verified on upload
+    checksum_algo = Column(String(16), nullable=False, default="sha256", server_default="sha256")
+    size = Column(BigInteger, nullable=False)
+    notes = Column(Text, nullable=True)
+    folder_id = Column(Integer, ForeignKey("folders.id", ondelete="CASCADE"), nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    expires_at = Column(DateTime, nullable=False, index=True)
+    # Proof-of-possession challenge when the content is stored but not referenced by this user yet
+    # (app/utils/hashing.py); cleared after one attempt
+    proof_nonce = Column(String(32), nullable=True)
+    proof_ranges = Column(JSON, nullable=True)
@@ -1,6 +1,7 @@
 import enum
 from datetime import datetime
-from sqlalchemy import String, Integer, DateTime, Enum, func, Index
+from typing import Optional
+from sqlalchemy import String, Integer, BigInteger, DateTime, Enum, func, Index
 from sqlalchemy.orm import Mapped, mapped_column, declarative_base, relationship
 from .base import Base
 
@@ -17,5 +18,20 @@ class User(Base):
     hashed_password: Mapped[str] = mapped_column(String(255), nullable=False)
     role: Mapped[UserRole] = mapped_column(Enum(UserRole), nullable=False, default=UserRole.user)
     created_at: Mapped[datetime] = mapped_column(DateTime, nullable=False, default=datetime.utcnow)
+    # Bumped on every change to the user's files; ETag of listings (app/utils/changes.py)
+    change_seq: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default="0")
+    # Journal entries up to this id were compacted away: older sync cursors must start over
+    change_floor: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default="0")
+    # Number / current size of the user's files outside the trash, kept up to date incrementally (app/utils/accounts.py)
+    file_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default="0")
+    used_bytes: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0, server_default="0")
+    # Set when the account is queued for purge: it can no longer log in, the purge job removes the rest
+    deleted_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
 
     files = relationship("File", back_populates="uploader")
+
+    __table_args__ = (
+        # Admin listing sorted by usage (keyset pagination)
+        Index("idx_users_used_bytes", "used_bytes", "id"),
+        Index("idx_users_file_count", "file_count", "id"),
+    )
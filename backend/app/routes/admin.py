@@ -1,49 +1,92 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Path, Response
+import asyncio
+from fastapi import APIRouter, Depends, HTTPException, status, Path, Query
+from fastapi.responses import JSONResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
-from typing import List
+from sqlalchemy import select, func
+from typing import Literal, Optional
 
 from ..db import get_session
 from ..models.user import User
-from ..schemas.user import UserOut
-from ..schemas.admin import AdminRoleUpdateIn # Imported new schema
+from ..models.blob import Blob
+from ..models.blob_check import BlobCheck
+from ..models.folder import Folder
+from ..models.file_version import FileVersion
+from ..schemas.user import AdminUserOut, UserOut
+from ..schemas.admin import AdminRoleUpdateIn, ImportTreeIn # Imported new schema
+from ..utils.accounts import schedule_account_purge
 from ..utils.auth_deps import require_roles
+from ..utils.backup import list_backups
+from ..utils import config
+from ..utils.hashing import ALGORITHMS as HASH_ALGORITHMS
+from ..utils.importer import resolve_import_source
+from ..utils.rehash import hashing_report
+from ..utils.jobs import enqueue_job
+from ..utils.tiering import flush_blob_access, tier_report
 
 router = APIRouter(prefix="/api/admin", tags=["Admin (User Management)"])
 
-@router.get("/users", response_model=List[UserOut], summary="List all users (Admin only)")
+# Sort key -> column; usage sorts are largest first, "id" oldest account first
+_USER_SORTS = {"id": User.id, "used_bytes": User.used_bytes, "file_count": User.file_count}
+
+def _parse_user_cursor(cursor: str):
+    # "<sort value>|<user id>" from next_cursor
+    try:
+        value, user_id = cursor.rsplit("|", 1)
+        return int(value), int(user_id)
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+@router.get("/users", summary="List users with their usage (Admin only, keyset pagination)")
 async def list_all_users(
+    sort: Literal["id", "used_bytes", "file_count"] = "id",
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
     db: AsyncSession = Depends(get_session),
     current_user: User = Depends(require_roles("admin")),
 ):
-    # Retrieves a list of all user accounts.
-    result = await db.execute(select(User).order_by(User.id))
-    users = result.scalars().all()
-    return [UserOut.model_validate(u) for u in users]
+    # Usage is kept on the user row, so a page is one index range scan whatever the sort
+    key = _USER_SORTS[sort]
+    q = select(User).where(User.deleted_at.is_(None))
+    if cursor is not None:
+        value, user_id = _parse_user_cursor(cursor)
+        if sort == "id":
+            q = q.where(User.id > user_id)
+        else:
+            q = q.where((key < value) | ((key == value) & (User.id < user_id)))
+    q = q.order_by(User.id) if sort == "id" else q.order_by(key.desc(), User.id.desc())
+    users = (await db.execute(q.limit(limit + 1))).scalars().all()
+    items = [AdminUserOut.model_validate(u) for u in users[:limit]]
+    next_cursor = None
+    if len(users) > limit:
+        last = users[limit - 1]
+        next_cursor = f"{getattr(last, key.key)}|{last.id}"
+    return {"items": items, "next_cursor": next_cursor}
 
-@router.delete("/users/{user_id}", status_code=status.HTTP_204_NO_CONTENT, summary="Delete a user (Admin only)")
+@router.delete("/users/{user_id}", summary="Delete a user and everything they own (Admin only, background job)")
 async def delete_user_account(
     user_id: int = Path(..., description="ID of the user to delete"),
     db: AsyncSession = Depends(get_session),
     current_user: User = Depends(require_roles("admin")),
 ):
-    # Deletes a user account and their associated data (files via cascade).
     if user_id == current_user.id:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Cannot delete your own admin account via this endpoint.")
-        
-    result = await db.execute(select(User).where(User.id == user_id))
-    user_to_delete = result.scalars().first()
-    
+
+    user_to_delete = await db.get(User, user_id)
     if not user_to_delete:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
 
-    await db.delete(user_to_delete)
-    await db.commit()
-    
+    # The account is locked out right away; the job removes files, blobs and rows in batches.
+    # Repeating the request for an account already marked restarts an interrupted purge.
+    await schedule_account_purge(db, user_to_delete)
+    job = await enqueue_job(db, "purge_account", current_user.id, {"user_id": user_id})
+
     # NOTE: Logging admin actions is skipped as the LogBook model's CheckConstraint
     # does not include 'delete_user' or 'change_role' actions.
-    
-    return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+    return JSONResponse(
+        {"job_id": job.id, "status": job.status, "status_url": f"/api/jobs/{job.id}"},
+        status_code=status.HTTP_202_ACCEPTED,
+    )
 
 @router.put("/users/{user_id}/role", response_model=UserOut, summary="Change a user's role (Admin only)")
 async def update_user_role(
@@ -67,4 +110,179 @@ async def update_user_role(
     await db.commit()
     await db.refresh(user_to_update)
     
-    return UserOut.model_validate(user_to_update)
\ No newline at end of file
+    return UserOut.model_validate(user_to_update)
+
+@router.post("/retention/prune", summary="Run version retention pruning now (Admin only)")
+async def run_retention_prune(
+    user_id: Optional[int] = None,
+    db: AsyncSession = Depends(get_session),
+    current_user: User = Depends(require_roles("admin")),
+):
+    # Optionally limited to one user's files
+    job = await enqueue_job(db, "retention_prune", current_user.id, {"user_id": user_id})
+    return JSONResponse(
+        {"job_id": job.id, "status": job.status, "status_url": f"/api/jobs/{job.id}"},
+        status_code=status.HTTP_202_ACCEPTED,
+    )
+
+@router.post("/trash/purge", summary="Purge expired trash now (Admin only)")
+async def run_trash_purge(
+    db: AsyncSession = Depends(get_session),
+    current_user: User = Depends(require_roles("admin")),
+):
+    # Expired trash of every user, batch by batch
+    job = await enqueue_job(db, "trash_purge", current_user.id, {})
+    return JSONResponse(
+        {"job_id": job.id, "status": job.status, "status_url": f"/api/jobs/{job.id}"},
+        status_code=status.HTTP_202_ACCEPTED,
+    )
+
+@router.get("/integrity", summary="Storage integrity report (Admin only)")
+async def integrity_report(
+    limit: int = 100,
+    db: AsyncSession = Depends(get_session),
+    current_user: User = Depends(require_roles("admin")),
+):
+    total = (await db.execute(select(func.count(Blob.id)))).scalar_one()
+    by_status = dict((await db.execute(select(BlobCheck.status, func.count()).group_by(BlobCheck.status))).all())
+    oldest = (await db.execute(select(func.min(BlobCheck.verified_at)))).scalar_one_or_none()
+
+    res = await db.execute(
+        select(BlobCheck, Blob)
+        .join(Blob, Blob.id == BlobCheck.blob_id)
+        .where(BlobCheck.status != "ok")
+        .order_by(BlobCheck.verified_at.desc())
+        .limit(min(limit, 1000))
+    )
+    problems = res.all()
+
+    # Which files are affected (versions pointing at the damaged blobs)
+    affected = {}
+    if problems:
+        refs = await db.execute(
+            select(FileVersion.filepath, FileVersion.file_id, FileVersion.version_number)
+            .where(FileVersion.filepath.in_([blob.filepath for _, blob in problems]))
+        )
+        for path, file_id, version in refs.all():
+            affected.setdefault(path, []).append({"file_id": file_id, "version": version})
+
+    return {
+        "blobs_total": total,
+        "never_verified": total - sum(by_status.values()),
+        "ok": by_status.get("ok", 0),
+        "missing": by_status.get("missing", 0),
+        "corrupt": by_status.get("corrupt", 0),
+        "oldest_verification": oldest.isoformat() if oldest else None,
+        "problems": [
+            {
+                "blob_id": blob.id,
+                "status": check.status,
+                "checksum": blob.checksum,
+                "filepath": blob.filepath,
+                "size": blob.size,
+                "detail": check.detail,
+                "quarantine_path": check.quarantine_path,
+                "verified_at": check.verified_at.isoformat(),
+                "affected_versions": affected.get(blob.filepath, []),
+            }
+            for check, blob in problems
+        ],
+    }
+
+@router.post("/integrity/scrub", summary="Verify a batch of blobs now (Admin only)")
+async def run_integrity_scrub(
+    batch_size: Optional[int] = Query(None, ge=1, le=10000),
+    db: AsyncSession = Depends(get_session),
+    current_user: User = Depends(require_roles("admin")),
+):
+    # Re-hashing is rate-limited, so even one batch can take a while: it runs as a job
+    job = await enqueue_job(db, "integrity_scrub", current_user.id, {"batch_size": batch_size})
+    return JSONResponse(
+        {"job_id": job.id, "status": job.status, "status_url": f"/api/jobs/{job.id}"},
+        status_code=status.HTTP_202_ACCEPTED,
+    )
+
+@router.get("/tiering", summary="Hot/cold storage tier report (Admin only)")
+async def get_tiering_report(
+    db: AsyncSession = Depends(get_session),
+    current_user: User = Depends(require_roles("admin")),
+):
+    return await tier_report(db)
+
+@router.post("/tiering/sweep", summary="Move cold blobs to the cold tier now (Admin only)")
+async def run_tiering_sweep(
+    limit: Optional[int] = Query(None, ge=1, le=10000),
+    db: AsyncSession = Depends(get_session),
+    current_user: User = Depends(require_roles("admin")),
+):
+    # This worker's pending access counts go in first; the copies run as a job
+    await flush_blob_access(db)
+    job = await enqueue_job(db, "tiering_sweep", current_user.id, {"limit": limit})
+    return JSONResponse(
+        {"job_id": job.id, "status": job.status, "status_url": f"/api/jobs/{job.id}"},
+        status_code=status.HTTP_202_ACCEPTED,
+    )
+
+@router.post("/import", summary="Import a server-local directory tree into a user's storage (Admin only)")
+async def start_tree_import(
+    payload: ImportTreeIn,
+    db: AsyncSession = Depends(get_session),
+    current_user: User = Depends(require_roles("admin")),
+):
+    # Runs as a background job; posting the same import again resumes it (already imported files are skipped)
+    source = resolve_import_source(payload.source)
+    owner = await db.get(User, payload.owner_id)
+    if owner is None or owner.deleted_at is not None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
+    if payload.folder_id is not None:
+        folder = await db.get(Folder, payload.folder_id)
+        if folder is None or folder.owner_id != payload.owner_id:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Folder not found")
+    job = await enqueue_job(db, "import_tree", current_user.id, {
+        "source": source, "owner_id": payload.owner_id, "folder_id": payload.folder_id, "link_mode": payload.link_mode,
+    })
+    return JSONResponse(
+        {"job_id": job.id, "status": job.status, "status_url": f"/api/jobs/{job.id}"},
+        status_code=status.HTTP_202_ACCEPTED,
+    )
+
+@router.get("/backups", summary="Complete backup snapshots, newest first (Admin only)")
+async def get_backups(
+    current_user: User = Depends(require_roles("admin")),
+):
+    return {"enabled": bool(config.BACKUP_ROOT), "snapshots": await asyncio.to_thread(list_backups)}
+
+@router.post("/backups", summary="Start a backup now (Admin only)")
+async def start_backup(
+    db: AsyncSession = Depends(get_session),
+    current_user: User = Depends(require_roles("admin")),
+):
+    if not config.BACKUP_ROOT:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Backups are disabled (BACKUP_ROOT is not set)")
+    job = await enqueue_job(db, "backup", current_user.id)
+    return JSONResponse(
+        {"job_id": job.id, "status": job.status, "status_url": f"/api/jobs/{job.id}"},
+        status_code=status.HTTP_202_ACCEPTED,
+    )
+
+@router.get("/hashing", summary="Stored content per checksum algorithm (Admin only)")
+async def get_hashing_report(
+    db: AsyncSession = Depends(get_session),
+    current_user: User = Depends(require_roles("admin")),
+):
+    return await hashing_report(db)
+
+@router.post("/hashing/migrate", summary="Rehash stored content with the configured algorithm (Admin only)")
+async def start_hash_migration(
+    algorithm: Optional[str] = None,
+    db: AsyncSession = Depends(get_session),
+    current_user: User = Depends(require_roles("admin")),
+):
+    # Background job; dedup between old and new content works again once it finished
+    if algorithm is not None and algorithm not in HASH_ALGORITHMS:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Unknown or unavailable algorithm: {algorithm}")
+    job = await enqueue_job(db, "rehash_blobs", current_user.id, {"algorithm": algorithm})
+    return JSONResponse(
+        {"job_id": job.id, "status": job.status, "status_url": f"/api/jobs/{job.id}"},
+        status_code=status.HTTP_202_ACCEPTED,
+    )
@@ -46,7 +46,7 @@ async def register(payload: RegisterIn, db: AsyncSession = Depends(get_session))
 async def login(payload: LoginIn, db: AsyncSession = Depends(get_session)):
     result = await db.execute(select(User).where(User.username == payload.username))
     user = result.scalars().first()
-    if not user or not verify_password(payload.password, user.hashed_password):
+    if not user or user.deleted_at is not None or not verify_password(payload.password, user.hashed_password):
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials")
 
     token = create_access_token(
@@ -0,0 +1,21 @@
+from typing import Optional
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..db import get_session
+from ..models.user import User
+from ..utils.auth_deps import get_current_user
+from ..utils.changes import changes_since
+from ..utils.config import CHANGES_PAGE_LIMIT
+
+router = APIRouter(prefix="/api", tags=["Changes"])
+
+@router.get("/changes", summary="Files created, updated or deleted since a sync cursor")
+async def get_changes(
+    cursor: Optional[str] = Query(None, description="From the previous response; omit to get the current cursor"),
+    limit: int = Query(CHANGES_PAGE_LIMIT, ge=1, le=CHANGES_PAGE_LIMIT),
+    db: AsyncSession = Depends(get_session),
+    current_user: User = Depends(get_current_user),
+):
+    # Poll with the returned cursor while has_more; 410 = the cursor is too old, list /api/files again
+    return await changes_since(db, current_user, cursor, limit)
@@ -1,21 +1,43 @@
-from fastapi import APIRouter, Depends, UploadFile, File as FileParam, HTTPException, status, Request
+import asyncio
+import hmac
+from fastapi import APIRouter, Depends, UploadFile, File as FileParam, HTTPException, Query, status, Request
 from fastapi.responses import FileResponse, JSONResponse
+from starlette.datastructures import UploadFile as StarletteUploadFile
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func, desc, asc, String
+from sqlalchemy import select, delete, func, desc, asc, or_, null, String
 from sqlalchemy.orm import selectinload
 from pathlib import Path
 from typing import Optional
+from functools import partial
 from uuid import uuid4
+from datetime import datetime, timedelta
 
 from ..db import get_session
 from ..models.file import File, User
+from ..models.blob import Blob
 from ..models.file_version import FileVersion
-from ..storage import build_rel_path, save_upload_stream, _abs_under_root
+from ..models.grant import FileAccess
+from ..models.upload_session import UploadSession
+from ..storage import build_rel_path, save_upload_stream, _abs_under_root, locate_blob, open_blob
+from ..utils.blobs import find_live_blob, register_blob, add_blob_ref, user_references_blob
+from ..utils.hashing import ALGORITHMS as HASH_ALGORITHMS, DIGEST_SIZE, TREE_CHUNK_SIZE, possession_challenge, possession_digest
+from ..utils.file_ops import delete_file_record
+from ..utils.folders import resolve_upload_folder, adjust_folder_usage, adjust_user_usage
+from ..utils.ingest import IngestItem, ingest_files, link_existing_blob
+from ..utils.jobs import enqueue_job
+from ..utils.previews import enqueue_previews
+from ..utils.share_cache import invalidate_file_shares
+from ..utils.tiering import ensure_hot, record_blob_access
+from ..utils.metrics import UPLOAD_DEDUP, STORAGE_BYTES
 from ..utils.permissions import assert_user_can_delete, assert_user_can_download
 from ..utils.auth_deps import get_current_user
+from ..utils.json_rows import rows_response
+from ..utils.changes import bump_change_seq, record_file_changes, change_etag, not_modified, revalidate_headers
+from ..utils.admission import upload_rate, bulk_upload_rate, upload_slot, download_slot, bulk_heavy_slot
 from app.utils.logging import log_action
 from app.core.constants import MAX_UPLOAD_BYTES
-from app.schemas.file import DeleteBatchIn
+from app.utils.config import BULK_UPLOAD_MAX_FILES, UPLOAD_SESSION_TTL_SECONDS
+from app.schemas.file import DeleteBatchIn, UploadPreflightIn, UploadProofIn
 
 router = APIRouter(prefix="/api", tags=["Files"])
 
@@ -31,13 +53,33 @@ def validate_file_size(file_obj) -> None:
 
 @router.get("/files")
 async def list_files(
+    request: Request,
     session: AsyncSession = Depends(get_session),
     current_user: User = Depends(get_current_user),
     search: Optional[str] = None,
     sort: str = "date_desc",
+    row_format: str = Query("objects", alias="format", description="objects | columnar"),
+    scope: str = Query("owned", description="owned | shared (with me) | all"),
 ):
-    # Base query: only files belonging to the authenticated user
-    q = select(File).where(File.uploaded_by == current_user.id)
+    # Base query: files of the authenticated user (columns only: encoded straight from the rows);
+    # shared files come from the access index, one indexed join
+    q = select(File.id, File.filename, File.size, File.uploaded_at).where(File.deleted_at.is_(None))
+    shared_to_me = (FileAccess.file_id == File.id) & (FileAccess.user_id == current_user.id)
+    etag = None
+    if scope == "owned":
+        q = q.where(File.uploaded_by == current_user.id)
+        # Unchanged since the client's copy: 304 without running the listing query
+        # (only for own files: changes to files shared by others don't bump this user's counter)
+        etag = change_etag(current_user, "files")
+        cached = not_modified(request, etag)
+        if cached is not None:
+            return cached
+    elif scope == "shared":
+        q = q.join(FileAccess, shared_to_me)
+    elif scope == "all":
+        q = q.outerjoin(FileAccess, shared_to_me).where(or_(File.uploaded_by == current_user.id, FileAccess.user_id.is_not(None)))
+    else:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Invalid scope parameter: {scope}")
     
     # 1. Add Search/Filter logic
     if search:
@@ -60,18 +102,11 @@ async def list_files(
             detail=f"Invalid sort parameter: {sort}"
         )
 
-    result = await session.execute(q)
-    rows = result.scalars().all()
-    
-    return [
-        {
-            "id": r.id,
-            "filename": r.filename,
-            "size": r.size,
-            "uploaded_at": r.uploaded_at.isoformat() if r.uploaded_at else None,
-        }
-        for r in rows
-    ]
+    result = await session.stream(q)
+    response = await rows_response(result, ("id", "filename", "size", "uploaded_at"), row_format)
+    if etag is not None:
+        response.headers.update(revalidate_headers(etag))
+    return response
 
 @router.get("/files/{file_id}/info", summary="Get file metadata and version count")
 async def get_file_info(
@@ -103,18 +138,50 @@ async def get_file_info(
         "versions": version_count
     }
 
-@router.post("/upload")
+@router.get("/files/{file_id}/digest", summary="Checksum of the current content, with its tree leaves for ranged checks")
+async def get_file_digest(
+    file_id: int,
+    session: AsyncSession = Depends(get_session),
+    current_user: User = Depends(get_current_user)
+):
+    file_obj = await assert_user_can_download(session, current_user, file_id)
+    res = await session.execute(
+        select(Blob.checksum, Blob.checksum_algo, Blob.size, Blob.chunk_digests).where(Blob.filepath == file_obj.filepath)
+    )
+    row = res.first()
+    if row is None:
+        # Legacy content without a blob row: the version's checksum only
+        res = await session.execute(
+            select(FileVersion.checksum, FileVersion.checksum_algo, FileVersion.size, null().label("chunk_digests"))
+            .where(FileVersion.file_id == file_id).where(FileVersion.filepath == file_obj.filepath).limit(1)
+        )
+        row = res.first()
+    if row is None or row.checksum is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No checksum recorded for this file")
+    chunks = row.chunk_digests or b""
+    return {
+        "algorithm": row.checksum_algo,
+        "checksum": row.checksum,
+        "size": row.size,
+        # Leaf i covers bytes [i * chunk_size, (i + 1) * chunk_size)
+        "chunk_size": TREE_CHUNK_SIZE if chunks else None,
+        "chunks": [chunks[i:i + DIGEST_SIZE].hex() for i in range(0, len(chunks), DIGEST_SIZE)],
+    }
+
+@router.post("/upload", dependencies=[Depends(upload_rate), Depends(upload_slot)])
 async def upload(
     request: Request,
     file: UploadFile = FileParam(...),
     session: AsyncSession = Depends(get_session),
     current_user: User = Depends(get_current_user),
-    notes: Optional[str] = None
+    notes: Optional[str] = None,
+    folder_id: Optional[int] = None
 ):
     if not file.filename:
         raise HTTPException(400, "missing filename")
     
     validate_file_size(file)
+    folder_id = await resolve_upload_folder(session, current_user, folder_id)
 
     client_ip = request.client.host if request.client else None
 
@@ -122,12 +189,14 @@ async def upload(
     existing_file_res = await session.execute(
         select(File)
         .where(File.uploaded_by == current_user.id)
+        .where(File.folder_id.is_(None) if folder_id is None else File.folder_id == folder_id)
         .where(File.filename == file.filename)
+        .where(File.deleted_at.is_(None))
     )
     existing_file = existing_file_res.scalars().first()
 
     if not existing_file:
-        f = File(filename=file.filename, filepath="", size=None, uploaded_by=current_user.id, current_version=1)
+        f = File(filename=file.filename, filepath="", size=None, uploaded_by=current_user.id, current_version=1, folder_id=folder_id)
         session.add(f)
         await session.flush()
         file_id = f.id
@@ -142,29 +211,18 @@ async def upload(
 
     # 2. Save temporarily to calculate size and hash
     temp_rel_path = build_rel_path(current_user.id, file_id, file.filename, initial_version)
-    size, checksum = await save_upload_stream(file, temp_rel_path)
+    digest = await save_upload_stream(file, temp_rel_path)
+    size, checksum = digest.size, digest.checksum
+
+    # 3. Deduplication against live blobs (rows whose file still exists on disk)
+    valid_duplicate = await find_live_blob(session, checksum, digest.algo)
+    # The reference is claimed before the uploaded copy goes: a blob released since the lookup is not linked
+    if valid_duplicate is not None and not await add_blob_ref(session, valid_duplicate):
+        valid_duplicate = None
+    UPLOAD_DEDUP.inc(result="hit" if valid_duplicate else "miss")
 
-    # 3. Deduplication with Physical Existence Check
-    duplicate_res = await session.execute(
-        select(FileVersion).where(FileVersion.checksum == checksum)
-    )
-    # Get all potential duplicates, not just the first one
-    potential_duplicates = duplicate_res.scalars().all()
-    
-    valid_duplicate = None
-    
-    for dup in potential_duplicates:
-        try:
-            # Check if this duplicate actually exists on disk
-            dup_abs_path = _abs_under_root(dup.filepath)
-            if Path(dup_abs_path).exists():
-                valid_duplicate = dup
-                break
-        except Exception:
-            continue
-    
     if valid_duplicate:
-        # Found a valid duplicate that exists on disk: safe to deduplicate
+        # Found a valid duplicate that exists on disk and holds our reference: safe to deduplicate
         Path(_abs_under_root(temp_rel_path)).unlink(missing_ok=True)
         final_rel_path = valid_duplicate.filepath
         final_size = valid_duplicate.size
@@ -174,39 +232,241 @@ async def upload(
         final_rel_path = temp_rel_path
         final_size = size
         is_deduplicated = False
+        await register_blob(session, temp_rel_path, digest)
 
     # 4. Update Database
     if existing_file:
+        await adjust_folder_usage(session, folder_id, final_size - (existing_file.size or 0))
+        await adjust_user_usage(session, current_user.id, final_size - (existing_file.size or 0))
         existing_file.filepath = final_rel_path
         existing_file.size = final_size
         existing_file.current_version = initial_version
 
         v = FileVersion(
-            file_id=file_id, version_number=initial_version, filepath=final_rel_path, size=final_size, notes=notes, checksum=checksum
+            file_id=file_id, version_number=initial_version, filepath=final_rel_path, size=final_size, notes=notes, checksum=checksum,
+            checksum_algo=digest.algo,
         )
         session.add(v)
+        await record_file_changes(session, current_user.id, [(file_id, "updated")])
         await session.commit()
+        invalidate_file_shares(file_id)
         
         log_details = {"size": final_size, "version": initial_version, "duplicate": is_deduplicated}
         await log_action(session, user_id=current_user.id, action="upload", file_id=file_id, details=log_details, ip_address=client_ip)
+        await enqueue_previews(session, [(checksum, final_rel_path, existing_file.filename)])
         
         return {"file_id": file_id, "filename": existing_file.filename, "size": final_size, "version": initial_version, "message": f"New version uploaded ({'deduplicated' if is_deduplicated else 'new file'})"}
 
     else:
+        await adjust_folder_usage(session, folder_id, final_size, 1)
+        await adjust_user_usage(session, current_user.id, final_size, 1)
         f.filepath = final_rel_path
         f.size = final_size
         
         v = FileVersion(
-            file_id=file_id, version_number=initial_version, filepath=final_rel_path, size=final_size, notes=notes, checksum=checksum
+            file_id=file_id, version_number=initial_version, filepath=final_rel_path, size=final_size, notes=notes, checksum=checksum,
+            checksum_algo=digest.algo,
         )
         session.add(v)
+        await record_file_changes(session, current_user.id, [(file_id, "created")])
         await session.commit()
     
         log_details = {"size": final_size, "version": initial_version, "duplicate": is_deduplicated}
         await log_action(session, user_id=current_user.id, action="upload", file_id=file_id, details=log_details, ip_address=client_ip)
+        await enqueue_previews(session, [(checksum, final_rel_path, f.filename)])
     
         return {"file_id": file_id, "filename": f.filename, "size": final_size, "version": initial_version, "message": f"File created and version 1 uploaded ({'deduplicated' if is_deduplicated else 'new file'})"}
 
+@router.post("/upload/preflight", dependencies=[Depends(upload_rate)], summary="Create a file from already stored content by checksum, or get an upload session")
+async def upload_preflight(
+    payload: UploadPreflightIn,
+    request: Request,
+    session: AsyncSession = Depends(get_session),
+    current_user: User = Depends(get_current_user)
+):
+    if payload.size > MAX_UPLOAD_BYTES:
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail="File exceeds 100MB limit")
+
+    checksum = payload.checksum.lower()
+    if payload.checksum_algo not in HASH_ALGORITHMS:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Checksum algorithm not supported here: {payload.checksum_algo}")
+    client_ip = request.client.host if request.client else None
+    folder_id = await resolve_upload_folder(session, current_user, payload.folder_id)
+
+    # Known content the user already has: new file/version pointing at the live blob, no data transfer.
+    blob = await find_live_blob(session, checksum, payload.checksum_algo)
+    if blob is not None and blob.size == payload.size and await user_references_blob(session, current_user.id, blob.filepath):
+        created = await link_existing_blob(
+            session, current_user.id, payload.filename, blob, notes=payload.notes, client_ip=client_ip, folder_id=folder_id
+        )
+        if created is not None:
+            return JSONResponse(
+                {"status": "created", **created, "message": "File created from existing content (no upload needed)"},
+                status_code=status.HTTP_201_CREATED,
+            )
+
+    # Everything else gets an upload session with a proof-of-possession challenge, whether or not some other
+    # account stores the content: the response must not tell (the checksum alone is no proof either)
+    proof = possession_challenge(payload.size)
+    now = datetime.utcnow()
+    await session.execute(delete(UploadSession).where(UploadSession.expires_at < now))
+    upload_session = UploadSession(
+        id=str(uuid4()),
+        user_id=current_user.id,
+        filename=payload.filename,
+        checksum=checksum,
+        checksum_algo=payload.checksum_algo,
+        size=payload.size,
+        notes=payload.notes,
+        folder_id=folder_id,
+        created_at=now,
+        expires_at=now + timedelta(seconds=UPLOAD_SESSION_TTL_SECONDS),
+        proof_nonce=proof[0],
+        proof_ranges=proof[1],
+    )
+    session.add(upload_session)
+    await session.commit()
+
+    return {
+        "status": "upload_required",
+        "session_id": upload_session.id,
+        "upload_url": f"/api/upload/sessions/{upload_session.id}",
+        "expires_at": upload_session.expires_at.isoformat(),
+        # Answering the challenge replaces the upload if the content is stored
+        "proof": {"nonce": proof[0], "ranges": proof[1], "url": f"/api/upload/sessions/{upload_session.id}/proof"},
+    }
+
+async def _get_upload_session(session: AsyncSession, current_user: User, session_id: str) -> UploadSession:
+    upload_session = await session.get(UploadSession, session_id)
+    if not upload_session or upload_session.user_id != current_user.id:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Upload session not found")
+    if upload_session.expires_at < datetime.utcnow():
+        await session.delete(upload_session)
+        await session.commit()
+        raise HTTPException(status_code=status.HTTP_410_GONE, detail="Upload session has expired")
+    return upload_session
+
+def _read_possession_digest(rel_path: str, nonce: str, ranges) -> Optional[str]:
+    abs_path = locate_blob(rel_path)
+    if abs_path is None:
+        return None
+    with open_blob(abs_path) as f:
+        return possession_digest(f, nonce, ranges)
+
+@router.post("/upload/sessions/{session_id}/proof", dependencies=[Depends(upload_rate)], summary="Prove possession of stored content instead of uploading it")
+async def prove_upload_session(
+    session_id: str,
+    payload: UploadProofIn,
+    request: Request,
+    session: AsyncSession = Depends(get_session),
+    current_user: User = Depends(get_current_user)
+):
+    upload_session = await _get_upload_session(session, current_user, session_id)
+    nonce, ranges = upload_session.proof_nonce, upload_session.proof_ranges
+    if not nonce:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="No proof pending for this session, upload the content")
+    # One attempt per challenge: the session stays open for a regular upload
+    upload_session.proof_nonce = None
+    upload_session.proof_ranges = None
+    await session.commit()
+
+    blob = await find_live_blob(session, upload_session.checksum, upload_session.checksum_algo)
+    expected = None
+    if blob is not None and blob.size == upload_session.size:
+        expected = await asyncio.to_thread(_read_possession_digest, blob.filepath, nonce, ranges)
+    # Content that is not stored fails like a wrong digest, so the answer says nothing about other accounts
+    if expected is None or not hmac.compare_digest(expected, payload.digest.lower()):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Proof of possession failed, upload the content")
+
+    folder_id = await resolve_upload_folder(session, current_user, upload_session.folder_id)
+    client_ip = request.client.host if request.client else None
+    created = await link_existing_blob(
+        session, current_user.id, upload_session.filename, blob, notes=upload_session.notes, client_ip=client_ip, folder_id=folder_id
+    )
+    if created is None:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Content is no longer stored, upload it")
+    await session.execute(delete(UploadSession).where(UploadSession.id == session_id))
+    await session.commit()
+    return JSONResponse(
+        {"status": "created", **created, "message": "File created from existing content (no upload needed)"},
+        status_code=status.HTTP_201_CREATED,
+    )
+
+@router.put("/upload/sessions/{session_id}", dependencies=[Depends(upload_rate), Depends(upload_slot)], summary="Upload the content announced by a preflight request")
+async def complete_upload_session(
+    session_id: str,
+    request: Request,
+    file: UploadFile = FileParam(...),
+    session: AsyncSession = Depends(get_session),
+    current_user: User = Depends(get_current_user)
+):
+    upload_session = await _get_upload_session(session, current_user, session_id)
+
+    validate_file_size(file)
+    expected_size, expected_checksum, algo = upload_session.size, upload_session.checksum, upload_session.checksum_algo
+    # The folder may have been deleted since the preflight
+    folder_id = await resolve_upload_folder(session, current_user, upload_session.folder_id)
+
+    async def _store(dest_rel: str):
+        # Hashed with the declared algorithm, so the client's checksum can be compared
+        digest = await save_upload_stream(file, dest_rel, algo)
+        if digest.size != expected_size or digest.checksum != expected_checksum:
+            Path(_abs_under_root(dest_rel)).unlink(missing_ok=True)
+            raise ValueError("uploaded content does not match the declared checksum and size")
+        return digest
+
+    client_ip = request.client.host if request.client else None
+    uploaded, failed = await ingest_files(
+        session, current_user.id, [IngestItem(upload_session.filename, _store)],
+        notes=upload_session.notes, client_ip=client_ip, folder_id=folder_id,
+    )
+    if failed:
+        # Session stays valid so the client can retry
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=failed[0]["detail"])
+
+    await session.execute(delete(UploadSession).where(UploadSession.id == session_id))
+    await session.commit()
+    return {"status": "created", **uploaded[0]}
+
+@router.post("/upload/bulk", dependencies=[Depends(bulk_upload_rate), Depends(upload_slot), Depends(bulk_heavy_slot)], summary="Upload many files in one request (repeated multipart field `files`)")
+async def bulk_upload(
+    request: Request,
+    session: AsyncSession = Depends(get_session),
+    current_user: User = Depends(get_current_user),
+    notes: Optional[str] = None,
+    folder_id: Optional[int] = None
+):
+    folder_id = await resolve_upload_folder(session, current_user, folder_id)
+    # Form parsed by hand: FastAPI's List[UploadFile] stops at Starlette's default of 1000 parts
+    form = await request.form(max_files=BULK_UPLOAD_MAX_FILES, max_fields=BULK_UPLOAD_MAX_FILES)
+    try:
+        parts = [p for p in form.getlist("files") if isinstance(p, StarletteUploadFile)]
+        if not parts:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="No files provided")
+
+        items, failed = [], []
+        for part in parts:
+            if not part.filename:
+                failed.append({"filename": None, "detail": "missing filename"})
+            elif part.size is not None and part.size > MAX_UPLOAD_BYTES:
+                failed.append({"filename": part.filename, "detail": "File exceeds 100MB limit"})
+            else:
+                items.append(IngestItem(part.filename, partial(save_upload_stream, part)))
+
+        client_ip = request.client.host if request.client else None
+        uploaded, ingest_failed = await ingest_files(
+            session, current_user.id, items, notes=notes, client_ip=client_ip, folder_id=folder_id
+        )
+    finally:
+        await form.close()
+
+    return {
+        "message": f"Uploaded {len(uploaded)} files.",
+        "uploaded_count": len(uploaded),
+        "uploaded": uploaded,
+        "failed_to_upload": failed + ingest_failed,
+    }
+
 def resolve_current_storage_path(file_obj) -> Optional[str]:
     # preferuj główny filepath
     if getattr(file_obj, "filepath", None):
@@ -217,7 +477,7 @@ def resolve_current_storage_path(file_obj) -> Optional[str]:
         return sorted(versions, key=lambda v: v.version_number)[-1].filepath
     return None
 
-@router.get("/download/{file_id}")
+@router.get("/download/{file_id}", dependencies=[Depends(download_slot)])
 async def download_file(
     file_id: int,
     request: Request,
@@ -226,10 +486,12 @@ async def download_file(
 ):
     file_obj = await assert_user_can_download(session, current_user, file_id)
     storage_path = resolve_current_storage_path(file_obj)
-    abs_path = _abs_under_root(storage_path) if storage_path else None
+    # A blob on the cold tier is copied back first (app/utils/tiering.py)
+    abs_path = await ensure_hot(storage_path) if storage_path else None
 
-    if not storage_path or not Path(abs_path).is_file():
+    if not abs_path:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Stored file not found")
+    record_blob_access(storage_path)
 
     # log download
     client_ip = request.client.host if request.client else None
@@ -237,6 +499,7 @@ async def download_file(
 
     # użyj nazwy z modelu File
     filename = getattr(file_obj, "filename", Path(abs_path).name)
+    STORAGE_BYTES.inc(file_obj.size or 0, op="download")
     return FileResponse(path=str(abs_path), filename=filename, media_type="application/octet-stream")
 
 @router.delete("/delete/{file_id}")
@@ -247,22 +510,12 @@ async def delete_file(
     current_user: User = Depends(get_current_user)
 ):
     file_obj = await assert_user_can_delete(session, current_user, file_id)
-    storage_path = resolve_current_storage_path(file_obj)
-    abs_path = _abs_under_root(storage_path) if storage_path else None
 
-    # Remove physical file if exists
-    if storage_path:
-        try:
-            p = Path(abs_path)
-            if p.exists():
-                p.unlink()
-        except Exception as e:
-            client_ip = request.client.host if request.client else None
-            await log_action(session, user_id=current_user.id, action="delete_error", file_id=file_id, details={"error": str(e)}, ip_address=client_ip)
-
-    # Remove DB record
-    await session.delete(file_obj)
-    await session.commit()
+    # Remove DB record and physical files that no other version (dedup) still references
+    errors = await delete_file_record(session, file_obj)
+    if errors:
+        client_ip = request.client.host if request.client else None
+        await log_action(session, user_id=current_user.id, action="delete_error", file_id=file_id, details={"error": "; ".join(errors)}, ip_address=client_ip)
 
     # log delete
     client_ip = request.client.host if request.client else None
@@ -274,12 +527,21 @@ async def delete_file(
 async def delete_multiple_files(
     payload: DeleteBatchIn,
     request: Request,
+    background: bool = False,
     session: AsyncSession = Depends(get_session),
     current_user: User = Depends(get_current_user)
 ):
     if not payload.file_ids:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="File IDs list cannot be empty")
 
+    if background:
+        # Authorization is re-checked per file inside the job
+        job = await enqueue_job(session, "delete_files", current_user.id, {"file_ids": sorted(set(payload.file_ids))})
+        return JSONResponse(
+            {"job_id": job.id, "status": job.status, "status_url": f"/api/jobs/{job.id}"},
+            status_code=status.HTTP_202_ACCEPTED,
+        )
+
     deleted_count = 0
     failed_ids = []
     
@@ -289,23 +551,12 @@ async def delete_multiple_files(
             # Użyj istniejącej logiki autoryzacji (tylko właściciel/admin)
             file_obj = await assert_user_can_delete(session, current_user, file_id)
 
-            # Usuwanie pliku fizycznego (reuse logic from delete_file)
-            storage_path = resolve_current_storage_path(file_obj)
-            abs_path = _abs_under_root(storage_path) if storage_path else None
-            
-            if storage_path:
-                try:
-                    p = Path(abs_path)
-                    if p.exists():
-                        p.unlink()
-                except Exception as e:
-                    # Loguj błąd, ale kontynuuj usuwanie z DB
-                    client_ip = request.client.host if request.client else None
-                    await log_action(session, user_id=current_user.id, action="delete_error", file_id=file_id, details={"error": str(e), "batch": True}, ip_address=client_ip)
-            
-            # Usuń rekord z DB (cascade delete usunie też FileVersions)
-            await session.delete(file_obj)
-            await session.commit()
+            # Usuń rekord z DB (cascade delete usunie też FileVersions) i pliki bez innych referencji
+            errors = await delete_file_record(session, file_obj)
+            if errors:
+                # Loguj błąd, ale kontynuuj
+                client_ip = request.client.host if request.client else None
+                await log_action(session, user_id=current_user.id, action="delete_error", file_id=file_id, details={"error": "; ".join(errors), "batch": True}, ip_address=client_ip)
             
             # Loguj udane usunięcie
             client_ip = request.client.host if request.client else None
@@ -345,6 +596,7 @@ async def generate_share_link(
 
     if not file_obj.share_link_id:
         file_obj.share_link_id = str(uuid4())
+        await bump_change_seq(session, [file_obj.uploaded_by])
         await session.commit()
         await session.refresh(file_obj)
         
@@ -353,4 +605,20 @@ async def generate_share_link(
     # Zwróć ścieżkę do publicznego endpointu
     share_url = f"/share/{file_obj.share_link_id}" 
 
-    return {"message": "Share link generated/retrieved", "share_id": file_obj.share_link_id, "share_url": share_url}
\ No newline at end of file
+    return {"message": "Share link generated/retrieved", "share_id": file_obj.share_link_id, "share_url": share_url}
+
+@router.delete("/files/{file_id}/share", summary="Revoke the sharing link of a file")
+async def revoke_share_link(
+    file_id: int,
+    session: AsyncSession = Depends(get_session),
+    current_user: User = Depends(get_current_user)
+):
+    file_obj = await assert_user_can_delete(session, current_user, file_id)
+
+    if file_obj.share_link_id:
+        file_obj.share_link_id = None
+        await bump_change_seq(session, [file_obj.uploaded_by])
+        await session.commit()
+    invalidate_file_shares(file_id)
+
+    return {"message": "Share link revoked"}
@@ -1,19 +1,28 @@
+import asyncio
 import os
-from fastapi import APIRouter, Depends, HTTPException, Response, status, BackgroundTasks
+import time
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import FileResponse, JSONResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select 
 from typing import List, Optional
-from zipfile import ZipFile, ZIP_DEFLATED
-from io import BytesIO
 from ..db import get_session 
 from ..models.file_version import FileVersion 
 from ..models.file import File
 from ..models.user import User
-from ..utils.logging import log_action
+from ..utils.logging import log_action, log_actions
 from ..utils.auth_deps import get_current_user
-from ..utils.permissions import assert_user_can_download, assert_user_can_delete
+from ..utils.permissions import assert_user_can_download, assert_user_can_write, filter_files_user_can
 from ..schemas.file import DeleteBatchIn
-from ..storage import _abs_under_root
+from ..utils.archives import zip_members, build_zip
+from ..utils.bundle_cache import bundle_key, get_or_build_bundle
+from ..utils.admission import heavy_rate, heavy_slot
+from ..utils.json_rows import rows_response
+from ..utils.changes import record_file_changes
+from ..utils.folders import adjust_folder_usage, adjust_user_usage
+from ..utils.jobs import enqueue_job
+from ..utils.share_cache import invalidate_file_shares
+from ..utils.metrics import STORAGE_OP_SECONDS, STORAGE_BYTES
 
 router = APIRouter(prefix="/api/files", tags = ["File versions"])
 
@@ -21,29 +30,20 @@ router = APIRouter(prefix="/api/files", tags = ["File versions"])
 async def list_file_versions(
     file_id: int, 
     db: AsyncSession = Depends(get_session),
-    current_user: User = Depends(get_current_user) # Zabezpieczenie dostępu
+    current_user: User = Depends(get_current_user), # Zabezpieczenie dostępu
+    row_format: str = Query("objects", alias="format", description="objects | columnar"),
 ): 
     # Autoryzacja: Weryfikacja dostępu do odczytu (właściciel lub współdzielony)
     _ = await assert_user_can_download(db, current_user, file_id)
 
-    result = await db.execute(
-        select(FileVersion).where(FileVersion.file_id == file_id).order_by(FileVersion.version_number) 
+    result = await db.stream(
+        select(FileVersion.version_number, FileVersion.size, FileVersion.uploaded_at, FileVersion.filepath, FileVersion.notes)
+        .where(FileVersion.file_id == file_id).order_by(FileVersion.version_number)
+    )
+    return await rows_response(
+        result, ("version", "size", "uploaded_at", "filepath", "notes"), row_format,
+        not_found="Versions not found for this file",
     )
-    versions = result.scalars().all()
-    
-    if not versions:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Versions not found for this file")
-
-    return [
-        {
-            "version": v.version_number, 
-            "size": v.size, 
-            "uploaded_at": v.uploaded_at.isoformat() if v.uploaded_at else None,
-            "filepath": v.filepath,
-            "notes": v.notes
-        } 
-        for v in versions
-    ]
 
 def resolve_current_storage_path(file_obj) -> Optional[str]:
     if getattr(file_obj, "filepath", None):
@@ -53,70 +53,62 @@ def resolve_current_storage_path(file_obj) -> Optional[str]:
         return sorted(versions, key=lambda v: v.version_number)[-1].filepath
     return None
 
-@router.post("/download-zip")
+@router.post("/download-zip", dependencies=[Depends(heavy_rate), Depends(heavy_slot)])
 async def download_zip(
     payload: DeleteBatchIn, # Changed from file_id: List[int] to match JSON body { "file_ids": ... }
+    background: bool = False,
     db: AsyncSession = Depends(get_session),
     current_user: User = Depends(get_current_user)
 ):
-    files_to_zip = []
-    
-    # payload.file_ids comes from the schema
-    for f_id in payload.file_ids:
-        try:
-            # We need to load versions to resolve the path if it's not on the main object
-            file_obj = await assert_user_can_download(db, current_user, f_id)
-            
-            # Explicitly load versions if they aren't loaded, 
-            # though assert_user_can_download usually returns the File model.
-            # Depending on your lazy loading settings, you might need to ensure they are present
-            # if resolving path relies on them.
-            
-            files_to_zip.append(file_obj)
-        except HTTPException as e:
-            if e.status_code == status.HTTP_404_NOT_FOUND:
-                continue 
-            if e.status_code == status.HTTP_403_FORBIDDEN:
+    # payload.file_ids comes from the schema; owned, shared and (admin) any files, in one query
+    requested = list(dict.fromkeys(payload.file_ids))
+    position = {f_id: i for i, f_id in enumerate(requested)}
+    files_to_zip = await filter_files_user_can(db, current_user, requested, "read")
+    files_to_zip.sort(key=lambda f: position[f.id])
+    allowed = {f.id for f in files_to_zip}
+    rest = [f_id for f_id in requested if f_id not in allowed]
+    if rest:
+        # Missing files are skipped, existing ones the user may not read fail the whole request
+        res = await db.execute(select(File.id).where(File.id.in_(rest)).where(File.deleted_at.is_(None)))
+        forbidden = set(res.scalars().all())
+        for f_id in rest:
+            if f_id in forbidden:
                 raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=f"Permission denied for file ID: {f_id}")
-            raise e
 
     if not files_to_zip:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No authorized files found for the given IDs")
     
-    zbuffer = BytesIO()
-    # Use ZIP_DEFLATED for compression
-    with ZipFile(zbuffer, 'w', ZIP_DEFLATED) as zip_file:
-        for file_obj in files_to_zip:
-            try:
-                # 1. Resolve the physical path
-                storage_path = resolve_current_storage_path(file_obj)
-                if not storage_path:
-                    print(f"Skipping {file_obj.filename}: No storage path found")
-                    continue
+    if background:
+        # Large archives: build in the job runner and fetch later from /api/jobs/{id}/result
+        job = await enqueue_job(db, "download_zip", current_user.id, {"file_ids": [f.id for f in files_to_zip]})
+        return JSONResponse(
+            {"job_id": job.id, "status": job.status, "status_url": f"/api/jobs/{job.id}"},
+            status_code=status.HTTP_202_ACCEPTED,
+        )
+
+    return await zip_bundle_response(db, current_user.id, zip_members(files_to_zip), "files_download.zip")
+    
 
-                abs_path = _abs_under_root(storage_path)
-                
-                # 2. Check if file exists on disk
-                if not os.path.exists(abs_path):
-                    print(f"Skipping {file_obj.filename}: File not found at {abs_path}")
-                    continue
+async def zip_bundle_response(db: AsyncSession, user_id: int, members, download_name: str) -> FileResponse:
+    key = await bundle_key(db, members)
 
-                # 3. Write actual file content to zip
-                # arcname ensures the file in the zip has the correct logical filename
-                zip_file.write(abs_path, arcname=file_obj.filename)
-                
-                await log_action(db, user_id=current_user.id, action='download', file_id=file_obj.id, details={"zip_part": True})
-            except Exception as e:
-                print(f"Error during archiving file {file_obj.filename}: {e}")
-                
-    zbuffer.seek(0)
+    async def _build(tmp_path: str) -> None:
+        zip_started = time.perf_counter()
+        # Compression runs off the event loop
+        await asyncio.to_thread(build_zip, tmp_path, members)
+        STORAGE_OP_SECONDS.observe(time.perf_counter() - zip_started, op="zip_build")
+        STORAGE_BYTES.inc(os.path.getsize(tmp_path), op="zip_build")
 
-    return Response(
-        content=zbuffer.read(),
+    # Same set of (file, content) as an earlier request -> the archive is already on disk
+    bundle_path, _ = await get_or_build_bundle(key, _build)
+    await log_actions(db, user_id=user_id, action='download', file_ids=[f.id for f, _, _ in members], details={"zip_part": True})
+
+    return FileResponse(
+        path=bundle_path,
+        filename=download_name,
         media_type="application/zip",
-        headers={"Content-Disposition": "attachment; filename=files_download.zip"}
+        headers={"ETag": f'"{key}"'},
     )
-    
 
 @router.post("/{file_id}/rollback/{version_number}")
 async def rollback_file_version(
@@ -125,8 +117,8 @@ async def rollback_file_version(
     db: AsyncSession = Depends(get_session),
     current_user: User = Depends(get_current_user) # Zabezpieczenie dostępu
 ):
-    # Autoryzacja: Rollback wymaga uprawnień właściciela, co weryfikuje assert_user_can_delete
-    cur_file = await assert_user_can_delete(db, current_user, file_id) # Zwraca obiekt File
+    # Autoryzacja: Rollback wymaga uprawnień do zapisu (właściciel, admin lub grant "write")
+    cur_file = await assert_user_can_write(db, current_user, file_id) # Zwraca obiekt File
 
     result_ver = await db.execute(
         select(FileVersion).where(
@@ -138,11 +130,15 @@ async def rollback_file_version(
     if not target_ver:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Version not found")
     
+    await adjust_folder_usage(db, cur_file.folder_id, (target_ver.size or 0) - (cur_file.size or 0))
+    await adjust_user_usage(db, cur_file.uploaded_by, (target_ver.size or 0) - (cur_file.size or 0))
     cur_file.filepath = target_ver.filepath
     cur_file.size = target_ver.size
     cur_file.current_version = target_ver.version_number
+    await record_file_changes(db, cur_file.uploaded_by, [(file_id, "updated")])
     
     await db.commit()
+    invalidate_file_shares(file_id)
     await log_action(db, user_id=current_user.id, action="rollback", file_id=file_id, details={"rolled_back_to": version_number})
 
     return {"message": f"File {file_id} rolled back to version {version_number}"}
\ No newline at end of file
@@ -0,0 +1,233 @@
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Response, status
+from fastapi.responses import JSONResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, update, func, literal
+
+from ..db import get_session
+from ..models.file import File
+from ..models.folder import Folder
+from ..models.user import User
+from ..schemas.folder import FolderCreateIn, FolderUpdateIn, MoveFilesIn
+from ..utils.archives import zip_members
+from ..utils.auth_deps import get_current_user
+from ..utils.changes import record_file_changes
+from ..utils.admission import heavy_rate, heavy_slot
+from ..utils.file_ops import delete_folder_tree
+from ..utils.folders import (
+    ancestor_ids, subtree_filter, validate_folder_name, get_user_folder, name_taken,
+    apply_folder_usage, subtree_files, list_folder_items,
+)
+from ..utils.jobs import enqueue_job
+from ..utils.logging import log_actions
+from ..utils.permissions import filter_files_user_can
+from .fileversion import zip_bundle_response
+
+router = APIRouter(prefix="/api/folders", tags=["Folders"])
+
+def _folder_out(folder: Folder) -> dict:
+    return {
+        "id": folder.id,
+        "name": folder.name,
+        "parent_id": folder.parent_id,
+        "size": folder.total_size,
+        "file_count": folder.file_count,
+        "created_at": folder.created_at.isoformat() if folder.created_at else None,
+    }
+
+@router.post("", status_code=status.HTTP_201_CREATED, summary="Create a folder")
+async def create_folder(
+    payload: FolderCreateIn,
+    db: AsyncSession = Depends(get_session),
+    current_user: User = Depends(get_current_user),
+):
+    name = validate_folder_name(payload.name)
+    parent = None
+    if payload.parent_id is not None:
+        parent = await get_user_folder(db, current_user, payload.parent_id, "update")
+    owner_id = parent.owner_id if parent else current_user.id
+
+    if await name_taken(db, owner_id, payload.parent_id, name):
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="A folder with this name already exists here")
+
+    folder = Folder(owner_id=owner_id, parent_id=payload.parent_id, name=name, path="", total_size=0, file_count=0)
+    db.add(folder)
+    await db.flush()
+    folder.path = f"{parent.path if parent else '/'}{folder.id}/"
+    await db.commit()
+    return _folder_out(folder)
+
+@router.get("/root/items", summary="List the top level (subfolders first, keyset pagination)")
+async def list_root_items(
+    cursor: Optional[str] = None,
+    limit: int = 100,
+    db: AsyncSession = Depends(get_session),
+    current_user: User = Depends(get_current_user),
+):
+    return await list_folder_items(db, current_user.id, None, cursor, max(1, min(limit, 1000)))
+
+@router.get("/{folder_id}", summary="Folder details with breadcrumbs")
+async def get_folder(
+    folder_id: int,
+    db: AsyncSession = Depends(get_session),
+    current_user: User = Depends(get_current_user),
+):
+    folder = await get_user_folder(db, current_user, folder_id)
+    ids = ancestor_ids(folder.path)
+    res = await db.execute(select(Folder.id, Folder.name).where(Folder.id.in_(ids)))
+    names = dict(res.all())
+    return {**_folder_out(folder), "breadcrumbs": [{"id": i, "name": names.get(i)} for i in ids]}
+
+@router.get("/{folder_id}/items", summary="List a folder (subfolders first, keyset pagination)")
+async def list_items(
+    folder_id: int,
+    cursor: Optional[str] = None,
+    limit: int = 100,
+    db: AsyncSession = Depends(get_session),
+    current_user: User = Depends(get_current_user),
+):
+    folder = await get_user_folder(db, current_user, folder_id)
+    return await list_folder_items(db, folder.owner_id, folder.id, cursor, max(1, min(limit, 1000)))
+
+@router.patch("/{folder_id}", summary="Rename and/or move a folder with its whole subtree")
+async def update_folder(
+    folder_id: int,
+    payload: FolderUpdateIn,
+    db: AsyncSession = Depends(get_session),
+    current_user: User = Depends(get_current_user),
+):
+    folder = await get_user_folder(db, current_user, folder_id, "update")
+    name = validate_folder_name(payload.name) if payload.name is not None else folder.name
+    moving = "parent_id" in payload.model_fields_set and payload.parent_id != folder.parent_id
+    new_parent_id = payload.parent_id if moving else folder.parent_id
+
+    new_parent = None
+    if moving and new_parent_id is not None:
+        new_parent = await get_user_folder(db, current_user, new_parent_id, "update")
+        if new_parent.owner_id != folder.owner_id:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Target folder belongs to another user")
+        if new_parent.path.startswith(folder.path):
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Cannot move a folder into itself")
+
+    if (moving or name != folder.name) and await name_taken(db, folder.owner_id, new_parent_id, name, exclude_id=folder.id):
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="A folder with this name already exists here")
+
+    # Rename: one column of one row
+    folder.name = name
+
+    if moving:
+        old_path = folder.path
+        new_path = f"{new_parent.path if new_parent else '/'}{folder.id}/"
+        # Subtree usage leaves the old ancestors and is added to the new ones
+        await apply_folder_usage(db, {
+            folder.parent_id: (-folder.total_size, -folder.file_count),
+            new_parent_id: (folder.total_size, folder.file_count),
+        })
+        # Files reference folders by id, so only the subtree's folder paths change (one statement)
+        await db.execute(
+            update(Folder)
+            .where(Folder.owner_id == folder.owner_id)
+            .where(subtree_filter(old_path))
+            .values(path=literal(new_path) + func.substr(Folder.path, len(old_path) + 1))
+            .execution_options(synchronize_session=False)
+        )
+        folder.parent_id = new_parent_id
+        folder.path = new_path
+
+    await db.commit()
+    await db.refresh(folder)
+    return _folder_out(folder)
+
+@router.delete("/{folder_id}", summary="Delete a folder (recursive=true also deletes its contents)")
+async def delete_folder(
+    folder_id: int,
+    recursive: bool = False,
+    db: AsyncSession = Depends(get_session),
+    current_user: User = Depends(get_current_user),
+):
+    folder = await get_user_folder(db, current_user, folder_id, "delete")
+    subfolders = (await db.execute(
+        select(func.count(Folder.id)).where(Folder.owner_id == folder.owner_id).where(subtree_filter(folder.path))
+    )).scalar_one() - 1
+    if (folder.file_count or subfolders) and not recursive:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Folder is not empty")
+
+    deleted_ids, errors = await delete_folder_tree(db, folder)
+    if deleted_ids:
+        await log_actions(db, current_user.id, "delete", deleted_ids, {"folder_id": folder_id})
+
+    failed = [{"detail": error} for error in errors]
+    if failed:
+        return JSONResponse({"message": "Folder deleted", "deleted_files": len(deleted_ids), "failed_to_delete": failed})
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+@router.post("/move-files", summary="Move files into a folder (folder_id null = top level)")
+async def move_files(
+    payload: MoveFilesIn,
+    db: AsyncSession = Depends(get_session),
+    current_user: User = Depends(get_current_user),
+):
+    if not payload.file_ids:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="File IDs list cannot be empty")
+    target = None
+    if payload.folder_id is not None:
+        target = await get_user_folder(db, current_user, payload.folder_id, "update")
+
+    requested = list(dict.fromkeys(payload.file_ids))
+    files = await filter_files_user_can(db, current_user, requested, "delete")
+    allowed = {f.id for f in files}
+    failed = [{"id": f_id, "detail": "File not found or no permission"} for f_id in requested if f_id not in allowed]
+
+    # Names already used in the target folder (versioning identity is owner + folder + filename)
+    taken_q = select(File.uploaded_by, File.filename).where(File.filename.in_([f.filename for f in files]))
+    taken_q = taken_q.where(File.folder_id.is_(None) if target is None else File.folder_id == target.id)
+    taken_q = taken_q.where(File.deleted_at.is_(None))
+    taken = set((await db.execute(taken_q)).all())
+
+    deltas = {}
+    moved = []
+    moved_by_owner = {}
+    for f in files:
+        if f.folder_id == payload.folder_id:
+            continue
+        if target is not None and target.owner_id != f.uploaded_by:
+            failed.append({"id": f.id, "detail": "Target folder belongs to another user"})
+            continue
+        if (f.uploaded_by, f.filename) in taken:
+            failed.append({"id": f.id, "detail": "A file with this name already exists in the target folder"})
+            continue
+        taken.add((f.uploaded_by, f.filename))
+        size_delta, count_delta = deltas.get(f.folder_id, (0, 0))
+        deltas[f.folder_id] = (size_delta - (f.size or 0), count_delta - 1)
+        size_delta, count_delta = deltas.get(payload.folder_id, (0, 0))
+        deltas[payload.folder_id] = (size_delta + (f.size or 0), count_delta + 1)
+        f.folder_id = payload.folder_id
+        moved.append(f.id)
+        moved_by_owner.setdefault(f.uploaded_by, []).append((f.id, "updated"))
+
+    await apply_folder_usage(db, deltas)
+    for owner_id, changes in moved_by_owner.items():
+        await record_file_changes(db, owner_id, changes)
+    await db.commit()
+    return {"moved_count": len(moved), "moved": moved, "failed_to_move": failed}
+
+@router.post("/{folder_id}/download-zip", dependencies=[Depends(heavy_rate), Depends(heavy_slot)], summary="Download a whole folder as ZIP")
+async def download_folder_zip(
+    folder_id: int,
+    background: bool = False,
+    db: AsyncSession = Depends(get_session),
+    current_user: User = Depends(get_current_user),
+):
+    folder = await get_user_folder(db, current_user, folder_id)
+    if background:
+        job = await enqueue_job(db, "download_zip", current_user.id, {"folder_id": folder.id})
+        return JSONResponse(
+            {"job_id": job.id, "status": job.status, "status_url": f"/api/jobs/{job.id}"},
+            status_code=status.HTTP_202_ACCEPTED,
+        )
+
+    entries = await subtree_files(db, folder)
+    if not entries:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Folder is empty")
+    members = zip_members([f for f, _ in entries], {f.id: arcname for f, arcname in entries})
+    return await zip_bundle_response(db, current_user.id, members, f"{folder.name}.zip")
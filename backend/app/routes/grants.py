@@ -0,0 +1,213 @@
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, delete, or_
+from sqlalchemy.exc import IntegrityError
+
+from ..db import get_session
+from ..models.file import File
+from ..models.grant import FileAccess, FileGrant
+from ..models.group import Group, GroupMember
+from ..models.user import User
+from ..schemas.grant import GrantCreateIn, GroupCreateIn, GroupMemberIn
+from ..utils.auth_deps import get_current_user
+from ..utils.grants import LEVELS, LEVEL_NAMES, rebuild_access, group_member_ids, get_manageable_group, grant_out
+from ..utils.permissions import assert_user_can_delete
+
+router = APIRouter(prefix="/api", tags=["Sharing"])
+
+# --- grants on a file (owner or admin) ---
+
+@router.post("/files/{file_id}/grants", status_code=status.HTTP_201_CREATED, summary="Share a file with a user or a group")
+async def create_grant(
+    file_id: int,
+    payload: GrantCreateIn,
+    db: AsyncSession = Depends(get_session),
+    current_user: User = Depends(get_current_user),
+):
+    file_obj = await assert_user_can_delete(db, current_user, file_id)
+    if payload.user_id is not None:
+        if payload.user_id == file_obj.uploaded_by:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="The owner already has full access")
+        if await db.get(User, payload.user_id) is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
+        existing_q = select(FileGrant).where(FileGrant.file_id == file_id, FileGrant.grantee_user_id == payload.user_id)
+        affected = [payload.user_id]
+    else:
+        if await db.get(Group, payload.group_id) is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Group not found")
+        existing_q = select(FileGrant).where(FileGrant.file_id == file_id, FileGrant.grantee_group_id == payload.group_id)
+        affected = await group_member_ids(db, payload.group_id)
+
+    # Granting again changes the level
+    grant = (await db.execute(existing_q)).scalar_one_or_none()
+    if grant is None:
+        grant = FileGrant(
+            file_id=file_id, grantee_user_id=payload.user_id, grantee_group_id=payload.group_id, created_by=current_user.id,
+        )
+        db.add(grant)
+    grant.level = LEVELS[payload.level]
+    await db.flush()
+    await rebuild_access(db, user_ids=affected, file_ids=[file_id])
+    await db.commit()
+    return grant_out(grant)
+
+@router.get("/files/{file_id}/grants", summary="List who a file is shared with")
+async def list_grants(
+    file_id: int,
+    db: AsyncSession = Depends(get_session),
+    current_user: User = Depends(get_current_user),
+):
+    await assert_user_can_delete(db, current_user, file_id)
+    res = await db.execute(select(FileGrant).where(FileGrant.file_id == file_id).order_by(FileGrant.id))
+    return [grant_out(g) for g in res.scalars().all()]
+
+@router.delete("/grants/{grant_id}", status_code=status.HTTP_204_NO_CONTENT, summary="Stop sharing a file with a user or group")
+async def delete_grant(
+    grant_id: int,
+    db: AsyncSession = Depends(get_session),
+    current_user: User = Depends(get_current_user),
+):
+    grant = await db.get(FileGrant, grant_id)
+    if grant is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Grant not found")
+    await assert_user_can_delete(db, current_user, grant.file_id)
+
+    if grant.grantee_user_id is not None:
+        affected = [grant.grantee_user_id]
+    else:
+        affected = await group_member_ids(db, grant.grantee_group_id)
+    file_id = grant.file_id
+    await db.delete(grant)
+    await db.flush()
+    await rebuild_access(db, user_ids=affected, file_ids=[file_id])
+    await db.commit()
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+# --- shared with me ---
+
+@router.get("/files/shared", summary="Files shared with me (keyset pagination, newest grant target first)")
+async def list_shared_with_me(
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[int] = Query(None, description="next_cursor of the previous page"),
+    db: AsyncSession = Depends(get_session),
+    current_user: User = Depends(get_current_user),
+):
+    # Walks the (user_id, file_id) primary key of the access index backwards, like an owned listing walks its index
+    q = (
+        select(File.id, File.filename, File.size, File.uploaded_at, File.uploaded_by, FileAccess.level)
+        .join(File, File.id == FileAccess.file_id)
+        .where(FileAccess.user_id == current_user.id)
+        .where(File.deleted_at.is_(None))
+    )
+    if cursor is not None:
+        q = q.where(FileAccess.file_id < cursor)
+    res = await db.execute(q.order_by(FileAccess.file_id.desc()).limit(limit + 1))
+    rows = res.all()
+    items = [
+        {
+            "id": r.id,
+            "filename": r.filename,
+            "size": r.size,
+            "uploaded_at": r.uploaded_at.isoformat() if r.uploaded_at else None,
+            "owner_id": r.uploaded_by,
+            "level": LEVEL_NAMES[r.level],
+        }
+        for r in rows[:limit]
+    ]
+    next_cursor = items[-1]["id"] if len(rows) > limit else None
+    return {"items": items, "next_cursor": next_cursor}
+
+# --- groups ---
+
+@router.post("/groups", status_code=status.HTTP_201_CREATED, summary="Create a group (you are its owner and first member)")
+async def create_group(
+    payload: GroupCreateIn,
+    db: AsyncSession = Depends(get_session),
+    current_user: User = Depends(get_current_user),
+):
+    group = Group(name=payload.name, owner_id=current_user.id)
+    db.add(group)
+    try:
+        await db.flush()
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Group name already taken")
+    db.add(GroupMember(group_id=group.id, user_id=current_user.id))
+    await db.commit()
+    return {"id": group.id, "name": group.name, "owner_id": group.owner_id}
+
+@router.get("/groups", summary="Groups I own or belong to")
+async def list_my_groups(
+    db: AsyncSession = Depends(get_session),
+    current_user: User = Depends(get_current_user),
+):
+    member_of = select(GroupMember.group_id).where(GroupMember.user_id == current_user.id)
+    res = await db.execute(
+        select(Group).where(or_(Group.owner_id == current_user.id, Group.id.in_(member_of))).order_by(Group.name)
+    )
+    return [{"id": g.id, "name": g.name, "owner_id": g.owner_id} for g in res.scalars().all()]
+
+@router.get("/groups/{group_id}/members", summary="List the members of a group")
+async def list_group_members(
+    group_id: int,
+    db: AsyncSession = Depends(get_session),
+    current_user: User = Depends(get_current_user),
+):
+    members = await group_member_ids(db, group_id)
+    if current_user.id not in members:
+        await get_manageable_group(db, current_user, group_id)
+    res = await db.execute(select(User.id, User.username).where(User.id.in_(members)).order_by(User.username))
+    return [{"user_id": r.id, "username": r.username} for r in res.all()]
+
+@router.post("/groups/{group_id}/members", status_code=status.HTTP_201_CREATED, summary="Add a user to a group")
+async def add_group_member(
+    group_id: int,
+    payload: GroupMemberIn,
+    db: AsyncSession = Depends(get_session),
+    current_user: User = Depends(get_current_user),
+):
+    await get_manageable_group(db, current_user, group_id)
+    if await db.get(User, payload.user_id) is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
+    if await db.get(GroupMember, (group_id, payload.user_id)) is None:
+        db.add(GroupMember(group_id=group_id, user_id=payload.user_id))
+        await db.flush()
+        # The new member gets every file shared with the group
+        await rebuild_access(db, user_ids=[payload.user_id])
+        await db.commit()
+    return {"group_id": group_id, "user_id": payload.user_id}
+
+@router.delete("/groups/{group_id}/members/{user_id}", status_code=status.HTTP_204_NO_CONTENT, summary="Remove a user from a group")
+async def remove_group_member(
+    group_id: int,
+    user_id: int,
+    db: AsyncSession = Depends(get_session),
+    current_user: User = Depends(get_current_user),
+):
+    if user_id != current_user.id:  # leaving a group is always allowed
+        await get_manageable_group(db, current_user, group_id)
+    member = await db.get(GroupMember, (group_id, user_id))
+    if member is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not a member of this group")
+    await db.delete(member)
+    await db.flush()
+    await rebuild_access(db, user_ids=[user_id])
+    await db.commit()
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+@router.delete("/groups/{group_id}", status_code=status.HTTP_204_NO_CONTENT, summary="Delete a group and its grants")
+async def delete_group(
+    group_id: int,
+    db: AsyncSession = Depends(get_session),
+    current_user: User = Depends(get_current_user),
+):
+    group = await get_manageable_group(db, current_user, group_id)
+    members = await group_member_ids(db, group_id)
+    await db.execute(delete(FileGrant).where(FileGrant.grantee_group_id == group_id))
+    await db.execute(delete(GroupMember).where(GroupMember.group_id == group_id))
+    await db.delete(group)
+    await db.flush()
+    await rebuild_access(db, user_ids=members)
+    await db.commit()
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
@@ -0,0 +1,94 @@
+import os
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import FileResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, update
+
+from ..db import get_session
+from ..models.job import Job
+from ..models.user import User
+from ..storage import _abs_under_root
+from ..utils.auth_deps import get_current_user
+from ..utils.permissions import check_permission
+
+router = APIRouter(prefix="/api/jobs", tags=["Jobs"])
+
+def _job_out(job: Job) -> dict:
+    return {
+        "id": job.id,
+        "type": job.type,
+        "status": job.status,
+        "priority": job.priority,
+        "progress": job.progress,
+        "progress_message": job.progress_message,
+        "result": job.result,
+        "has_artifact": bool(job.result_path),
+        "result_url": f"/api/jobs/{job.id}/result" if job.status == "succeeded" else None,
+        "error": job.error,
+        "created_at": job.created_at.isoformat() if job.created_at else None,
+        "started_at": job.started_at.isoformat() if job.started_at else None,
+        "finished_at": job.finished_at.isoformat() if job.finished_at else None,
+    }
+
+async def _get_own_job(db: AsyncSession, user: User, job_id: str) -> Job:
+    job = await db.get(Job, job_id)
+    if not job:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Job not found")
+    # Admins (the only role allowed to delete user accounts) can see every job
+    if job.user_id != user.id and not check_permission(user, "delete", "user_account"):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="No permission for this job")
+    return job
+
+@router.get("", summary="List my recent jobs")
+async def list_jobs(
+    limit: int = 50,
+    db: AsyncSession = Depends(get_session),
+    current_user: User = Depends(get_current_user),
+):
+    res = await db.execute(
+        select(Job).where(Job.user_id == current_user.id).order_by(Job.created_at.desc()).limit(min(limit, 200))
+    )
+    return [_job_out(j) for j in res.scalars().all()]
+
+@router.get("/{job_id}", summary="Get job status and progress")
+async def get_job(
+    job_id: str,
+    db: AsyncSession = Depends(get_session),
+    current_user: User = Depends(get_current_user),
+):
+    return _job_out(await _get_own_job(db, current_user, job_id))
+
+@router.get("/{job_id}/result", summary="Fetch the result (artifact download or JSON) of a finished job")
+async def get_job_result(
+    job_id: str,
+    db: AsyncSession = Depends(get_session),
+    current_user: User = Depends(get_current_user),
+):
+    job = await _get_own_job(db, current_user, job_id)
+    if job.status != "succeeded":
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=f"Job is {job.status}")
+    if not job.result_path:
+        return job.result or {}
+
+    abs_path = _abs_under_root(job.result_path)
+    if not os.path.isfile(abs_path):
+        raise HTTPException(status_code=status.HTTP_410_GONE, detail="Job result has expired")
+    return FileResponse(path=abs_path, filename=job.result_filename or os.path.basename(abs_path), media_type="application/octet-stream")
+
+@router.delete("/{job_id}", summary="Cancel a queued or running job")
+async def cancel_job(
+    job_id: str,
+    db: AsyncSession = Depends(get_session),
+    current_user: User = Depends(get_current_user),
+):
+    job = await _get_own_job(db, current_user, job_id)
+    # Queued jobs are cancelled right away; running ones stop at their next progress report
+    await db.execute(
+        update(Job).where(Job.id == job_id).where(Job.status == "queued").values(status="cancelled")
+    )
+    await db.execute(
+        update(Job).where(Job.id == job_id).where(Job.status == "running").values(cancel_requested=1)
+    )
+    await db.commit()
+    await db.refresh(job)
+    return _job_out(job)
@@ -1,14 +1,18 @@
 from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from fastapi.responses import JSONResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import func, select, desc
 from typing import Optional
-import csv
 from io import StringIO
 from datetime import date, timedelta
 from ..db import get_session
 from ..models.log_book import LogBook
 from ..models.user import User # Dodano import
 from ..utils.auth_deps import require_roles # Dodano import
+from ..utils.jobs import enqueue_job
+from ..utils.admission import heavy_slot
+from ..utils.json_rows import rows_response
+from ..utils.logging import LOGBOOK_CSV_FIELDS, logbook_csv_row
 
 router = APIRouter(prefix="/api/logbook", tags = ["LogBook"])
 
@@ -21,8 +25,10 @@ async def get_logbook_entries(
     sort_by: str = Query("timestamp_desc", description="Sortt by timestamp"),
     db: AsyncSession = Depends(get_session),
     current_user: User = Depends(require_roles("admin")), # Zabezpieczenie dostępu
+    row_format: str = Query("objects", alias="format", description="objects | columnar"),
 ):
-    query = select(LogBook)
+    # Columns only: no joined user/file loading, encoded straight from the rows
+    query = select(LogBook.id, LogBook.user_id, LogBook.action, LogBook.timestamp, LogBook.file_id, LogBook.details)
 
     if user_id is not None:
         query = query.filter(LogBook.user_id == user_id)
@@ -39,20 +45,8 @@ async def get_logbook_entries(
     else:
         query = query.order_by(desc(LogBook.timestamp))
     
-    result = await db.execute(query)
-    entries = result.scalars().all()
-    
-    return[
-        {
-            "id": entry.id,
-            "user_id": entry.user_id,
-            "action": entry.action,
-            "timestamp": entry.timestamp.isoformat(),
-            "file_id": entry.file_id,
-            "details": entry.details
-        }
-        for entry in entries
-    ]
+    result = await db.stream(query)
+    return await rows_response(result, ("id", "user_id", "action", "timestamp", "file_id", "details"), row_format)
 
 @router.get("/stats")
 async def get_logbook_stats(
@@ -74,11 +68,19 @@ async def get_logbook_stats(
     
     return stats
 
-@router.get("/export", response_class=Response, name="export_logbook_to_csv")
+@router.get("/export", response_class=Response, name="export_logbook_to_csv", dependencies=[Depends(heavy_slot)])
 async def export_logbook_to_csv(
+    background: bool = Query(False, description="Build the CSV in a background job"),
     db: AsyncSession = Depends(get_session),
     current_user: User = Depends(require_roles("admin")), # Zabezpieczenie dostępu
 ):
+    if background:
+        job = await enqueue_job(db, "logbook_export", current_user.id)
+        return JSONResponse(
+            {"job_id": job.id, "status": job.status, "status_url": f"/api/jobs/{job.id}"},
+            status_code=status.HTTP_202_ACCEPTED,
+        )
+
     result = await db.execute(
         select(LogBook).order_by(desc(LogBook.timestamp))
     )
@@ -87,20 +89,14 @@ async def export_logbook_to_csv(
     if not entries:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No log entries")
     
+    import csv  # rarely used: loaded on the first export
+
     output=StringIO()
-    fieldnames = ['id', 'user_id', 'action', 'timestamp', 'file_id', 'details']
-    writer = csv.DictWriter(output, fieldnames=fieldnames)
+    writer = csv.DictWriter(output, fieldnames=LOGBOOK_CSV_FIELDS)
     writer.writeheader()
 
     for entry in entries:
-        writer.writerow({
-            'id': entry.id,
-            'user_id': entry.user_id,
-            'action': entry.action,
-            'timestamp': entry.timestamp.isoformat() if entry.timestamp else '',
-            'file_id': entry.file_id,
-            'details': str(entry.details)
-        })
+        writer.writerow(logbook_csv_row(entry))
     
     return Response(
         content=output.getvalue(),
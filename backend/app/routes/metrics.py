@@ -0,0 +1,14 @@
+import hmac
+from fastapi import APIRouter, HTTPException, Request, Response, status
+from ..utils.config import METRICS_TOKEN
+from ..utils.metrics import render_metrics
+
+router = APIRouter(prefix="", tags=["Metrics"])
+
+@router.get("/metrics", include_in_schema=False)
+async def metrics(request: Request):
+    if METRICS_TOKEN:
+        supplied = request.headers.get("authorization", "").removeprefix("Bearer ").strip()
+        if not hmac.compare_digest(supplied, METRICS_TOKEN):
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid metrics token")
+    return Response(content=render_metrics(), media_type="text/plain; version=0.0.4")
@@ -0,0 +1,56 @@
+import os
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from fastapi.responses import FileResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..db import get_session
+from ..models.file_version import FileVersion
+from ..models.user import User
+from ..storage import _abs_under_root
+from ..utils.auth_deps import get_current_user
+from ..utils.permissions import assert_user_can_download
+from ..utils.previews import THUMB_SIZES, preview_kinds, derivative_rel_path, media_type_for, request_previews
+
+router = APIRouter(prefix="/api/files", tags=["Previews"])
+
+@router.get("/{file_id}/preview", summary="Thumbnail (images) or first page (text/CSV) of the current version")
+async def get_preview(
+    file_id: int,
+    request: Request,
+    size: int = 256,
+    db: AsyncSession = Depends(get_session),
+    current_user: User = Depends(get_current_user),
+):
+    file_obj = await assert_user_can_download(db, current_user, file_id)
+    kinds = preview_kinds(file_obj.filename)
+    if not kinds:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No preview available for this file type")
+    if kinds[0].startswith("thumb_"):
+        if size not in THUMB_SIZES:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"size must be one of {list(THUMB_SIZES)}")
+        kind = f"thumb_{size}"
+    else:
+        kind = kinds[0]
+
+    res = await db.execute(
+        select(FileVersion.checksum, FileVersion.filepath)
+        .where(FileVersion.file_id == file_id)
+        .where(FileVersion.version_number == file_obj.current_version)
+    )
+    row = res.first()
+    if row is None or not row.checksum:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No preview available for this file")
+
+    # Derivatives are addressed by content, so the ETag only changes with a new version
+    etag = f'"{row.checksum}-{kind}"'
+    headers = {"ETag": etag, "Cache-Control": "private, max-age=86400"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    abs_path = _abs_under_root(derivative_rel_path(row.checksum, kind))
+    if not os.path.isfile(abs_path):
+        # Not generated yet (or generated before this file type was supported): queue it
+        await request_previews(db, row.checksum, row.filepath, file_obj.filename)
+        return Response(status_code=status.HTTP_202_ACCEPTED, headers={"Retry-After": "5"})
+    return FileResponse(path=abs_path, media_type=media_type_for(kind), headers=headers)
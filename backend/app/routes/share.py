@@ -1,41 +1,98 @@
 # backend/app/routes/share.py (NOWY PLIK)
 
-from fastapi import APIRouter, Depends, HTTPException, status
+import os
+import time
+from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
 from fastapi.responses import FileResponse
-from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
-from pathlib import Path
-from ..db import get_session
-from ..models.file import File
-from ..utils.logging import log_action
-from ..storage import _abs_under_root 
+import jwt
+from ..db import AsyncSessionLocal
+from ..utils.tiering import ensure_hot, record_blob_access
+from ..utils.security import decode_share_token
+from ..utils.share_cache import get_cached_share, resolve_share, record_share_download, claim_limited_download
+from ..utils.metrics import SHARE_CACHE, STORAGE_BYTES
+from ..utils.admission import share_rate
 
 router = APIRouter(prefix="", tags=["Share (Public)"]) # Router na głównym ścieżce /
 
-@router.get("/share/{share_id}")
+def _file_response(request: Request, abs_path: str, filename: str, checksum, extra_headers=None):
+    # Checksum jako ETag - klient/proxy może rewalidować bez transferu
+    headers = dict(extra_headers or {})
+    if checksum:
+        etag = f'"{checksum}"'
+        if request.headers.get("if-none-match") == etag:
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag, **headers})
+        headers["ETag"] = etag
+    return FileResponse(path=abs_path, filename=filename, media_type="application/octet-stream", headers=headers)
+
+@router.get("/share/{share_id}", dependencies=[Depends(share_rate)])
 async def public_download_file(
     share_id: str,
-    db: AsyncSession = Depends(get_session)
+    request: Request,
 ):
-    # 1. Znajdź plik po ID udostępniania
-    result = await db.execute(
-        select(File).where(File.share_link_id == share_id)
-    )
-    file_obj = result.scalars().first()
-    
-    if not file_obj:
+    # 1. Znajdź plik po ID udostępniania (najpierw cache w pamięci, DB tylko przy braku trafienia)
+    target = get_cached_share(share_id)
+    SHARE_CACHE.inc(result="hit" if target is not None else "miss")
+    if target is None:
+        async with AsyncSessionLocal() as db:
+            target = await resolve_share(db, share_id)
+
+    if not target:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Share link is invalid or file was deleted")
-    
-    # 2. Pobierz ścieżkę (plik musi istnieć fizycznie)
-    storage_path = file_obj.filepath
-    abs_path = _abs_under_root(storage_path) if storage_path else None
 
-    if not storage_path or not Path(abs_path).is_file():
+    if target.expires_at is not None and target.expires_at <= datetime.utcnow():
+        raise HTTPException(status_code=status.HTTP_410_GONE, detail="Share link has expired")
+
+    # 2. Plik musi istnieć fizycznie (z zimnej warstwy wraca na gorącą)
+    abs_path = await ensure_hot(target.rel_path)
+    if abs_path is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Stored file not found")
+
+    # 3. Rewalidacja (304) nie liczy się jako pobranie
+    if target.checksum and request.headers.get("if-none-match") == f'"{target.checksum}"':
+        return _file_response(request, abs_path, target.filename, target.checksum)
+
+    # 4. Linki z limitem pobrań liczone atomowo w DB; pozostałe w pamięci, zapis zbiorczo w tle
+    if target.max_downloads is not None:
+        async with AsyncSessionLocal() as db:
+            if not await claim_limited_download(db, share_id):
+                raise HTTPException(status_code=status.HTTP_410_GONE, detail="Share link download limit reached")
+        record_share_download(share_id, target.file_id)
+    else:
+        record_share_download(share_id, target.file_id, count_on_link=target.tracked)
+
+    # 5. Zwróć plik
+    record_blob_access(target.rel_path)
+    STORAGE_BYTES.inc(target.size or 0, op="download_share")
+    return _file_response(request, abs_path, target.filename, target.checksum)
+
+@router.get("/share/s/{token}", dependencies=[Depends(share_rate)])
+async def signed_download_file(
+    token: str,
+    request: Request,
+):
+    # Podpisany URL: wszystko potrzebne jest w tokenie, bez zapytań do DB
+    try:
+        claims = decode_share_token(token)
+    except jwt.ExpiredSignatureError:
+        raise HTTPException(status_code=status.HTTP_410_GONE, detail="Signed link has expired")
+    except jwt.InvalidTokenError:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Signed link is invalid")
+
+    try:
+        abs_path = await ensure_hot(claims["p"])
+    except (KeyError, ValueError):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Signed link is invalid")
+    if abs_path is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Stored file not found")
-        
-    # 3. Loguj publiczne pobieranie (user_id=None, akcja bez uwierzytelnienia)
-    await log_action(db, user_id=None, action="download_share", file_id=file_obj.id, details={"share_id": share_id})
 
-    # 4. Zwróć plik
-    filename = file_obj.filename
-    return FileResponse(path=str(abs_path), filename=filename, media_type="application/octet-stream")
\ No newline at end of file
+    # Treść jest przypięta do bloba, więc proxy może ją cache'ować aż do wygaśnięcia linku
+    max_age = max(int(claims["exp"] - time.time()), 0)
+    response = _file_response(
+        request, abs_path, claims.get("n") or os.path.basename(abs_path), claims.get("c"),
+        extra_headers={"Cache-Control": f"public, max-age={max_age}, immutable"},
+    )
+    if response.status_code == status.HTTP_200_OK:
+        record_share_download("signed", claims.get("fid"))
+        record_blob_access(claims["p"])
+    return response
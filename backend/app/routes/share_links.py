@@ -0,0 +1,129 @@
+from datetime import datetime, timedelta
+from uuid import uuid4
+from fastapi import APIRouter, Depends, HTTPException, Response, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
+from typing import List
+
+from ..db import get_session
+from ..models.file_version import FileVersion
+from ..models.share_link import ShareLink
+from ..models.user import User
+from ..schemas.share import ShareLinkCreateIn, ShareLinkOut, SignedUrlIn
+from ..utils.auth_deps import get_current_user
+from ..utils.changes import bump_change_seq
+from ..utils.config import SIGNED_SHARE_MAX_TTL_SECONDS
+from ..utils.logging import log_action
+from ..utils.permissions import assert_user_can_delete
+from ..utils.security import create_share_token
+from ..utils.share_cache import invalidate_share, pending_link_downloads
+
+router = APIRouter(prefix="/api", tags=["Share links"])
+
+def _link_out(link: ShareLink) -> ShareLinkOut:
+    return ShareLinkOut(
+        share_id=link.id,
+        share_url=f"/share/{link.id}",
+        file_id=link.file_id,
+        created_at=link.created_at,
+        expires_at=link.expires_at,
+        max_downloads=link.max_downloads,
+        download_count=(link.download_count or 0) + pending_link_downloads(link.id),
+        version_number=link.version_number,
+    )
+
+async def _get_version(db: AsyncSession, file_id: int, version_number: int) -> FileVersion:
+    res = await db.execute(
+        select(FileVersion).where(
+            (FileVersion.file_id == file_id) & (FileVersion.version_number == version_number)
+        )
+    )
+    version = res.scalar_one_or_none()
+    if not version:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Version not found")
+    return version
+
+@router.post("/files/{file_id}/shares", response_model=ShareLinkOut, summary="Create a share link with optional expiry, download limit and version")
+async def create_share_link(
+    file_id: int,
+    payload: ShareLinkCreateIn,
+    db: AsyncSession = Depends(get_session),
+    current_user: User = Depends(get_current_user),
+):
+    # Sharing is limited to the owner (assert_user_can_delete checks ownership)
+    file_obj = await assert_user_can_delete(db, current_user, file_id)
+    if payload.version_number is not None:
+        await _get_version(db, file_id, payload.version_number)
+
+    link = ShareLink(
+        id=str(uuid4()),
+        file_id=file_id,
+        created_by=current_user.id,
+        created_at=datetime.utcnow(),
+        expires_at=datetime.utcnow() + timedelta(seconds=payload.expires_in_seconds) if payload.expires_in_seconds else None,
+        max_downloads=payload.max_downloads,
+        download_count=0,
+        version_number=payload.version_number,
+    )
+    db.add(link)
+    await bump_change_seq(db, [file_obj.uploaded_by])
+    await db.commit()
+
+    await log_action(db, user_id=current_user.id, action="share_create", file_id=file_id, details={"share_id": link.id})
+    return _link_out(link)
+
+@router.get("/files/{file_id}/shares", response_model=List[ShareLinkOut], summary="List share links of a file")
+async def list_share_links(
+    file_id: int,
+    db: AsyncSession = Depends(get_session),
+    current_user: User = Depends(get_current_user),
+):
+    await assert_user_can_delete(db, current_user, file_id)
+    res = await db.execute(
+        select(ShareLink).where(ShareLink.file_id == file_id).order_by(ShareLink.created_at.desc())
+    )
+    return [_link_out(link) for link in res.scalars().all()]
+
+@router.delete("/shares/{share_id}", status_code=status.HTTP_204_NO_CONTENT, summary="Revoke a share link")
+async def revoke_share_link(
+    share_id: str,
+    db: AsyncSession = Depends(get_session),
+    current_user: User = Depends(get_current_user),
+):
+    link = await db.get(ShareLink, share_id)
+    if not link:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Share link not found")
+    file_obj = await assert_user_can_delete(db, current_user, link.file_id)
+
+    await db.delete(link)
+    await bump_change_seq(db, [file_obj.uploaded_by])
+    await db.commit()
+    invalidate_share(share_id)
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+@router.post("/files/{file_id}/signed-url", summary="Create a stateless signed download URL")
+async def create_signed_url(
+    file_id: int,
+    payload: SignedUrlIn,
+    db: AsyncSession = Depends(get_session),
+    current_user: User = Depends(get_current_user),
+):
+    # The URL pins the blob of the chosen version and can't be revoked before it expires,
+    # so its lifetime is capped by SIGNED_SHARE_MAX_TTL_SECONDS.
+    file_obj = await assert_user_can_delete(db, current_user, file_id)
+    if payload.expires_in_seconds > SIGNED_SHARE_MAX_TTL_SECONDS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"expires_in_seconds cannot exceed {SIGNED_SHARE_MAX_TTL_SECONDS}",
+        )
+
+    version = await _get_version(db, file_id, payload.version_number or file_obj.current_version or 1)
+    expires_delta = timedelta(seconds=payload.expires_in_seconds)
+    token = create_share_token(file_id, version.filepath, file_obj.filename, version.checksum, expires_delta)
+
+    await log_action(db, user_id=current_user.id, action="share_create", file_id=file_id, details={"signed": True, "version": version.version_number})
+    return {
+        "share_url": f"/share/s/{token}",
+        "version": version.version_number,
+        "expires_at": (datetime.utcnow() + expires_delta).isoformat(),
+    }
@@ -0,0 +1,99 @@
+from datetime import datetime, timedelta
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..db import get_session
+from ..models.file import File, TRASH_PURGE_NOW
+from ..models.user import User
+from ..utils.auth_deps import get_current_user
+from ..utils.config import TRASH_RETENTION_DAYS
+from ..utils.file_ops import restore_file_record
+from ..utils.permissions import assert_user_can_delete
+from app.utils.logging import log_action
+
+router = APIRouter(prefix="/api/trash", tags=["Trash"])
+
+def _parse_cursor(cursor: str):
+    # "<deleted_at ISO>|<file id>" from next_cursor
+    try:
+        deleted_at, file_id = cursor.rsplit("|", 1)
+        return datetime.fromisoformat(deleted_at), int(file_id)
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+@router.get("", summary="Files in my trash (most recently deleted first, keyset pagination)")
+async def list_trash(
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
+    db: AsyncSession = Depends(get_session),
+    current_user: User = Depends(get_current_user),
+):
+    q = (
+        select(File.id, File.filename, File.size, File.folder_id, File.deleted_at)
+        .where(File.deleted_at.is_not(None))
+        .where(File.deleted_at > TRASH_PURGE_NOW)
+        .where(File.uploaded_by == current_user.id)
+    )
+    if cursor is not None:
+        deleted_at, file_id = _parse_cursor(cursor)
+        q = q.where((File.deleted_at < deleted_at) | ((File.deleted_at == deleted_at) & (File.id < file_id)))
+    res = await db.execute(q.order_by(File.deleted_at.desc(), File.id.desc()).limit(limit + 1))
+    rows = res.all()
+    items = [
+        {
+            "id": r.id,
+            "filename": r.filename,
+            "size": r.size,
+            "folder_id": r.folder_id,
+            "deleted_at": r.deleted_at.isoformat(),
+            "purge_after": (r.deleted_at + timedelta(days=TRASH_RETENTION_DAYS)).isoformat(),
+        }
+        for r in rows[:limit]
+    ]
+    next_cursor = f"{rows[limit - 1].deleted_at.isoformat()}|{rows[limit - 1].id}" if len(rows) > limit else None
+    return {"items": items, "next_cursor": next_cursor}
+
+@router.post("/{file_id}/restore", summary="Restore a file from the trash")
+async def restore_file(
+    file_id: int,
+    db: AsyncSession = Depends(get_session),
+    current_user: User = Depends(get_current_user),
+):
+    file_obj = await assert_user_can_delete(db, current_user, file_id, in_trash=True)
+    file_obj = await restore_file_record(db, file_obj)
+    # NOTE: not logged, the LogBook action CheckConstraint has no 'restore' action
+    return {"id": file_obj.id, "filename": file_obj.filename, "size": file_obj.size, "folder_id": file_obj.folder_id}
+
+@router.delete("/{file_id}", status_code=status.HTTP_204_NO_CONTENT, summary="Delete a file from the trash permanently")
+async def purge_file(
+    file_id: int,
+    request: Request,
+    db: AsyncSession = Depends(get_session),
+    current_user: User = Depends(get_current_user),
+):
+    file_obj = await assert_user_can_delete(db, current_user, file_id, in_trash=True)
+    # Only marked here: the purger removes the rows and blobs on its next pass, off the request path
+    file_obj.deleted_at = TRASH_PURGE_NOW
+    await db.commit()
+    client_ip = request.client.host if request.client else None
+    await log_action(db, user_id=current_user.id, action="delete", file_id=file_id, details={"permanent": True}, ip_address=client_ip)
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+@router.delete("", summary="Empty my trash")
+async def empty_trash(
+    db: AsyncSession = Depends(get_session),
+    current_user: User = Depends(get_current_user),
+):
+    res = await db.execute(
+        update(File)
+        .where(File.deleted_at.is_not(None))
+        .where(File.deleted_at > TRASH_PURGE_NOW)
+        .where(File.uploaded_by == current_user.id)
+        .values(deleted_at=TRASH_PURGE_NOW)
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+    return {"files": res.rowcount or 0}
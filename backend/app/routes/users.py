@@ -1,12 +1,16 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func, BigInteger
 from app.db import get_session
 from app.models.user import User
 from app.models.file import File
+from app.models.retention_policy import VersionRetentionPolicy
 from app.schemas.user import UserOut, UserUpdateIn
+from app.schemas.retention import RetentionPolicyIn, RetentionPolicyOut
 from app.utils.auth_deps import get_current_user
+from app.utils.changes import change_etag, not_modified, revalidate_headers
 from app.utils.security import hash_password, verify_password
+from app.utils.retention import rules_for_user
 
 router = APIRouter(prefix="/api/users", tags=["users"])
 
@@ -71,14 +75,24 @@ async def update_user_profile(
 
 @router.get("/stats", summary="Get statistics for the current user")
 async def get_user_stats(
+    request: Request,
+    response: Response,
     db: AsyncSession = Depends(get_session),
     current_user: User = Depends(get_current_user),
 ):
     # Provides file count and total storage used by the authenticated user.
+    # 0. Nothing changed since the client's copy: 304 from the already loaded user row
+    etag = change_etag(current_user, "stats")
+    cached = not_modified(request, etag)
+    if cached is not None:
+        return cached
+    response.headers.update(revalidate_headers(etag))
+
     # 1. Count files uploaded
     files_uploaded_res = await db.execute(
         select(func.count(File.id))
         .where(File.uploaded_by == current_user.id)
+        .where(File.deleted_at.is_(None))
     )
     files_uploaded = files_uploaded_res.scalar_one()
 
@@ -87,6 +101,7 @@ async def get_user_stats(
     storage_used_res = await db.execute(
         select(func.sum(File.size).cast(BigInteger))
         .where(File.uploaded_by == current_user.id)
+        .where(File.deleted_at.is_(None))
     )
     # sum() returns None if no rows match
     total_bytes = storage_used_res.scalar_one() or 0
@@ -94,4 +109,42 @@ async def get_user_stats(
     return {
         "files_uploaded": files_uploaded,
         "storage_used": format_bytes(total_bytes)
-    }
\ No newline at end of file
+    }
+
+@router.get("/retention", response_model=RetentionPolicyOut, summary="Get the version retention policy applied to my files")
+async def get_retention_policy(
+    db: AsyncSession = Depends(get_session),
+    current_user: User = Depends(get_current_user),
+):
+    rules, source = await rules_for_user(db, current_user.id)
+    return RetentionPolicyOut(source=source, **vars(rules))
+
+@router.put("/retention", response_model=RetentionPolicyOut, summary="Set my own version retention policy")
+async def set_retention_policy(
+    payload: RetentionPolicyIn,
+    db: AsyncSession = Depends(get_session),
+    current_user: User = Depends(get_current_user),
+):
+    # Replaces the global policy for this user; all-null keeps every version
+    policy = await db.get(VersionRetentionPolicy, current_user.id)
+    if policy is None:
+        policy = VersionRetentionPolicy(user_id=current_user.id)
+        db.add(policy)
+    for field, value in payload.model_dump().items():
+        setattr(policy, field, value)
+    await db.commit()
+
+    return RetentionPolicyOut(source="user", **payload.model_dump())
+
+@router.delete("/retention", response_model=RetentionPolicyOut, summary="Fall back to the global version retention policy")
+async def reset_retention_policy(
+    db: AsyncSession = Depends(get_session),
+    current_user: User = Depends(get_current_user),
+):
+    policy = await db.get(VersionRetentionPolicy, current_user.id)
+    if policy is not None:
+        await db.delete(policy)
+        await db.commit()
+
+    rules, source = await rules_for_user(db, current_user.id)
+    return RetentionPolicyOut(source=source, **vars(rules))
@@ -1,5 +1,11 @@
+from typing import Literal, Optional
 from pydantic import BaseModel
 from app.models.user import UserRole
 
 class AdminRoleUpdateIn(BaseModel):
-    role: UserRole
\ No newline at end of file
+    role: UserRole
+class ImportTreeIn(BaseModel):
+    source: str  # server-local directory, inside IMPORT_ALLOWED_ROOTS
+    owner_id: int
+    folder_id: Optional[int] = None  # target folder of the owner (None = top level)
+    link_mode: Optional[Literal["reflink", "hardlink", "copy"]] = None
@@ -1,6 +1,6 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from datetime import datetime
-from typing import List
+from typing import List, Literal, Optional
 
 class FileInfoOut(BaseModel):
     id: int
@@ -15,3 +15,14 @@ class FileInfoOut(BaseModel):
 
 class DeleteBatchIn(BaseModel):
     file_ids: List[int]
+
+class UploadPreflightIn(BaseModel):
+    filename: str = Field(..., min_length=1, max_length=255)
+    checksum: str = Field(..., pattern="^[0-9a-fA-F]{64}$")  # of the content, see app/utils/hashing.py
+    checksum_algo: Literal["sha256", "sha256-tree", "blake3-tree"] = "sha256"
+    size: int = Field(..., ge=0)
+    notes: Optional[str] = None
+    folder_id: Optional[int] = None  # target folder (None = top level)
+
+class UploadProofIn(BaseModel):
+    digest: str = Field(..., pattern="^[0-9a-fA-F]{64}$")  # sha256(nonce + bytes of the ranges), see app/utils/hashing.py
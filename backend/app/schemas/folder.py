@@ -0,0 +1,15 @@
+from pydantic import BaseModel, Field
+from typing import List, Optional
+
+class FolderCreateIn(BaseModel):
+    name: str = Field(..., min_length=1, max_length=255)
+    parent_id: Optional[int] = None  # None = top level
+
+class FolderUpdateIn(BaseModel):
+    # Rename and/or move; send "parent_id": null explicitly to move to the top level
+    name: Optional[str] = Field(None, min_length=1, max_length=255)
+    parent_id: Optional[int] = None
+
+class MoveFilesIn(BaseModel):
+    file_ids: List[int]
+    folder_id: Optional[int] = None  # None = top level
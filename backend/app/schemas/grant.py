@@ -0,0 +1,20 @@
+from pydantic import BaseModel, Field, model_validator
+from typing import Literal, Optional
+
+class GrantCreateIn(BaseModel):
+    # Exactly one of user_id / group_id
+    user_id: Optional[int] = None
+    group_id: Optional[int] = None
+    level: Literal["read", "write"] = "read"
+
+    @model_validator(mode="after")
+    def _one_grantee(self):
+        if (self.user_id is None) == (self.group_id is None):
+            raise ValueError("Give exactly one of user_id or group_id")
+        return self
+
+class GroupCreateIn(BaseModel):
+    name: str = Field(..., min_length=1, max_length=100)
+
+class GroupMemberIn(BaseModel):
+    user_id: int
@@ -0,0 +1,12 @@
+from pydantic import BaseModel, Field
+from typing import Optional
+
+class RetentionPolicyIn(BaseModel):
+    # Omitted / null fields mean "no limit" for that rule
+    keep_last: Optional[int] = Field(None, ge=1)
+    keep_daily_days: Optional[int] = Field(None, ge=1)
+    keep_monthly_months: Optional[int] = Field(None, ge=1)
+    max_history_bytes: Optional[int] = Field(None, ge=0)
+
+class RetentionPolicyOut(RetentionPolicyIn):
+    source: str  # "user" or "global"
@@ -0,0 +1,23 @@
+from pydantic import BaseModel, Field
+from typing import Optional
+from datetime import datetime
+
+class ShareLinkCreateIn(BaseModel):
+    # Omitted fields mean: never expires / unlimited downloads / always the current version
+    expires_in_seconds: Optional[int] = Field(None, ge=1)
+    max_downloads: Optional[int] = Field(None, ge=1)
+    version_number: Optional[int] = Field(None, ge=1)
+
+class ShareLinkOut(BaseModel):
+    share_id: str
+    share_url: str
+    file_id: int
+    created_at: datetime
+    expires_at: Optional[datetime]
+    max_downloads: Optional[int]
+    download_count: int
+    version_number: Optional[int]
+
+class SignedUrlIn(BaseModel):
+    expires_in_seconds: int = Field(3600, ge=1)
+    version_number: Optional[int] = Field(None, ge=1)
@@ -12,6 +12,11 @@ class UserOut(BaseModel):
     class Config:
         from_attributes = True
 
+class AdminUserOut(UserOut):
+    # Usage of files outside the trash (users.file_count / used_bytes)
+    file_count: int
+    used_bytes: int
+
 class UserUpdateIn(BaseModel):
     # Schema for updating a user's profile
     # Optional fields for partial updates
@@ -0,0 +1,40 @@
+"""
+Multi-process entry point:
+
+    cd backend
+    WEB_WORKERS=8 python -m app.serve --host 0.0.0.0 --port 8000
+
+Starts WEB_WORKERS (default: CPU count) uvicorn worker processes on one socket, with uvloop and
+httptools when installed. Workers share state through the database and app/utils/cluster.py
+(cache invalidation, one maintenance leader); see docs/backend/operations/serving.md.
+Run `alembic upgrade head` first - workers only check the schema version.
+"""
+import argparse
+import importlib.util
+import os
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="Run the API with several worker processes")
+    p.add_argument("--host", default=os.getenv("HOST", "127.0.0.1"))
+    p.add_argument("--port", type=int, default=int(os.getenv("PORT", "8000")))
+    p.add_argument("--workers", type=int, default=int(os.getenv("WEB_WORKERS") or os.cpu_count() or 1))
+    p.add_argument("--proxy-headers", action="store_true", help="trust X-Forwarded-* (behind a reverse proxy)")
+    args = p.parse_args(argv)
+
+    # Read by app.utils.config in every worker: sizes the per-worker DB pool
+    os.environ["WEB_WORKERS"] = str(args.workers)
+
+    import uvicorn
+    uvicorn.run(
+        "app.main:app",
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        loop="uvloop" if importlib.util.find_spec("uvloop") else "asyncio",
+        http="httptools" if importlib.util.find_spec("httptools") else "h11",
+        proxy_headers=args.proxy_headers,
+        access_log=False,
+    )
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,15 @@
-import os, re, uuid, asyncio
+import os, re, uuid, asyncio, gzip
 from pathlib import Path
 import aiofiles
-import hashlib
+import time
+from .utils.metrics import STORAGE_OP_SECONDS, STORAGE_BYTES
+from .utils.config import STORAGE_ROOT, COLD_STORAGE_ROOT
+from .utils.hashing import Digest, StreamHasher
 
-LOCAL_ROOT = "/srv/file-ops/data"
+LOCAL_ROOT = STORAGE_ROOT
+# Cold tier (app/utils/tiering.py): a blob's copy is <rel>.gz (compressed) or <rel>.raw under COLD_ROOT
+COLD_ROOT = COLD_STORAGE_ROOT
+COLD_SUFFIXES = (".gz", ".raw")
 SAFE = re.compile(r"[^A-Za-z0-9._-]+")
 
 def safe_name(name: str) -> str:
@@ -24,12 +30,39 @@ def _abs_under_root(rel: str) -> str:
     Path(os.path.dirname(path)).mkdir(parents=True, exist_ok=True)
     return path
 
+def cold_abs_path(rel: str, compressed: bool) -> str:
+    root = os.path.abspath(COLD_ROOT)
+    path = os.path.abspath(os.path.join(root, rel + (".gz" if compressed else ".raw")))
+    if not path.startswith(root + os.sep):
+        raise ValueError("path traversal")
+    return path
+
+def locate_blob(rel: str):
+    """Where the blob's bytes are now: the hot path, its cold copy, or None. Blocking (stat calls)."""
+    hot = _abs_under_root(rel)
+    if os.path.isfile(hot):
+        return hot
+    if COLD_ROOT:
+        for compressed in (True, False):
+            cold = cold_abs_path(rel, compressed)
+            if os.path.isfile(cold):
+                return cold
+    return None
+
+def is_compressed_copy(abs_path: str) -> bool:
+    return bool(COLD_ROOT) and abs_path.endswith(".gz") and abs_path.startswith(os.path.abspath(COLD_ROOT) + os.sep)
 
-async def save_upload_stream(upload_file, dest_rel: str) -> tuple[int, str]: # Zmieniono typ zwracany
+def open_blob(abs_path: str):
+    # Binary reader for a path from locate_blob (cold .gz copies are decompressed on the fly)
+    return gzip.open(abs_path, "rb") if is_compressed_copy(abs_path) else open(abs_path, "rb")
+
+
+async def save_upload_stream(upload_file, dest_rel: str, algo: str | None = None) -> Digest:
+    # algo: HASH_ALGORITHM by default; hashing runs in worker threads (app/utils/hashing.py)
+    started = time.perf_counter()
     final_path = _abs_under_root(dest_rel)
     tmp_path = final_path + f".{uuid.uuid4().hex}.part"
-    size = 0
-    hasher = hashlib.sha256() # Inicjalizacja hashera
+    hasher = StreamHasher(algo)
 
     await upload_file.seek(0) # Upewnij się, że zaczynamy czytać od początku
 
@@ -37,10 +70,24 @@ async def save_upload_stream(upload_file, dest_rel: str) -> tuple[int, str]: # Z
         while True:
             chunk = await upload_file.read(1024 * 1024) # 1 MB chunks
             if not chunk: break
-            size += len(chunk)
-            hasher.update(chunk) # Aktualizacja sumy kontrolnej
+            await hasher.update(chunk) # Aktualizacja sumy kontrolnej
             await f.write(chunk)
     
     os.replace(tmp_path, final_path)
-    checksum = hasher.hexdigest()
-    return size, checksum
\ No newline at end of file
+    digest = await hasher.digest()
+    STORAGE_OP_SECONDS.observe(time.perf_counter() - started, op="upload_write")
+    STORAGE_BYTES.inc(digest.size, op="upload_write")
+    return digest
+
+def unlink_rel_paths(rel_paths) -> list[str]:
+    """Removes stored blobs from disk. Blocking: call via asyncio.to_thread from async code. Returns errors."""
+    errors = []
+    for rel in rel_paths:
+        try:
+            Path(_abs_under_root(rel)).unlink(missing_ok=True)
+            if COLD_ROOT:
+                for compressed in (True, False):
+                    Path(cold_abs_path(rel, compressed)).unlink(missing_ok=True)
+        except Exception as e:
+            errors.append(f"{rel}: {e}")
+    return errors
@@ -0,0 +1,142 @@
+import asyncio
+import shutil
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, Optional
+
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.file import File
+from app.models.file_change import FileChange
+from app.models.folder import Folder
+from app.models.grant import FileAccess, FileGrant
+from app.models.group import Group, GroupMember
+from app.models.job import Job
+from app.models.log_book import LogBook
+from app.models.retention_policy import VersionRetentionPolicy
+from app.models.share_link import ShareLink
+from app.models.upload_session import UploadSession
+from app.models.user import User
+from app.storage import _abs_under_root, unlink_rel_paths
+from app.utils import config
+from app.utils.file_ops import _purge_rows
+from app.utils.grants import group_member_ids, rebuild_access
+from app.utils.jobs import job_artifact_rel_dir
+from app.utils.share_cache import invalidate_file_shares
+
+# Account purge. DELETE /api/admin/users/{id} only marks the user (users.deleted_at: no logins, not listed) and
+# queues the purge_account job, which removes what the account owns in ACCOUNT_PURGE_BATCH-sized transactions:
+# sharing and group rows, files with their versions, grants, share links and log references (blobs no other
+# version uses are unlinked after each commit), folders, the change journal and the remaining rows pointing at
+# the user, and finally the user itself. No transaction holds the write lock for long, and a restarted job
+# continues with whatever is left.
+
+ProgressCallback = Callable[[int, int, str], Awaitable[None]]
+
+async def schedule_account_purge(db: AsyncSession, user: User) -> None:
+    """Marks the account for purge and stops its jobs; commits."""
+    user.deleted_at = user.deleted_at or datetime.utcnow()
+    await db.execute(update(Job).where(Job.user_id == user.id).where(Job.status == "queued").values(status="cancelled"))
+    await db.execute(update(Job).where(Job.user_id == user.id).where(Job.status == "running").values(cancel_requested=1))
+    await db.commit()
+
+async def _delete_batches(db: AsyncSession, model, key, *conditions, batch_size: int) -> int:
+    # Deletes the rows matching conditions, batch_size keys per transaction
+    deleted = 0
+    while True:
+        keys = (await db.execute(select(key).where(*conditions).limit(batch_size))).scalars().all()
+        if not keys:
+            return deleted
+        await db.execute(delete(model).where(*conditions).where(key.in_(keys)).execution_options(synchronize_session=False))
+        await db.commit()
+        deleted += len(keys)
+
+async def _detach_batches(db: AsyncSession, model, column, user_id: int, batch_size: int) -> None:
+    # ON DELETE SET NULL for columns that keep their rows (log entries, grants and links the user created)
+    pk = model.__mapper__.primary_key[0]
+    while True:
+        keys = (await db.execute(select(pk).where(column == user_id).limit(batch_size))).scalars().all()
+        if not keys:
+            return
+        await db.execute(update(model).where(pk.in_(keys)).values({column.key: None}).execution_options(synchronize_session=False))
+        await db.commit()
+
+async def _purge_groups(db: AsyncSession, user_id: int) -> int:
+    # Access the user had through grants and groups, then the groups they own (one transaction per group)
+    await db.execute(delete(FileAccess).where(FileAccess.user_id == user_id))
+    await db.execute(delete(FileGrant).where(FileGrant.grantee_user_id == user_id))
+    await db.execute(delete(GroupMember).where(GroupMember.user_id == user_id))
+    await db.commit()
+    group_ids = (await db.execute(select(Group.id).where(Group.owner_id == user_id))).scalars().all()
+    for group_id in group_ids:
+        members = await group_member_ids(db, group_id)
+        await db.execute(delete(FileGrant).where(FileGrant.grantee_group_id == group_id))
+        await db.execute(delete(GroupMember).where(GroupMember.group_id == group_id))
+        await db.execute(delete(Group).where(Group.id == group_id))
+        await db.flush()
+        await rebuild_access(db, user_ids=members)
+        await db.commit()
+    return len(group_ids)
+
+async def purge_account(
+    db: AsyncSession,
+    user_id: int,
+    batch_size: Optional[int] = None,
+    progress: Optional[ProgressCallback] = None,
+) -> Dict[str, int]:
+    """Removes an account marked by schedule_account_purge with everything it owns; returns the counters."""
+    batch_size = batch_size or config.ACCOUNT_PURGE_BATCH
+    user = await db.get(User, user_id)
+    if user is None:
+        return {"files": 0, "blobs": 0, "errors": 0, "folders": 0, "groups": 0}
+    if user.deleted_at is None:
+        raise ValueError("Account is not scheduled for purge")
+
+    stats = {"files": 0, "blobs": 0, "errors": 0, "folders": 0, "groups": await _purge_groups(db, user_id)}
+    total = (await db.execute(select(func.count(File.id)).where(File.uploaded_by == user_id))).scalar_one()
+
+    # Files (trashed ones included), lowest ids first
+    while True:
+        res = await db.execute(select(File.id).where(File.uploaded_by == user_id).order_by(File.id).limit(batch_size))
+        file_ids = list(res.scalars().all())
+        if not file_ids:
+            break
+        orphaned = await _purge_rows(db, file_ids)
+        await db.commit()
+        for file_id in file_ids:
+            invalidate_file_shares(file_id)
+        errors = await asyncio.to_thread(unlink_rel_paths, orphaned) if orphaned else []
+        for error in errors:
+            print(f"Account purge: {error}")
+        stats["files"] += len(file_ids)
+        stats["blobs"] += len(orphaned) - len(errors)
+        stats["errors"] += len(errors)
+        if progress is not None:
+            await progress(stats["files"], total, f"{stats['files']}/{total} files")
+
+    # Sessions reference folders, so they go first
+    await _delete_batches(db, UploadSession, UploadSession.id, UploadSession.user_id == user_id, batch_size=batch_size)
+    stats["folders"] = await _delete_batches(db, Folder, Folder.id, Folder.owner_id == user_id, batch_size=batch_size)
+    await _delete_batches(db, FileChange, FileChange.id, FileChange.user_id == user_id, batch_size=batch_size)
+    await db.execute(delete(VersionRetentionPolicy).where(VersionRetentionPolicy.user_id == user_id))
+    await db.commit()
+    for model, column in ((LogBook, LogBook.user_id), (FileGrant, FileGrant.created_by), (ShareLink, ShareLink.created_by)):
+        await _detach_batches(db, model, column, user_id, batch_size)
+
+    # Finished jobs go with their results; one still winding down is only detached
+    finished = select(Job.id).where(Job.user_id == user_id).where(Job.status.in_(("succeeded", "failed", "cancelled")))
+    while True:
+        job_ids = (await db.execute(finished.limit(batch_size))).scalars().all()
+        if not job_ids:
+            break
+        for job_id in job_ids:
+            await asyncio.to_thread(shutil.rmtree, _abs_under_root(job_artifact_rel_dir(job_id)), True)
+        await db.execute(delete(Job).where(Job.id.in_(job_ids)))
+        await db.commit()
+    await _detach_batches(db, Job, Job.user_id, user_id, batch_size)
+
+    await db.execute(delete(User).where(User.id == user_id))
+    await db.commit()
+    if progress is not None:
+        await progress(total, total, "account removed")
+    return stats
@@ -0,0 +1,202 @@
+import asyncio
+import heapq
+import itertools
+import math
+import time
+from collections import OrderedDict, defaultdict
+from typing import Dict, List, Tuple
+
+from fastapi import Depends, HTTPException, Request, status
+
+from app.models.user import User
+from app.utils import config
+from app.utils.auth_deps import get_current_user
+from app.utils.metrics import ADMISSION, ADMISSION_IN_FLIGHT, ADMISSION_WAIT_SECONDS
+
+# Admission control, used as route dependencies next to get_current_user / require_roles:
+#   - rate_limit / ip_rate_limit: token buckets (requests per minute + burst), per user or client IP,
+#   - transfer_slot: cap on one user's concurrent transfers (held until the body is sent),
+#   - fair_slot: a few global slots for expensive endpoints, handed out by start-time fair queuing,
+#     so a user with many queued requests can't push everyone else back.
+# Rejections are 429 with Retry-After. State is per worker process (see docs/backend/operations/admission.md).
+
+def _too_many(scope: str, result: str, retry_after: float, detail: str) -> HTTPException:
+    ADMISSION.inc(scope=scope, result=result)
+    return HTTPException(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        detail=detail,
+        headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+    )
+
+def _weight(user: User) -> float:
+    return config.ADMISSION_ADMIN_WEIGHT if getattr(user.role, "name", str(user.role)) == "admin" else 1.0
+
+# --- token buckets ---
+
+class _Buckets:
+    def __init__(self, max_entries: int = 100_000):
+        # key -> [tokens, last update]; LRU-bounded (an evicted bucket was idle, i.e. full anyway)
+        self._buckets: "OrderedDict[Tuple[str, str], List[float]]" = OrderedDict()
+        self._max_entries = max_entries
+
+    def take(self, key: Tuple[str, str], per_minute: float, burst: float, cost: float = 1.0) -> float:
+        """Takes `cost` tokens; returns 0 on success, otherwise the seconds until they are available."""
+        rate = per_minute / 60.0
+        now = time.monotonic()
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = [burst, now]
+            while len(self._buckets) > self._max_entries:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+            bucket[0] = min(burst, bucket[0] + (now - bucket[1]) * rate)
+            bucket[1] = now
+        if bucket[0] >= cost:
+            bucket[0] -= cost
+            return 0.0
+        return (cost - bucket[0]) / rate if rate > 0 else 60.0
+
+_buckets = _Buckets()
+
+def rate_limit(scope: str, per_minute: float, burst: float, cost: float = 1.0):
+    async def _check(user: User = Depends(get_current_user)) -> None:
+        if not config.ADMISSION_ENABLED:
+            return
+        wait = _buckets.take((scope, f"u{user.id}"), per_minute, burst, cost)
+        if wait:
+            raise _too_many(scope, "rate_limited", wait, "Too many requests, slow down")
+    return _check
+
+def ip_rate_limit(scope: str, per_minute: float, burst: float):
+    # Public endpoints (share links): keyed by client address
+    async def _check(request: Request) -> None:
+        if not config.ADMISSION_ENABLED:
+            return
+        client = request.client.host if request.client else "unknown"
+        wait = _buckets.take((scope, client), per_minute, burst)
+        if wait:
+            raise _too_many(scope, "rate_limited", wait, "Too many requests, slow down")
+    return _check
+
+# --- per-user concurrency ---
+
+_active: Dict[Tuple[str, int], int] = defaultdict(int)
+
+def transfer_slot(scope: str, per_user: int):
+    async def _slot(user: User = Depends(get_current_user)):
+        if not config.ADMISSION_ENABLED:
+            yield
+            return
+        key = (scope, user.id)
+        if _active[key] >= per_user:
+            raise _too_many(scope, "concurrency_limited", 1, f"Too many concurrent {scope}s (limit {per_user})")
+        _active[key] += 1
+        ADMISSION.inc(scope=scope, result="admitted")
+        ADMISSION_IN_FLIGHT.inc(scope=scope)
+        try:
+            # Dependencies with yield exit after the response body is sent: the slot covers the transfer
+            yield
+        finally:
+            ADMISSION_IN_FLIGHT.dec(scope=scope)
+            _active[key] -= 1
+            if not _active[key]:
+                del _active[key]
+    return _slot
+
+# --- weighted fair queuing for expensive endpoints ---
+
+class FairQueue:
+    """
+    `capacity` concurrent slots. When they are taken, requests wait ordered by their start tag
+    max(virtual time, the user's previous finish tag), finish tag = start + cost / weight:
+    each user's requests queue behind each other, not behind other users' backlogs.
+    """
+
+    def __init__(self, scope: str, capacity: int):
+        self.scope = scope
+        self.capacity = capacity
+        self.in_use = 0
+        self.virtual_time = 0.0
+        self._finish: Dict[int, float] = {}
+        self._waiting: List[list] = []  # heap of [start tag, seq, user id, future]
+        self._queued: Dict[int, int] = defaultdict(int)
+        self._seq = itertools.count()
+
+    def _tag(self, user_id: int, cost: float, weight: float) -> float:
+        start = max(self.virtual_time, self._finish.get(user_id, 0.0))
+        self._finish[user_id] = start + cost / weight
+        if len(self._finish) > 10_000:
+            # Users whose finish tag is behind the virtual time start from it anyway
+            self._finish = {u: f for u, f in self._finish.items() if f > self.virtual_time}
+        return start
+
+    async def acquire(self, user_id: int, cost: float, weight: float, timeout: float, max_queued: int) -> None:
+        if self.in_use < self.capacity and not self._waiting:
+            self.in_use += 1
+            self.virtual_time = max(self.virtual_time, self._tag(user_id, cost, weight))
+            ADMISSION.inc(scope=self.scope, result="admitted")
+            return
+        if self._queued.get(user_id, 0) >= max_queued:
+            raise _too_many(self.scope, "queue_full", timeout, "Too many queued requests, try again later")
+
+        start = self._tag(user_id, cost, weight)
+        fut = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiting, [start, next(self._seq), user_id, fut])
+        self._queued[user_id] += 1
+        waited = time.perf_counter()
+        try:
+            await asyncio.wait_for(fut, timeout)
+        except asyncio.TimeoutError:
+            raise _too_many(self.scope, "queue_timeout", timeout, "Server busy, try again later")
+        except asyncio.CancelledError:
+            if fut.done() and not fut.cancelled():
+                self.release()  # the slot was handed over just as the client went away
+            raise
+        finally:
+            self._queued[user_id] -= 1
+            if not self._queued[user_id]:
+                del self._queued[user_id]
+            ADMISSION_WAIT_SECONDS.observe(time.perf_counter() - waited, scope=self.scope)
+        ADMISSION.inc(scope=self.scope, result="queued")
+
+    def release(self) -> None:
+        # Hand the slot to the waiter with the smallest start tag (timed-out waiters are skipped)
+        while self._waiting:
+            start, _, _, fut = heapq.heappop(self._waiting)
+            if not fut.done():
+                self.virtual_time = max(self.virtual_time, start)
+                fut.set_result(None)
+                return
+        self.in_use -= 1
+
+_queues: Dict[str, FairQueue] = {}
+
+def fair_slot(scope: str, cost: float = 1.0):
+    async def _slot(user: User = Depends(get_current_user)):
+        if not config.ADMISSION_ENABLED:
+            yield
+            return
+        queue = _queues.get(scope)
+        if queue is None:
+            queue = _queues[scope] = FairQueue(scope, config.HEAVY_MAX_CONCURRENT)
+        await queue.acquire(
+            user.id, cost, _weight(user), config.HEAVY_QUEUE_TIMEOUT_SECONDS, config.HEAVY_MAX_QUEUED_PER_USER
+        )
+        ADMISSION_IN_FLIGHT.inc(scope=scope)
+        try:
+            yield
+        finally:
+            ADMISSION_IN_FLIGHT.dec(scope=scope)
+            queue.release()
+    return _slot
+
+# Policies used by the routes
+upload_rate = rate_limit("upload", config.UPLOAD_RATE_PER_MINUTE, config.UPLOAD_RATE_BURST)
+bulk_upload_rate = rate_limit("upload", config.UPLOAD_RATE_PER_MINUTE, config.UPLOAD_RATE_BURST, cost=10)
+upload_slot = transfer_slot("upload", config.MAX_CONCURRENT_UPLOADS_PER_USER)
+download_slot = transfer_slot("download", config.MAX_CONCURRENT_DOWNLOADS_PER_USER)
+heavy_rate = rate_limit("heavy", config.HEAVY_RATE_PER_MINUTE, config.HEAVY_RATE_BURST)
+heavy_slot = fair_slot("heavy")
+bulk_heavy_slot = fair_slot("heavy", cost=4)
+share_rate = ip_rate_limit("share", config.SHARE_RATE_PER_MINUTE, config.SHARE_RATE_BURST)
@@ -0,0 +1,63 @@
+import os
+import posixpath
+import shutil
+from typing import Dict, Iterable, List, Optional, Tuple
+from app.storage import locate_blob, is_compressed_copy, open_blob
+from app.utils.tiering import record_blob_access
+
+def _unique_arcname(arcname: str, taken: set) -> str:
+    # "a.txt", "a (1).txt", "a (2).txt", ...; compared case-insensitively (extracting on Windows / macOS)
+    stem, ext = posixpath.splitext(arcname)
+    candidate, n = arcname, 0
+    while candidate.casefold() in taken:
+        n += 1
+        candidate = f"{stem} ({n}){ext}"
+    taken.add(candidate.casefold())
+    return candidate
+
+def zip_members(files: Iterable, arcnames: Optional[Dict[int, str]] = None) -> List[Tuple[object, str, str]]:
+    """
+    Resolves (file_obj, abs_path, arcname) for files whose current blob exists on disk; others are skipped.
+    abs_path may be a cold-tier copy (read in place, see add_member). arcnames maps file id -> name inside
+    the archive (default: the logical filename); a name already used gets a " (n)" suffix, so files with the
+    same name from different folders do not overwrite each other when extracted.
+    """
+    members = []
+    for file_obj in files:
+        if not file_obj.filepath:
+            print(f"Skipping {file_obj.filename}: No storage path found")
+            continue
+        abs_path = locate_blob(file_obj.filepath)
+        if abs_path is None:
+            print(f"Skipping {file_obj.filename}: File not found at {file_obj.filepath}")
+            continue
+        record_blob_access(file_obj.filepath)
+        members.append((file_obj, abs_path, (arcnames or {}).get(file_obj.id, file_obj.filename)))
+    # Suffixes go by file id (lowest keeps the plain name): the same set of files gives the same archive
+    # whatever the request order (bundle cache key)
+    taken = set()
+    unique = {
+        file_obj.id: _unique_arcname(arcname, taken)
+        for file_obj, _, arcname in sorted(members, key=lambda m: m[0].id)
+    }
+    return [(file_obj, abs_path, unique[file_obj.id]) for file_obj, abs_path, _ in members]
+
+def open_zip(target):
+    # zipfile (and zlib) are loaded on first use, not at startup
+    from zipfile import ZipFile, ZIP_DEFLATED
+    return ZipFile(target, "w", ZIP_DEFLATED)
+
+def add_member(zip_file, abs_path: str, arcname: str) -> None:
+    # Blocking. Compressed cold copies are inflated straight into the archive entry
+    if not is_compressed_copy(abs_path):
+        zip_file.write(abs_path, arcname=arcname)
+        return
+    with open_blob(abs_path) as src, zip_file.open(arcname, "w", force_zip64=True) as dst:
+        shutil.copyfileobj(src, dst, 1024 * 1024)
+
+def build_zip(target, members: List[Tuple[object, str, str]]) -> None:
+    # Blocking (reads + deflate): call via asyncio.to_thread. `target` is a path or a binary file object.
+    with open_zip(target) as zip_file:
+        for file_obj, abs_path, arcname in members:
+            # arcname ensures the file in the zip has the correct logical filename (and folder path)
+            add_member(zip_file, abs_path, arcname)
@@ -39,7 +39,7 @@ async def get_current_user(
 
     result = await db.execute(select(User).where(User.id == user_id))
     user = result.scalars().first()
-    if not user:
+    if not user or user.deleted_at is not None:  # accounts queued for purge are gone already
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found")
 
     return user
@@ -0,0 +1,32 @@
+import asyncio
+from typing import Awaitable, Callable, List
+
+from app.utils.cluster import is_maintenance_leader
+
+# Periodic maintenance loops started from lifespan in app/main.py
+_tasks: List[asyncio.Task] = []
+
+def start_periodic(name: str, interval_seconds: float, job: Callable[[], Awaitable], leader_only: bool = False) -> asyncio.Task:
+    # leader_only: host-wide maintenance that must not run once per worker process
+    async def _loop():
+        while True:
+            await asyncio.sleep(interval_seconds)
+            if leader_only and not is_maintenance_leader():
+                continue
+            try:
+                await job()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # Keep the loop alive; the next tick retries
+                print(f"Background job '{name}' failed: {e}")
+
+    task = asyncio.create_task(_loop(), name=name)
+    _tasks.append(task)
+    return task
+
+async def stop_background_tasks() -> None:
+    for task in _tasks:
+        task.cancel()
+    await asyncio.gather(*_tasks, return_exceptions=True)
+    _tasks.clear()
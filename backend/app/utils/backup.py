@@ -0,0 +1,343 @@
+import asyncio
+import json
+import os
+import shutil
+import sqlite3
+import subprocess
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.engine import make_url
+
+from app.db import AsyncSessionLocal
+from app.storage import _abs_under_root, locate_blob, open_blob
+from app.utils import config
+from app.utils.hashing import SHA256, Hasher, hash_stream
+
+# Backups of the database and the blobs it references, under BACKUP_ROOT:
+#   objects/<aa>/<checksum>[.<algo>]  content-addressed blob copies, shared by all snapshots (no suffix: sha256)
+#   snapshots/<stamp>/db.sqlite3 (SQLite online backup API) or db.dump (pg_dump -Fc)
+#   snapshots/<stamp>/manifest.json  blobs referenced by that database: [storage path, object key, size]
+# The manifest is read from the snapshot itself, so both sides describe the same instant. A run only copies
+# objects that are not stored yet (cost follows churn, not total size); each copy is verified against its
+# checksum on the way. manifest.json is written last: a snapshot without it is an interrupted run.
+
+_COPY_CHUNK = 1024 * 1024
+_STAMP = "%Y%m%dT%H%M%SZ"
+
+ProgressCallback = Callable[[int, int, str], Awaitable[None]]
+
+# Every stored path the database references: live blobs, then legacy versions / files without a blobs row
+_MANIFEST_SQL = """
+SELECT filepath, checksum, checksum_algo, size FROM blobs WHERE ref_count > 0
+UNION ALL
+SELECT filepath, MAX(checksum), MAX(checksum_algo), MAX(size) FROM file_versions
+ WHERE filepath NOT IN (SELECT filepath FROM blobs) GROUP BY filepath
+UNION ALL
+SELECT filepath, NULL, NULL, size FROM files
+ WHERE filepath <> '' AND filepath NOT IN (SELECT filepath FROM blobs)
+   AND filepath NOT IN (SELECT filepath FROM file_versions)
+"""
+
+class BackupError(RuntimeError):
+    pass
+
+def _root() -> str:
+    if not config.BACKUP_ROOT:
+        raise BackupError("Backups are disabled (BACKUP_ROOT is not set)")
+    return os.path.abspath(config.BACKUP_ROOT)
+
+def object_key(checksum: str, algo: Optional[str]) -> str:
+    return checksum if algo in (None, SHA256) else f"{checksum}.{algo}"
+
+def _split_key(key: str) -> Tuple[str, str]:
+    checksum, _, algo = key.partition(".")
+    return checksum, algo or SHA256
+
+def object_path(key: str) -> str:
+    return os.path.join(_root(), "objects", key[:2], key)
+
+def _snapshots_dir() -> str:
+    return os.path.join(_root(), "snapshots")
+
+# --- database snapshot (blocking) ---
+
+def _database_kind() -> Tuple[str, Optional[str]]:
+    url = make_url(config.DATABASE_URL)
+    if url.get_backend_name() == "sqlite":
+        if not url.database or url.database == ":memory:":
+            raise BackupError("In-memory SQLite databases cannot be backed up")
+        return "sqlite", os.path.abspath(url.database)
+    if url.get_backend_name() == "postgresql":
+        # libpq URI for pg_dump / pg_restore (no SQLAlchemy driver suffix)
+        return "postgresql", url.set(drivername="postgresql").render_as_string(hide_password=False)
+    raise BackupError(f"Unsupported database for backups: {url.get_backend_name()}")
+
+def _snapshot_database(dest_dir: str) -> str:
+    kind, target = _database_kind()
+    if kind == "sqlite":
+        dest = os.path.join(dest_dir, "db.sqlite3")
+        # Online backup: a consistent copy of a live (WAL) database, writers are not blocked
+        with sqlite3.connect(target) as src, sqlite3.connect(dest) as dst:
+            src.backup(dst)
+        return dest
+    if shutil.which("pg_dump") is None:
+        raise BackupError("pg_dump not found")
+    dest = os.path.join(dest_dir, "db.dump")
+    subprocess.run(["pg_dump", "--format=custom", "--file", dest, target], check=True)
+    return dest
+
+def _read_manifest_rows(snapshot_db: str) -> List[Tuple[str, Optional[str], Optional[str], Optional[int]]]:
+    with sqlite3.connect(snapshot_db) as conn:
+        return conn.execute(_MANIFEST_SQL).fetchall()
+
+# --- objects (blocking: run via asyncio.to_thread) ---
+
+def _hash_stored(rel_path: str) -> Optional[str]:
+    src = locate_blob(rel_path)
+    if src is None:
+        return None
+    with open_blob(src) as fin:
+        return hash_stream(fin, SHA256).checksum
+
+def _copy_verified(src_open, dest: str, key: str) -> int:
+    # Temp file + fsync + rename; the object is kept only if its content hashes to the checksum in its key
+    expected, algo = _split_key(key)
+    os.makedirs(os.path.dirname(dest), exist_ok=True)
+    tmp = dest + f".{uuid.uuid4().hex}.part"
+    hasher = Hasher(algo)
+    size = 0
+    try:
+        with src_open() as fin, open(tmp, "wb") as fout:
+            for chunk in iter(lambda: fin.read(_COPY_CHUNK), b""):
+                hasher.update(chunk)
+                fout.write(chunk)
+                size += len(chunk)
+            fout.flush()
+            os.fsync(fout.fileno())
+        actual = hasher.digest().checksum
+        if actual != expected:
+            raise BackupError(f"{algo} checksum mismatch (expected {expected}, got {actual})")
+        os.replace(tmp, dest)
+        return size
+    except BaseException:
+        Path(tmp).unlink(missing_ok=True)
+        raise
+
+def _backup_object(rel_path: str, key: str) -> int:
+    src = locate_blob(rel_path)
+    if src is None:
+        raise FileNotFoundError(f"blob missing from storage: {rel_path}")
+    return _copy_verified(lambda: open_blob(src), object_path(key), key)
+
+def _restore_object(key: str, rel_path: str) -> int:
+    return _copy_verified(lambda: open(object_path(key), "rb"), _abs_under_root(rel_path), key)
+
+async def _run_parallel(items: list, work, progress: Optional[ProgressCallback], label: str) -> None:
+    semaphore = asyncio.Semaphore(max(1, config.BACKUP_CONCURRENCY))
+    done = 0
+
+    async def _one(item):
+        nonlocal done
+        async with semaphore:
+            await work(item)
+        done += 1
+        if progress is not None:
+            await progress(done, len(items), f"{done}/{len(items)} {label}")
+
+    await asyncio.gather(*(_one(item) for item in items))
+
+# --- backup ---
+
+class _Lock:
+    # One backup / prune at a time per BACKUP_ROOT, across workers and the CLI
+    def __enter__(self):
+        import fcntl
+
+        os.makedirs(_root(), exist_ok=True)
+        self._f = open(os.path.join(_root(), ".lock"), "w")
+        try:
+            fcntl.flock(self._f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            self._f.close()
+            raise BackupError("Another backup is running")
+        return self
+
+    def __exit__(self, *exc):
+        self._f.close()
+
+async def create_backup(progress: Optional[ProgressCallback] = None) -> dict:
+    """Snapshots the database, copies the blobs not stored yet and writes the manifest; returns its summary."""
+    with _Lock():
+        stamp = datetime.utcnow().strftime(_STAMP)
+        snap_dir = os.path.join(_snapshots_dir(), stamp)
+        os.makedirs(snap_dir, exist_ok=False)
+
+        db_file = await asyncio.to_thread(_snapshot_database, snap_dir)
+        if db_file.endswith(".sqlite3"):
+            rows = await asyncio.to_thread(_read_manifest_rows, db_file)
+        else:
+            # pg_dump has its own snapshot: a blob released in between is reported missing below
+            async with AsyncSessionLocal() as db:
+                rows = (await db.execute(text(_MANIFEST_SQL))).all()
+
+        stats = {"blobs": len(rows), "copied": 0, "copied_bytes": 0, "already_stored": 0, "missing": 0, "corrupt": 0}
+        problems: List[dict] = []
+        entries: List[list] = []
+
+        async def _backup(row) -> None:
+            rel_path, checksum, algo, size = row
+            try:
+                if checksum is None:
+                    # Legacy row without a checksum: hashed here
+                    checksum, algo = await asyncio.to_thread(_hash_stored, rel_path), SHA256
+                if checksum is None:
+                    raise FileNotFoundError(f"blob missing from storage: {rel_path}")
+                key = object_key(checksum, algo)
+                if not os.path.exists(object_path(key)):
+                    copied = await asyncio.to_thread(_backup_object, rel_path, key)
+                    stats["copied_bytes"] += copied
+                    stats["copied"] += 1
+                else:
+                    stats["already_stored"] += 1
+                entries.append([rel_path, key, size])
+            except FileNotFoundError as e:
+                stats["missing"] += 1
+                problems.append({"path": rel_path, "detail": str(e)})
+            except BackupError as e:
+                stats["corrupt"] += 1
+                problems.append({"path": rel_path, "detail": str(e)})
+
+        await _run_parallel(rows, _backup, progress, "blobs")
+
+        entries.sort()
+        manifest = {
+            "created_at": stamp,
+            "database": os.path.basename(db_file),
+            "stats": stats,
+            "problems": problems,
+            "blobs": entries,
+        }
+        tmp = os.path.join(snap_dir, "manifest.json.part")
+        with open(tmp, "w") as f:
+            json.dump(manifest, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, os.path.join(snap_dir, "manifest.json"))
+    if problems:
+        print(f"Backup {stamp}: {len(problems)} blob(s) not backed up, first: {problems[0]}")
+    await prune_backups()
+    return {"snapshot": stamp, **stats}
+
+def _load_manifest(stamp: str) -> dict:
+    path = os.path.join(_snapshots_dir(), stamp, "manifest.json")
+    if not os.path.isfile(path):
+        raise BackupError(f"No complete snapshot {stamp}")
+    with open(path) as f:
+        return json.load(f)
+
+def list_backups() -> List[dict]:
+    if not config.BACKUP_ROOT or not os.path.isdir(_snapshots_dir()):
+        return []
+    out = []
+    for stamp in sorted(os.listdir(_snapshots_dir()), reverse=True):
+        try:
+            manifest = _load_manifest(stamp)
+        except (BackupError, ValueError):
+            continue
+        out.append({"snapshot": stamp, "database": manifest["database"], **manifest["stats"]})
+    return out
+
+async def prune_backups(keep: Optional[int] = None) -> dict:
+    """Keeps the newest `keep` complete snapshots, drops interrupted ones and unreferenced objects."""
+    keep = config.BACKUP_KEEP if keep is None else keep
+
+    def _prune() -> dict:
+        with _Lock():
+            snaps = sorted(os.listdir(_snapshots_dir())) if os.path.isdir(_snapshots_dir()) else []
+            complete = [s for s in snaps if os.path.isfile(os.path.join(_snapshots_dir(), s, "manifest.json"))]
+            kept = set(complete[-keep:]) if keep > 0 else set(complete)
+            removed = [s for s in snaps if s not in kept]
+            for s in removed:
+                shutil.rmtree(os.path.join(_snapshots_dir(), s), ignore_errors=True)
+
+            referenced = set()
+            for s in kept:
+                referenced.update(key for _, key, _ in _load_manifest(s)["blobs"])
+            objects_removed = 0
+            objects_dir = os.path.join(_root(), "objects")
+            for dirpath, _, names in os.walk(objects_dir):
+                for name in names:
+                    if name not in referenced:
+                        os.unlink(os.path.join(dirpath, name))
+                        objects_removed += 1
+            return {"snapshots_removed": len(removed), "objects_removed": objects_removed}
+
+    return await asyncio.to_thread(_prune)
+
+# --- restore ---
+
+async def restore_backup(stamp: str, force: bool = False, progress: Optional[ProgressCallback] = None) -> dict:
+    """
+    Restores the snapshot's database over DATABASE_URL and its blobs into STORAGE_ROOT (hot tier), verifying every
+    checksum. Meant for a stopped server (python -m app.backup restore).
+    """
+    manifest = _load_manifest(stamp)
+    snap_db = os.path.join(_snapshots_dir(), stamp, manifest["database"])
+    kind, target = _database_kind()
+
+    def _restore_database() -> None:
+        if kind == "sqlite":
+            if os.path.exists(target) and not force:
+                raise BackupError(f"{target} exists (use --force to overwrite it)")
+            tmp = target + ".restore"
+            with sqlite3.connect(snap_db) as src, sqlite3.connect(tmp) as dst:
+                src.backup(dst)
+            for suffix in ("-wal", "-shm"):
+                Path(target + suffix).unlink(missing_ok=True)
+            os.replace(tmp, target)
+        else:
+            cmd = ["pg_restore", "--dbname", target, "--no-owner"] + (["--clean", "--if-exists"] if force else []) + [snap_db]
+            subprocess.run(cmd, check=True)
+
+    await asyncio.to_thread(_restore_database)
+
+    stats = {"blobs": len(manifest["blobs"]), "restored": 0, "restored_bytes": 0, "failed": 0}
+    problems: List[dict] = []
+
+    async def _restore(entry) -> None:
+        rel_path, key, _ = entry
+        try:
+            restored = await asyncio.to_thread(_restore_object, key, rel_path)
+            stats["restored_bytes"] += restored
+            stats["restored"] += 1
+        except (OSError, BackupError) as e:
+            stats["failed"] += 1
+            problems.append({"path": rel_path, "detail": str(e)})
+
+    await _run_parallel(manifest["blobs"], _restore, progress, "blobs")
+
+    # Everything comes back to the hot tier
+    async with AsyncSessionLocal() as db:
+        await db.execute(text("UPDATE blobs SET tier = 'hot', compressed = :f"), {"f": False})
+        await db.commit()
+    return {"snapshot": stamp, **stats, "problems": problems + manifest.get("problems", [])}
+
+# --- schedule ---
+
+async def run_scheduled_backup() -> None:
+    # Entry point for the periodic loop registered in app/main.py: a backup once BACKUP_INTERVAL_SECONDS passed
+    backups = await asyncio.to_thread(list_backups)
+    if backups:
+        last = datetime.strptime(backups[0]["snapshot"], _STAMP)
+        if datetime.utcnow() - last < timedelta(seconds=config.BACKUP_INTERVAL_SECONDS):
+            return
+    try:
+        summary = await create_backup()
+    except BackupError as e:
+        print(f"Backup skipped: {e}")
+        return
+    print(f"Backup: {summary}")
@@ -0,0 +1,189 @@
+import asyncio
+import os
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, List, Optional, Set
+from sqlalchemy import select, func, update, delete, exists
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models.blob import Blob
+from app.models.blob_check import BlobCheck
+from app.models.file import File
+from app.models.file_version import FileVersion
+from app.storage import _abs_under_root, locate_blob, is_compressed_copy
+from app.utils.hashing import SHA256, Digest
+
+def _exists_on_disk(rel_path: str) -> bool:
+    try:
+        return os.path.isfile(_abs_under_root(rel_path))
+    except ValueError:
+        return False
+
+def _looks_intact(blob: Blob) -> bool:
+    # Cheap check before linking to a blob: present (hot or cold tier) and (if known) still the recorded size
+    try:
+        path = locate_blob(blob.filepath)
+        if path is None:
+            return False
+        if is_compressed_copy(path):
+            return True  # gzip'ed cold copy: the stored size says nothing, the scrubber verifies it
+        size = os.path.getsize(path)
+    except (OSError, ValueError):
+        return False
+    return blob.size is None or size == blob.size
+
+# Blobs the scrubber found corrupt are never dedup targets
+_not_quarantined = ~exists().where(BlobCheck.blob_id == Blob.id).where(BlobCheck.status == "corrupt")
+# Version paths that have no blob row (uploaded before the blobs table existed)
+_untracked_path = ~exists().where(Blob.filepath == FileVersion.filepath)
+
+async def find_live_blob(db: AsyncSession, checksum: str, algo: str = SHA256) -> Optional[Blob]:
+    # Returns a blob with this checksum (of this algorithm) that still exists on disk (dedup target).
+    res = await db.execute(
+        select(Blob).where(Blob.checksum == checksum).where(Blob.checksum_algo == algo).where(_not_quarantined).order_by(Blob.id)
+    )
+    for blob in res.scalars().all():
+        if _looks_intact(blob):
+            return blob
+
+    # Versions uploaded before the blobs table existed have no blob row yet: adopt one
+    res = await db.execute(
+        select(FileVersion.filepath).where(FileVersion.checksum == checksum).where(FileVersion.checksum_algo == algo)
+        .where(_untracked_path).distinct()
+    )
+    for path in res.scalars().all():
+        if path and _exists_on_disk(path):
+            return await _adopt_legacy_path(db, path, checksum, algo)
+    return None
+
+def _chunks(items: List, size: int = 500):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+async def user_references_blob(db: AsyncSession, user_id: int, rel_path: str) -> bool:
+    # True if one of the user's files (trash included) has a version on this content
+    res = await db.execute(
+        select(FileVersion.id).join(File, File.id == FileVersion.file_id)
+        .where(File.uploaded_by == user_id).where(FileVersion.filepath == rel_path).limit(1)
+    )
+    return res.first() is not None
+
+async def find_live_blobs(db: AsyncSession, checksums: Iterable[str], algo: str = SHA256) -> Dict[str, Blob]:
+    """Set-based find_live_blob: checksum -> live blob for every checksum (of this algorithm) that has one."""
+    wanted = sorted({c for c in checksums if c})
+    candidates: List[Blob] = []
+    for chunk in _chunks(wanted):
+        res = await db.execute(
+            select(Blob).where(Blob.checksum.in_(chunk)).where(Blob.checksum_algo == algo).where(_not_quarantined).order_by(Blob.id)
+        )
+        candidates.extend(res.scalars().all())
+    on_disk = await asyncio.to_thread(lambda: {b.id for b in candidates if _looks_intact(b)})
+
+    found: Dict[str, Blob] = {}
+    for blob in candidates:
+        if blob.id in on_disk:
+            found.setdefault(blob.checksum, blob)
+
+    missing = [c for c in wanted if c not in found]
+    for chunk in _chunks(missing):
+        res = await db.execute(
+            select(FileVersion.checksum, FileVersion.filepath).where(FileVersion.checksum.in_(chunk))
+            .where(FileVersion.checksum_algo == algo).where(_untracked_path).distinct()
+        )
+        for checksum, path in res.all():
+            if checksum not in found and path and _exists_on_disk(path):
+                found[checksum] = await _adopt_legacy_path(db, path, checksum, algo)
+    return found
+
+async def _adopt_legacy_path(db: AsyncSession, rel_path: str, checksum: str, algo: str) -> Blob:
+    refs = await db.execute(select(func.count(FileVersion.id)).where(FileVersion.filepath == rel_path))
+    blob = Blob(
+        checksum=checksum,
+        checksum_algo=algo,
+        filepath=rel_path,
+        size=os.path.getsize(_abs_under_root(rel_path)),
+        ref_count=refs.scalar_one(),
+    )
+    db.add(blob)
+    await db.flush()
+    return blob
+
+async def register_blob(db: AsyncSession, rel_path: str, digest: Digest) -> Blob:
+    # Records a freshly stored file; the version being created holds the first reference.
+    blob = Blob(
+        checksum=digest.checksum, checksum_algo=digest.algo, chunk_digests=digest.chunks,
+        filepath=rel_path, size=digest.size, ref_count=1,
+    )
+    db.add(blob)
+    await db.flush()
+    return blob
+
+async def add_blob_ref(db: AsyncSession, blob: Blob) -> bool:
+    # False if the blob was released meanwhile (trash purge, retention, rehash): it must not be linked any more
+    claimed = await db.execute(
+        update(Blob).where(Blob.id == blob.id).where(Blob.ref_count > 0).values(ref_count=Blob.ref_count + 1)
+        .execution_options(synchronize_session=False)
+    )
+    return claimed.rowcount == 1
+
+async def add_blob_refs(db: AsyncSession, increments: Dict[int, int]) -> Set[int]:
+    """
+    Set-based add_blob_ref: blob id -> number of new references, one UPDATE per distinct increment.
+    Returns the ids of blobs released meanwhile; they got no references and must not be linked.
+    """
+    by_increment = defaultdict(list)
+    for blob_id, n in increments.items():
+        by_increment[n].append(blob_id)
+    released: Set[int] = set()
+    for n, blob_ids in by_increment.items():
+        for chunk in _chunks(blob_ids):
+            claimed = await db.execute(
+                update(Blob).where(Blob.id.in_(chunk)).where(Blob.ref_count > 0).values(ref_count=Blob.ref_count + n)
+                .execution_options(synchronize_session=False)
+            )
+            if claimed.rowcount != len(chunk):
+                res = await db.execute(select(Blob.id).where(Blob.id.in_(chunk)).where(Blob.ref_count > 0))
+                released.update(set(chunk) - set(res.scalars().all()))
+    return released
+
+async def release_blob_paths(db: AsyncSession, rel_paths: Iterable[str]) -> List[str]:
+    """
+    Drops one blob reference per entry in rel_paths. Call it after the FileVersion rows
+    pointing at these paths were deleted in the same transaction.
+    Returns the paths that are no longer referenced; unlink them only after commit.
+    """
+    counts = Counter(p for p in rel_paths if p)
+    if not counts:
+        return []
+
+    # One UPDATE per distinct decrement (almost always just "- 1")
+    by_decrement = defaultdict(list)
+    for path, n in counts.items():
+        by_decrement[n].append(path)
+    for n, paths in by_decrement.items():
+        await db.execute(
+            update(Blob).where(Blob.filepath.in_(paths)).values(ref_count=Blob.ref_count - n)
+            .execution_options(synchronize_session=False)
+        )
+
+    tracked_res = await db.execute(select(Blob.id, Blob.filepath, Blob.ref_count).where(Blob.filepath.in_(list(counts))))
+    tracked_rows = tracked_res.all()
+    tracked = {path: ref_count for _, path, ref_count in tracked_rows}
+    orphaned = [path for path, ref_count in tracked.items() if ref_count <= 0]
+    if orphaned:
+        orphaned_ids = [blob_id for blob_id, path, ref_count in tracked_rows if ref_count <= 0]
+        await db.execute(
+            delete(BlobCheck).where(BlobCheck.blob_id.in_(orphaned_ids)).execution_options(synchronize_session=False)
+        )
+        await db.execute(
+            delete(Blob).where(Blob.filepath.in_(orphaned)).execution_options(synchronize_session=False)
+        )
+
+    # Legacy paths without a blob row: orphaned once no version references them any more
+    legacy = [p for p in counts if p not in tracked]
+    if legacy:
+        still_used = await db.execute(
+            select(FileVersion.filepath).where(FileVersion.filepath.in_(legacy)).distinct()
+        )
+        used = set(still_used.scalars().all())
+        orphaned.extend(p for p in legacy if p not in used)
+
+    return orphaned
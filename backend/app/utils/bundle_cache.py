@@ -0,0 +1,135 @@
+import asyncio
+import hashlib
+import os
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+from uuid import uuid4
+from sqlalchemy import select, and_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.file import File
+from app.models.file_version import FileVersion
+from app.storage import _abs_under_root
+from app.utils import config
+from app.utils.metrics import BUNDLE_CACHE, BUNDLE_CACHE_BYTES
+
+# download-zip bundles cached on disk under STORAGE_ROOT/bundles/<key>.zip.
+# The key is a hash of the sorted (file_id, checksum, blob path, name in archive) members, so a new
+# version or a rollback of any member yields a new key and the old bundle simply ages out.
+# Recency is the file mtime (touched on every hit) - shared by all worker processes.
+
+BUNDLE_DIR = "bundles"
+
+# key -> [lock, waiters]; identical concurrent requests wait for one build instead of deflating twice
+_build_locks: Dict[str, list] = {}
+
+def _bundle_dir() -> str:
+    return _abs_under_root(BUNDLE_DIR)
+
+def _bundle_path(key: str) -> str:
+    return os.path.join(_bundle_dir(), f"{key}.zip")
+
+async def bundle_key(db: AsyncSession, members: List[Tuple[File, str, str]]) -> str:
+    """Content key for a set of zip members (see zip_members); order of the request doesn't matter."""
+    file_ids = [file_obj.id for file_obj, _, _ in members]
+    checksums: Dict[int, Optional[str]] = {}
+    if file_ids:
+        res = await db.execute(
+            select(FileVersion.file_id, FileVersion.checksum)
+            .join(File, and_(File.id == FileVersion.file_id, File.current_version == FileVersion.version_number))
+            .where(FileVersion.file_id.in_(file_ids))
+        )
+        checksums = dict(res.all())
+
+    parts = sorted(
+        f"{file_obj.id}:{checksums.get(file_obj.id) or ''}:{file_obj.filepath}:{arcname}"
+        for file_obj, _, arcname in members
+    )
+    return hashlib.sha256("\n".join(parts).encode("utf-8")).hexdigest()
+
+def cached_bundle(key: str) -> Optional[str]:
+    """Absolute path of a ready bundle (and marks it recently used), or None."""
+    path = _bundle_path(key)
+    try:
+        os.utime(path)
+    except FileNotFoundError:
+        return None
+    return path
+
+def new_bundle_tmp(key: str) -> str:
+    os.makedirs(_bundle_dir(), exist_ok=True)
+    return os.path.join(_bundle_dir(), f".{key}.{uuid4().hex}.tmp")
+
+def publish_bundle(tmp_path: str, key: str) -> str:
+    # Blocking: atomic rename, then trim the cache (never evicts the bundle just published)
+    path = _bundle_path(key)
+    os.replace(tmp_path, path)
+    evict_bundles(keep=path)
+    return path
+
+async def get_or_build_bundle(key: str, build: Callable[[str], Awaitable[None]]) -> Tuple[str, bool]:
+    """Returns (path, cache_hit). On a miss `build(tmp_path)` writes the zip, which is then published."""
+    entry = _build_locks.setdefault(key, [asyncio.Lock(), 0])
+    entry[1] += 1
+    try:
+        async with entry[0]:
+            path = cached_bundle(key)
+            if path is not None:
+                BUNDLE_CACHE.inc(result="hit")
+                return path, True
+            BUNDLE_CACHE.inc(result="miss")
+            tmp_path = new_bundle_tmp(key)
+            try:
+                await build(tmp_path)
+                return await asyncio.to_thread(publish_bundle, tmp_path, key), False
+            except BaseException:
+                _remove(tmp_path)
+                raise
+    finally:
+        entry[1] -= 1
+        if entry[1] == 0:
+            _build_locks.pop(key, None)
+
+def evict_bundles(keep: Optional[str] = None) -> None:
+    # Blocking: drop bundles older than the max age, then least recently used ones over the size budget
+    directory = _bundle_dir()
+    try:
+        entries = list(os.scandir(directory))
+    except FileNotFoundError:
+        return
+
+    now = time.time()
+    bundles = []
+    for entry in entries:
+        try:
+            st = entry.stat()
+        except FileNotFoundError:
+            continue
+        if entry.name.endswith(".tmp"):
+            # Leftovers of builds interrupted by a crash
+            if now - st.st_mtime > 3600:
+                _remove(entry.path)
+            continue
+        if entry.path != keep and now - st.st_mtime > config.BUNDLE_CACHE_MAX_AGE_SECONDS:
+            _remove(entry.path)
+            continue
+        bundles.append((st.st_mtime, st.st_size, entry.path))
+
+    total = sum(size for _, size, _ in bundles)
+    for _, size, path in sorted(bundles):
+        if total <= config.BUNDLE_CACHE_MAX_BYTES:
+            break
+        if path == keep:
+            continue
+        _remove(path)
+        total -= size
+    BUNDLE_CACHE_BYTES.set(total)
+
+def _remove(path: str) -> None:
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+async def run_scheduled_bundle_sweep() -> None:
+    await asyncio.to_thread(evict_bundles)
@@ -0,0 +1,166 @@
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from fastapi import HTTPException, Request, Response, status
+from sqlalchemy import delete, func, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db import AsyncSessionLocal
+from app.models.file import File
+from app.models.file_change import FileChange
+from app.models.user import User
+from app.utils import config
+
+# Two views of "what changed", both written in the same transaction as the change itself:
+#   - users.change_seq: per-user counter, bumped by every upload, delete, rollback, move and share change of
+#     the user's files. Listing and stats responses carry it as a weak ETag, so a poll with If-None-Match
+#     is answered with 304 from the user row get_current_user already loaded.
+#   - file_changes: append-only journal (created / updated / deleted per file) behind GET /api/changes;
+#     a sync client pays O(changes) per poll. Compacted periodically (compact_change_journal).
+
+async def record_file_changes(db: AsyncSession, owner_id: int, changes: Iterable[Tuple[int, str]]) -> None:
+    """Journals (file_id, op) pairs of one owner and bumps their counter; the caller commits."""
+    now = datetime.utcnow()
+    rows = [{"user_id": owner_id, "file_id": file_id, "op": op, "changed_at": now} for file_id, op in changes]
+    if not rows:
+        return
+    await db.execute(insert(FileChange), rows)
+    await bump_change_seq(db, [owner_id])
+
+async def bump_change_seq(db: AsyncSession, user_ids: Iterable[Optional[int]]) -> None:
+    """Bumps the counter of the given file owners; the caller commits."""
+    ids = sorted({u for u in user_ids if u is not None})  # fixed order: no lock-order deadlocks
+    if ids:
+        await db.execute(
+            update(User).where(User.id.in_(ids)).values(change_seq=User.change_seq + 1)
+            .execution_options(synchronize_session=False)
+        )
+
+def change_etag(user: User, kind: str) -> str:
+    return f'W/"{kind}-u{user.id}-c{user.change_seq or 0}"'
+
+def not_modified(request: Request, etag: str) -> Optional[Response]:
+    """304 response if the client already has this version, else None."""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and (if_none_match.strip() == "*" or etag in [t.strip() for t in if_none_match.split(",")]):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=revalidate_headers(etag))
+    return None
+
+def revalidate_headers(etag: str) -> dict:
+    # no-cache: the client may keep the body but has to revalidate on every poll
+    return {"ETag": etag, "Cache-Control": "private, no-cache"}
+
+# --- delta feed ---
+
+def _parse_cursor(cursor: str) -> int:
+    try:
+        value = int(cursor)
+    except ValueError:
+        value = -1
+    if value < 0:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+    return value
+
+async def changes_since(db: AsyncSession, user: User, cursor: Optional[str], limit: int) -> dict:
+    """
+    No cursor: nothing to replay, just the current cursor ("reset": list /api/files, then poll with it).
+    Otherwise: the files of `user` changed after the cursor, one entry per file with its current metadata.
+    """
+    if cursor is None:
+        latest = (await db.execute(select(func.max(FileChange.id)).where(FileChange.user_id == user.id))).scalar()
+        return {"changes": [], "cursor": str(max(latest or 0, user.change_floor or 0)), "has_more": False, "reset": True}
+
+    after = _parse_cursor(cursor)
+    if after < (user.change_floor or 0):
+        # Deletions after this cursor were compacted away: the client can't be brought up to date incrementally
+        raise HTTPException(status_code=status.HTTP_410_GONE, detail="Cursor expired, list the files again and start from a new cursor")
+
+    res = await db.execute(
+        select(FileChange.id, FileChange.file_id, FileChange.op)
+        .where(FileChange.user_id == user.id).where(FileChange.id > after)
+        .order_by(FileChange.id).limit(limit + 1)
+    )
+    entries = res.all()
+    has_more = len(entries) > limit
+    entries = entries[:limit]
+
+    # Several entries of one file collapse into one, ordered by its last change
+    ops: Dict[int, str] = {}
+    for entry in entries:
+        previous = ops.pop(entry.file_id, None)
+        ops[entry.file_id] = "created" if previous == "created" and entry.op == "updated" else entry.op
+
+    live = [file_id for file_id, op in ops.items() if op != "deleted"]
+    current = {}
+    if live:
+        res = await db.execute(
+            select(File.id, File.filename, File.size, File.folder_id, File.current_version, File.uploaded_at)
+            .where(File.id.in_(live)).where(File.uploaded_by == user.id).where(File.deleted_at.is_(None))
+        )
+        current = {row.id: row for row in res.all()}
+
+    changes: List[dict] = []
+    for file_id, op in ops.items():
+        row = current.get(file_id)
+        if row is None:
+            # Deleted (or moved to another owner) later than this page reaches
+            changes.append({"file_id": file_id, "change": "deleted"})
+            continue
+        changes.append({
+            "file_id": file_id,
+            "change": op,
+            "filename": row.filename,
+            "size": row.size,
+            "folder_id": row.folder_id,
+            "version": row.current_version,
+            "uploaded_at": row.uploaded_at.isoformat() if row.uploaded_at else None,
+        })
+    next_cursor = entries[-1].id if entries else after
+    return {"changes": changes, "cursor": str(next_cursor), "has_more": has_more, "reset": False}
+
+# --- compaction ---
+
+async def compact_change_journal(db: AsyncSession) -> dict:
+    """
+    1. Superseded entries: only the newest entry per (owner, file) matters to any cursor, so the older
+       ones are dropped (in batches). A creation followed by updates may then be reported as "updated".
+    2. Deletion entries older than CHANGE_JOURNAL_RETENTION_DAYS: dropped after raising the owner's
+       change_floor past them, so cursors from before get 410 instead of silently missing a deletion.
+    """
+    stats = {"superseded": 0, "tombstones": 0}
+    newest = select(func.max(FileChange.id)).group_by(FileChange.user_id, FileChange.file_id)
+    while True:
+        ids = (await db.execute(
+            select(FileChange.id).where(FileChange.id.not_in(newest)).limit(config.CHANGE_JOURNAL_COMPACT_BATCH)
+        )).scalars().all()
+        if not ids:
+            break
+        await db.execute(delete(FileChange).where(FileChange.id.in_(ids)))
+        await db.commit()
+        stats["superseded"] += len(ids)
+
+    cutoff = datetime.utcnow() - timedelta(days=config.CHANGE_JOURNAL_RETENTION_DAYS)
+    res = await db.execute(
+        select(FileChange.user_id, func.max(FileChange.id))
+        .where(FileChange.op == "deleted").where(FileChange.changed_at < cutoff)
+        .group_by(FileChange.user_id)
+    )
+    for user_id, floor in res.all():
+        await db.execute(
+            update(User).where(User.id == user_id).where(User.change_floor < floor).values(change_floor=floor)
+            .execution_options(synchronize_session=False)
+        )
+        removed = await db.execute(
+            delete(FileChange).where(FileChange.user_id == user_id).where(FileChange.op == "deleted")
+            .where(FileChange.id <= floor).where(FileChange.changed_at < cutoff)
+        )
+        await db.commit()
+        stats["tombstones"] += removed.rowcount or 0
+    return stats
+
+async def run_scheduled_journal_compaction() -> None:
+    # Entry point for the periodic loop registered in app/main.py
+    async with AsyncSessionLocal() as db:
+        stats = await compact_change_journal(db)
+    if stats["superseded"] or stats["tombstones"]:
+        print(f"Change journal compaction: {stats}")
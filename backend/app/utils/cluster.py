@@ -0,0 +1,110 @@
+import asyncio
+import os
+import socket
+from typing import Callable, Dict, Optional
+
+from app.utils import config
+from app.utils.metrics import INVALIDATIONS
+
+# Coordination between the worker processes of one host (python -m app.serve):
+#   - cache invalidation: every worker binds a Unix datagram socket in CLUSTER_RUN_DIR and
+#     publish() sends a small message to all the others (a local stand-in for Redis pub/sub),
+#   - maintenance leader: one worker holds an flock on CLUSTER_RUN_DIR/maintenance.lock and runs
+#     the host-wide periodic jobs (scrub, retention, sweeps) so they don't run N times in parallel.
+# With a single process both are cheap no-ops in practice (no peers, the lock is always ours).
+
+_handlers: Dict[str, Callable[[str], None]] = {}
+_sock: Optional[socket.socket] = None
+_sock_path: Optional[str] = None
+_leader_fd: Optional[int] = None
+
+def on_invalidate(channel: str):
+    """Registers the local handler for a channel; it receives the key (str)."""
+    def _register(fn: Callable[[str], None]):
+        _handlers[channel] = fn
+        return fn
+    return _register
+
+def publish(channel: str, key) -> None:
+    """Applies the invalidation here and sends it to every other worker (best effort)."""
+    key = str(key)
+    _handlers[channel](key)
+    if _sock is None:
+        return
+    message = f"{channel}\n{key}".encode()
+    for name in os.listdir(config.CLUSTER_RUN_DIR):
+        if not name.endswith(".sock"):
+            continue
+        peer = os.path.join(config.CLUSTER_RUN_DIR, name)
+        if peer == _sock_path:
+            continue
+        try:
+            _sock.sendto(message, peer)
+            INVALIDATIONS.inc(result="sent")
+        except (ConnectionRefusedError, FileNotFoundError):
+            # Worker gone without cleaning up
+            _unlink(peer)
+        except OSError:
+            # Peer's queue is full: its entry expires by TTL instead
+            INVALIDATIONS.inc(result="dropped")
+
+def _on_readable() -> None:
+    while True:
+        try:
+            data = _sock.recv(4096)
+        except (BlockingIOError, OSError):
+            return
+        channel, _, key = data.decode(errors="replace").partition("\n")
+        handler = _handlers.get(channel)
+        if handler is not None:
+            handler(key)
+            INVALIDATIONS.inc(result="received")
+
+def start_cluster_listener() -> None:
+    global _sock, _sock_path
+    if _sock is not None or not hasattr(socket, "AF_UNIX"):
+        return
+    os.makedirs(config.CLUSTER_RUN_DIR, exist_ok=True)
+    path = os.path.join(config.CLUSTER_RUN_DIR, f"worker-{os.getpid()}.sock")
+    _unlink(path)
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+    sock.bind(path)
+    sock.setblocking(False)
+    asyncio.get_running_loop().add_reader(sock.fileno(), _on_readable)
+    _sock, _sock_path = sock, path
+
+def stop_cluster_listener() -> None:
+    global _sock, _sock_path, _leader_fd
+    if _sock is not None:
+        asyncio.get_running_loop().remove_reader(_sock.fileno())
+        _sock.close()
+        _unlink(_sock_path)
+        _sock, _sock_path = None, None
+    if _leader_fd is not None:
+        os.close(_leader_fd)  # releases the flock; another worker takes over at its next tick
+        _leader_fd = None
+
+def is_maintenance_leader() -> bool:
+    """True in exactly one worker per host; checked on every tick, so a dead leader is replaced."""
+    global _leader_fd
+    if _leader_fd is not None:
+        return True
+    try:
+        import fcntl
+    except ImportError:
+        return True  # no flock (Windows): single-process deployments only
+    os.makedirs(config.CLUSTER_RUN_DIR, exist_ok=True)
+    fd = os.open(os.path.join(config.CLUSTER_RUN_DIR, "maintenance.lock"), os.O_RDWR | os.O_CREAT, 0o600)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        os.close(fd)
+        return False
+    _leader_fd = fd
+    return True
+
+def _unlink(path: str) -> None:
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
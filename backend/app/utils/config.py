@@ -1,4 +1,6 @@
+import hashlib
 import os
+import tempfile
 from datetime import timedelta
 
 SECRET_KEY = os.getenv("SECRET_KEY", "CHANGE_ME_IN_PROD")
@@ -10,3 +12,146 @@ def access_token_expires() -> timedelta:
 
 # Dev DB; swap to Postgres later
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite+aiosqlite:///./dev.db")
+# Root directory for stored blobs (see docs/backend/file_operations_module)
+STORAGE_ROOT = os.getenv("STORAGE_ROOT", "/srv/file-ops/data")
+
+def _optional_int(name: str):
+    value = os.getenv(name)
+    return int(value) if value not in (None, "") else None
+
+# Global version retention policy (unset = keep every version).
+# Users can override it with their own row in version_retention_policies.
+RETENTION_KEEP_LAST = _optional_int("RETENTION_KEEP_LAST")
+RETENTION_KEEP_DAILY_DAYS = _optional_int("RETENTION_KEEP_DAILY_DAYS")
+RETENTION_KEEP_MONTHLY_MONTHS = _optional_int("RETENTION_KEEP_MONTHLY_MONTHS")
+RETENTION_MAX_HISTORY_BYTES = _optional_int("RETENTION_MAX_HISTORY_BYTES")
+RETENTION_PRUNE_INTERVAL_SECONDS = int(os.getenv("RETENTION_PRUNE_INTERVAL_SECONDS", "3600"))
+RETENTION_PRUNE_BATCH_SIZE = int(os.getenv("RETENTION_PRUNE_BATCH_SIZE", "500"))
+
+# Public share links: in-process resolution cache and batched download_share audit rows
+SHARE_CACHE_TTL_SECONDS = int(os.getenv("SHARE_CACHE_TTL_SECONDS", "60"))
+SHARE_CACHE_MAX_ENTRIES = int(os.getenv("SHARE_CACHE_MAX_ENTRIES", "10000"))
+SHARE_COUNTER_FLUSH_SECONDS = int(os.getenv("SHARE_COUNTER_FLUSH_SECONDS", "10"))
+SIGNED_SHARE_MAX_TTL_SECONDS = int(os.getenv("SIGNED_SHARE_MAX_TTL_SECONDS", str(7 * 24 * 3600)))
+
+# Metrics: GET /metrics is open unless METRICS_TOKEN is set (then: Authorization: Bearer <token>)
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+EVENT_LOOP_LAG_PROBE_SECONDS = float(os.getenv("EVENT_LOOP_LAG_PROBE_SECONDS", "0.5"))
+
+# Background jobs (ZIP builds, batch deletes, logbook export)
+JOB_MAX_WORKERS = int(os.getenv("JOB_MAX_WORKERS", "4"))
+JOB_POLL_INTERVAL_SECONDS = float(os.getenv("JOB_POLL_INTERVAL_SECONDS", "2"))
+JOB_PROGRESS_INTERVAL_SECONDS = float(os.getenv("JOB_PROGRESS_INTERVAL_SECONDS", "1"))
+JOB_STALE_SECONDS = int(os.getenv("JOB_STALE_SECONDS", "300"))
+# Runner-side heartbeat of running jobs; must stay well below JOB_STALE_SECONDS
+JOB_HEARTBEAT_SECONDS = float(os.getenv("JOB_HEARTBEAT_SECONDS", "30"))
+JOB_ARTIFACT_TTL_SECONDS = int(os.getenv("JOB_ARTIFACT_TTL_SECONDS", str(24 * 3600)))
+
+# Precomputed download-zip bundles (content-keyed, LRU on disk under STORAGE_ROOT/bundles)
+BUNDLE_CACHE_MAX_BYTES = int(os.getenv("BUNDLE_CACHE_MAX_BYTES", str(2 * 1024 ** 3)))
+BUNDLE_CACHE_MAX_AGE_SECONDS = int(os.getenv("BUNDLE_CACHE_MAX_AGE_SECONDS", str(24 * 3600)))
+BUNDLE_CACHE_SWEEP_SECONDS = int(os.getenv("BUNDLE_CACHE_SWEEP_SECONDS", "600"))
+
+# Bulk upload (POST /api/upload/bulk): parts per request, parallel blob writes, rows per commit
+BULK_UPLOAD_MAX_FILES = int(os.getenv("BULK_UPLOAD_MAX_FILES", "10000"))
+BULK_UPLOAD_CONCURRENCY = int(os.getenv("BULK_UPLOAD_CONCURRENCY", "8"))
+BULK_UPLOAD_BATCH_SIZE = int(os.getenv("BULK_UPLOAD_BATCH_SIZE", "500"))
+
+# Upload sessions from POST /api/upload/preflight (content not stored yet)
+UPLOAD_SESSION_TTL_SECONDS = int(os.getenv("UPLOAD_SESSION_TTL_SECONDS", "3600"))
+
+# Integrity scrubber: re-hashes blobs (least recently verified first) at a bounded read rate
+SCRUB_INTERVAL_SECONDS = int(os.getenv("SCRUB_INTERVAL_SECONDS", "600"))
+SCRUB_BATCH_SIZE = int(os.getenv("SCRUB_BATCH_SIZE", "200"))
+SCRUB_WORKERS = int(os.getenv("SCRUB_WORKERS", "2"))
+SCRUB_MAX_BYTES_PER_SECOND = int(os.getenv("SCRUB_MAX_BYTES_PER_SECOND", str(32 * 1024 * 1024)))
+SCRUB_READ_CHUNK_BYTES = int(os.getenv("SCRUB_READ_CHUNK_BYTES", str(4 * 1024 * 1024)))
+
+# Trash: deletes only mark files; the purger removes them (rows and unreferenced blobs) after the retention
+# window, in batches (TRASH_RETENTION_DAYS=0: delete right away, no trash)
+TRASH_RETENTION_DAYS = int(os.getenv("TRASH_RETENTION_DAYS", "30"))
+TRASH_PURGE_INTERVAL_SECONDS = int(os.getenv("TRASH_PURGE_INTERVAL_SECONDS", "300"))
+TRASH_PURGE_BATCH = int(os.getenv("TRASH_PURGE_BATCH", "200"))
+
+# Account purge (DELETE /api/admin/users/{id}, job purge_account): rows removed per transaction
+ACCOUNT_PURGE_BATCH = int(os.getenv("ACCOUNT_PURGE_BATCH", "500"))
+
+# Hot/cold tiering (app/utils/tiering.py): blobs not read for TIER_COLD_AFTER_DAYS move to COLD_STORAGE_ROOT
+# (a slower, cheaper volume; unset = tiering off) and come back on the next download
+COLD_STORAGE_ROOT = os.getenv("COLD_STORAGE_ROOT") or None
+TIER_COLD_AFTER_DAYS = int(os.getenv("TIER_COLD_AFTER_DAYS", "30"))
+TIER_MIN_SIZE_BYTES = int(os.getenv("TIER_MIN_SIZE_BYTES", str(64 * 1024)))
+TIER_COMPRESS = os.getenv("TIER_COMPRESS", "1") not in ("0", "false", "False")
+TIER_SWEEP_INTERVAL_SECONDS = int(os.getenv("TIER_SWEEP_INTERVAL_SECONDS", "3600"))
+TIER_SWEEP_BATCH = int(os.getenv("TIER_SWEEP_BATCH", "200"))
+BLOB_ACCESS_FLUSH_SECONDS = int(os.getenv("BLOB_ACCESS_FLUSH_SECONDS", "30"))
+
+# Content hashing (app/utils/hashing.py): algorithm of new content - sha256, sha256-tree or blake3-tree (needs the
+# blake3 package); existing content is rehashed by the "rehash_blobs" job. HASH_THREADS: tree leaves hashed at once
+HASH_ALGORITHM = os.getenv("HASH_ALGORITHM", "sha256")
+HASH_THREADS = int(os.getenv("HASH_THREADS") or min(4, os.cpu_count() or 1))
+HASH_MIGRATION_BATCH = int(os.getenv("HASH_MIGRATION_BATCH", "200"))
+
+# Backups (app/utils/backup.py): DB snapshot + content-addressed blob copies under BACKUP_ROOT (unset = off).
+# The leader makes one every BACKUP_INTERVAL_SECONDS and keeps the newest BACKUP_KEEP snapshots
+BACKUP_ROOT = os.getenv("BACKUP_ROOT") or None
+BACKUP_INTERVAL_SECONDS = int(os.getenv("BACKUP_INTERVAL_SECONDS", str(24 * 3600)))
+BACKUP_KEEP = int(os.getenv("BACKUP_KEEP", "7"))
+BACKUP_CONCURRENCY = int(os.getenv("BACKUP_CONCURRENCY", "4"))
+
+# Server-side import of directory trees (app/utils/importer.py). Sources must lie under one of IMPORT_ALLOWED_ROOTS
+# (os.pathsep-separated; unset = the admin endpoint is disabled). Link mode: reflink (clone, falls back to copy),
+# hardlink (shares the inode with the source: later edits of the source change the stored file), copy
+IMPORT_ALLOWED_ROOTS = [p for p in os.getenv("IMPORT_ALLOWED_ROOTS", "").split(os.pathsep) if p]
+IMPORT_LINK_MODE = os.getenv("IMPORT_LINK_MODE", "reflink")
+IMPORT_HASH_WORKERS = int(os.getenv("IMPORT_HASH_WORKERS") or os.cpu_count() or 1)
+IMPORT_MMAP_MIN_BYTES = int(os.getenv("IMPORT_MMAP_MIN_BYTES", str(16 * 1024 * 1024)))
+IMPORT_BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", "2000"))
+
+# Previews (thumbnails / first page of text), generated by the "generate_previews" job in a process pool
+PREVIEW_WORKERS = int(os.getenv("PREVIEW_WORKERS", "2"))
+PREVIEW_TEXT_BYTES = int(os.getenv("PREVIEW_TEXT_BYTES", "16384"))
+PREVIEW_TEXT_LINES = int(os.getenv("PREVIEW_TEXT_LINES", "100"))
+
+# Schema bootstrap at startup: "check" (compare alembic_version with the migrations, fail fast) or
+# "migrate" (run `alembic upgrade head` in-process; for a single instance / development)
+DB_SCHEMA_MODE = os.getenv("DB_SCHEMA_MODE", "check")
+# Startup-time budget (import + lifespan); exceeding it is logged and visible in /metrics
+STARTUP_BUDGET_SECONDS = float(os.getenv("STARTUP_BUDGET_SECONDS", "0.5"))
+
+# Multi-process serving (python -m app.serve): worker count, shared DB connection budget, and the
+# directory for the workers' invalidation sockets / maintenance lock (must be local, not on NFS)
+WEB_WORKERS = int(os.getenv("WEB_WORKERS", "1"))
+DB_MAX_CONNECTIONS = int(os.getenv("DB_MAX_CONNECTIONS", "60"))
+DB_POOL_SIZE = _optional_int("DB_POOL_SIZE")
+DB_MAX_OVERFLOW = _optional_int("DB_MAX_OVERFLOW")
+DB_BUSY_TIMEOUT_MS = int(os.getenv("DB_BUSY_TIMEOUT_MS", "5000"))
+CLUSTER_RUN_DIR = os.getenv("CLUSTER_RUN_DIR") or os.path.join(
+    tempfile.gettempdir(), "cloud-storage-" + hashlib.sha1(f"{DATABASE_URL}|{STORAGE_ROOT}".encode()).hexdigest()[:12]
+)
+
+# Admission control (app/utils/admission.py), per worker process. Rates are requests per minute per user
+# (share links: per client IP); "heavy" = download-zip, logbook export, bulk upload (global fair-queued slots)
+ADMISSION_ENABLED = os.getenv("ADMISSION_ENABLED", "1") not in ("0", "false", "False")
+UPLOAD_RATE_PER_MINUTE = float(os.getenv("UPLOAD_RATE_PER_MINUTE", "600"))
+UPLOAD_RATE_BURST = float(os.getenv("UPLOAD_RATE_BURST", "100"))
+MAX_CONCURRENT_UPLOADS_PER_USER = int(os.getenv("MAX_CONCURRENT_UPLOADS_PER_USER", "4"))
+MAX_CONCURRENT_DOWNLOADS_PER_USER = int(os.getenv("MAX_CONCURRENT_DOWNLOADS_PER_USER", "8"))
+HEAVY_RATE_PER_MINUTE = float(os.getenv("HEAVY_RATE_PER_MINUTE", "30"))
+HEAVY_RATE_BURST = float(os.getenv("HEAVY_RATE_BURST", "10"))
+HEAVY_MAX_CONCURRENT = int(os.getenv("HEAVY_MAX_CONCURRENT", "4"))
+HEAVY_MAX_QUEUED_PER_USER = int(os.getenv("HEAVY_MAX_QUEUED_PER_USER", "2"))
+HEAVY_QUEUE_TIMEOUT_SECONDS = float(os.getenv("HEAVY_QUEUE_TIMEOUT_SECONDS", "30"))
+SHARE_RATE_PER_MINUTE = float(os.getenv("SHARE_RATE_PER_MINUTE", "600"))
+SHARE_RATE_BURST = float(os.getenv("SHARE_RATE_BURST", "60"))
+ADMISSION_ADMIN_WEIGHT = float(os.getenv("ADMISSION_ADMIN_WEIGHT", "2"))
+
+# List endpoints (app/utils/json_rows.py): bigger results are streamed from the DB cursor
+JSON_STREAM_THRESHOLD = int(os.getenv("JSON_STREAM_THRESHOLD", "5000"))
+JSON_STREAM_CHUNK_ROWS = int(os.getenv("JSON_STREAM_CHUNK_ROWS", "2000"))
+
+# Change journal (GET /api/changes, app/utils/changes.py)
+CHANGES_PAGE_LIMIT = int(os.getenv("CHANGES_PAGE_LIMIT", "1000"))
+CHANGE_JOURNAL_RETENTION_DAYS = int(os.getenv("CHANGE_JOURNAL_RETENTION_DAYS", "30"))
+CHANGE_JOURNAL_COMPACT_INTERVAL_SECONDS = int(os.getenv("CHANGE_JOURNAL_COMPACT_INTERVAL_SECONDS", "3600"))
+CHANGE_JOURNAL_COMPACT_BATCH = int(os.getenv("CHANGE_JOURNAL_COMPACT_BATCH", "5000"))
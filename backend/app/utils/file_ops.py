@@ -0,0 +1,176 @@
+import asyncio
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+from fastapi import HTTPException, status
+from sqlalchemy import select, delete, func, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db import AsyncSessionLocal
+from app.models.file import File
+from app.models.file_version import FileVersion
+from app.models.folder import Folder
+from app.models.grant import FileAccess, FileGrant
+from app.models.log_book import LogBook
+from app.models.share_link import ShareLink
+from app.storage import unlink_rel_paths
+from app.utils import config
+from app.utils.blobs import release_blob_paths
+from app.utils.changes import record_file_changes
+from app.utils.folders import adjust_folder_usage, adjust_user_usage, subtree_filter
+from app.utils.share_cache import invalidate_file_shares
+
+# Deleting a file moves it to the trash: one UPDATE of files.deleted_at, after which the file is gone from
+# listings, permission checks, share links and the change feed. Folder usage and the change journal are
+# updated right away; versions, grants and blobs stay, so a restore is the same UPDATE back.
+# purge_trash (leader's periodic loop) removes files trashed more than TRASH_RETENTION_DAYS ago in batches:
+# rows first, then the blobs no other version (dedup) references any more.
+
+async def delete_file_record(session: AsyncSession, file_obj: File) -> List[str]:
+    """
+    Moves a file to the trash, or with TRASH_RETENTION_DAYS=0 deletes it with its versions and the blobs
+    no other version (dedup) still uses. Commits. Returns unlink errors, if any.
+    """
+    file_id = file_obj.id
+    await adjust_folder_usage(session, file_obj.folder_id, -(file_obj.size or 0), -1)
+    await adjust_user_usage(session, file_obj.uploaded_by, -(file_obj.size or 0), -1)
+    await record_file_changes(session, file_obj.uploaded_by, [(file_id, "deleted")])
+
+    if config.TRASH_RETENTION_DAYS <= 0:
+        orphaned = await _purge_rows(session, [file_id])
+        await session.commit()
+        invalidate_file_shares(file_id)
+        return await asyncio.to_thread(unlink_rel_paths, orphaned) if orphaned else []
+
+    file_obj.deleted_at = datetime.utcnow()
+    await session.commit()
+    invalidate_file_shares(file_id)
+    return []
+
+async def delete_folder_tree(session: AsyncSession, folder: Folder) -> Tuple[List[int], List[str]]:
+    """
+    delete_file_record for every file in the folder's subtree, then the folders themselves: set-based
+    statements in one transaction, so a failure leaves the whole tree as it was. Commits.
+    Returns (ids of the deleted files, unlink errors).
+    """
+    in_subtree = select(Folder.id).where(Folder.owner_id == folder.owner_id).where(subtree_filter(folder.path))
+    res = await session.execute(
+        select(File.id, File.uploaded_by, File.size).where(File.folder_id.in_(in_subtree)).where(File.deleted_at.is_(None))
+    )
+    rows = res.all()
+    file_ids = [file_id for file_id, _, _ in rows]
+
+    # The subtree's own folders go away, so only the ancestors above it lose the usage
+    await adjust_folder_usage(session, folder.parent_id, -sum(size or 0 for _, _, size in rows), -len(rows))
+    per_owner = defaultdict(list)
+    for file_id, owner_id, size in rows:
+        per_owner[owner_id].append((file_id, size or 0))
+    for owner_id, entries in per_owner.items():
+        await adjust_user_usage(session, owner_id, -sum(size for _, size in entries), -len(entries))
+        await record_file_changes(session, owner_id, [(file_id, "deleted") for file_id, _ in entries])
+
+    orphaned: List[str] = []
+    now = datetime.utcnow()
+    for start in range(0, len(file_ids), config.TRASH_PURGE_BATCH):
+        chunk = file_ids[start:start + config.TRASH_PURGE_BATCH]
+        if config.TRASH_RETENTION_DAYS <= 0:
+            orphaned.extend(await _purge_rows(session, chunk))
+        else:
+            await session.execute(
+                update(File).where(File.id.in_(chunk)).values(deleted_at=now).execution_options(synchronize_session=False)
+            )
+    await session.execute(
+        delete(Folder).where(Folder.owner_id == folder.owner_id).where(subtree_filter(folder.path))
+        .execution_options(synchronize_session=False)
+    )
+    await session.commit()
+    for file_id in file_ids:
+        invalidate_file_shares(file_id)
+    errors = await asyncio.to_thread(unlink_rel_paths, orphaned) if orphaned else []
+    return file_ids, errors
+
+async def restore_file_record(session: AsyncSession, file_obj: File) -> File:
+    """Takes a file out of the trash (into the top level if its folder is gone). Commits."""
+    if file_obj.folder_id is not None and await session.get(Folder, file_obj.folder_id) is None:
+        file_obj.folder_id = None
+
+    # Versioning identity is owner + folder + filename: a new file may have taken the name meanwhile
+    clash = await session.execute(
+        select(File.id)
+        .where(File.folder_id.is_(None) if file_obj.folder_id is None else File.folder_id == file_obj.folder_id)
+        .where(File.filename == file_obj.filename)
+        .where(File.uploaded_by == file_obj.uploaded_by)
+        .where(File.deleted_at.is_(None))
+        .limit(1)
+    )
+    if clash.first() is not None:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="A file with this name already exists in the folder")
+
+    file_obj.deleted_at = None
+    await adjust_folder_usage(session, file_obj.folder_id, file_obj.size or 0, 1)
+    await adjust_user_usage(session, file_obj.uploaded_by, file_obj.size or 0, 1)
+    await record_file_changes(session, file_obj.uploaded_by, [(file_obj.id, "created")])
+    await session.commit()
+    return file_obj
+
+async def _purge_rows(session: AsyncSession, file_ids: List[int]) -> List[str]:
+    """Deletes the files with everything pointing at them; returns blob paths to unlink after commit."""
+    res = await session.execute(select(FileVersion.file_id, FileVersion.filepath).where(FileVersion.file_id.in_(file_ids)))
+    rows = res.all()
+    # One entry per FileVersion row, i.e. one blob reference each
+    paths = [path for _, path in rows]
+    unversioned = set(file_ids) - {file_id for file_id, _ in rows}
+    if unversioned:
+        legacy = await session.execute(select(File.filepath).where(File.id.in_(unversioned)))
+        paths.extend(p for p in legacy.scalars().all() if p)
+
+    for model in (FileAccess, FileGrant, ShareLink, FileVersion):
+        await session.execute(delete(model).where(model.file_id.in_(file_ids)).execution_options(synchronize_session=False))
+    # The log keeps its entries (ON DELETE SET NULL, which SQLite does not enforce)
+    await session.execute(
+        update(LogBook).where(LogBook.file_id.in_(file_ids)).values(file_id=None).execution_options(synchronize_session=False)
+    )
+    await session.execute(delete(File).where(File.id.in_(file_ids)).execution_options(synchronize_session=False))
+    return await release_blob_paths(session, paths)
+
+async def purge_trash(
+    db: AsyncSession,
+    batch_size: Optional[int] = None,
+    progress: Optional[Callable[[int, int, str], Awaitable[None]]] = None,
+) -> Dict[str, int]:
+    """Removes files trashed before the retention window (or marked for purge), oldest first, batch by batch."""
+    batch_size = batch_size or config.TRASH_PURGE_BATCH
+    cutoff = datetime.utcnow() - timedelta(days=max(config.TRASH_RETENTION_DAYS, 0))
+    stats = {"files": 0, "blobs": 0, "errors": 0}
+    total = 0
+    if progress is not None:
+        total = (await db.execute(
+            select(func.count(File.id)).where(File.deleted_at.is_not(None)).where(File.deleted_at < cutoff)
+        )).scalar_one()
+    while True:
+        res = await db.execute(
+            select(File.id).where(File.deleted_at.is_not(None)).where(File.deleted_at < cutoff)
+            .order_by(File.deleted_at, File.id).limit(batch_size)
+        )
+        file_ids = list(res.scalars().all())
+        if not file_ids:
+            break
+        orphaned = await _purge_rows(db, file_ids)
+        await db.commit()
+        errors = await asyncio.to_thread(unlink_rel_paths, orphaned) if orphaned else []
+        for error in errors:
+            print(f"Trash purge: {error}")
+        stats["files"] += len(file_ids)
+        stats["blobs"] += len(orphaned) - len(errors)
+        stats["errors"] += len(errors)
+        if progress is not None:
+            await progress(min(stats["files"], total), total, f"{stats['files']} files purged")
+        if len(file_ids) < batch_size:
+            break
+    return stats
+
+async def run_scheduled_trash_purge() -> None:
+    # Entry point for the periodic loop registered in app/main.py
+    async with AsyncSessionLocal() as db:
+        stats = await purge_trash(db)
+    if stats["files"]:
+        print(f"Trash purge: {stats}")
@@ -0,0 +1,165 @@
+import base64
+import json
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+from fastapi import HTTPException, status
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.file import File
+from app.models.folder import Folder
+from app.models.user import User
+from app.utils.permissions import check_permission
+
+# Folder tree helpers. Folder.path is the materialized path of ids ("/3/17/42/"), so
+#   - ancestors of a folder (itself included) are the ids in its path,
+#   - its subtree is every folder whose path starts with its path.
+
+def ancestor_ids(path: str) -> List[int]:
+    return [int(part) for part in path.strip("/").split("/") if part]
+
+def subtree_filter(path: str):
+    # LIKE '/3/17/%': a range on the path would depend on the collation ("0" only sorts right after "/" in byte
+    # order). Paths are digits and "/", so nothing needs escaping.
+    return Folder.path.startswith(path)
+
+def validate_folder_name(name: str) -> str:
+    name = (name or "").strip()
+    if not name or name in (".", "..") or "/" in name or "\\" in name or len(name) > 255:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid folder name")
+    return name
+
+async def get_user_folder(db: AsyncSession, user: User, folder_id: int, action: str = "read") -> Folder:
+    folder = await db.get(Folder, folder_id)
+    if folder is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Folder not found")
+    if folder.owner_id != user.id and not check_permission(user, action, "file"):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="No permission for this folder")
+    return folder
+
+async def resolve_upload_folder(db: AsyncSession, user: User, folder_id: Optional[int]) -> Optional[int]:
+    # Uploads go into the user's own folders only (None = top level)
+    if folder_id is None:
+        return None
+    folder = await db.get(Folder, folder_id)
+    if folder is None or folder.owner_id != user.id:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Folder not found")
+    return folder.id
+
+async def name_taken(db: AsyncSession, owner_id: int, parent_id: Optional[int], name: str, exclude_id: Optional[int] = None) -> bool:
+    q = select(Folder.id).where(Folder.owner_id == owner_id).where(Folder.name == name)
+    q = q.where(Folder.parent_id.is_(None) if parent_id is None else Folder.parent_id == parent_id)
+    if exclude_id is not None:
+        q = q.where(Folder.id != exclude_id)
+    return (await db.execute(q.limit(1))).first() is not None
+
+async def apply_folder_usage(db: AsyncSession, deltas: Dict[Optional[int], Tuple[int, int]]) -> None:
+    """
+    folder_id -> (size delta, file count delta) for files directly in that folder; the change is
+    added to the folder and all its ancestors. Part of the caller's transaction (no commit).
+    """
+    deltas = {fid: d for fid, d in deltas.items() if fid is not None and (d[0] or d[1])}
+    if not deltas:
+        return
+    res = await db.execute(select(Folder.id, Folder.path).where(Folder.id.in_(list(deltas))))
+    per_folder: Dict[int, List[int]] = defaultdict(lambda: [0, 0])
+    for folder_id, path in res.all():
+        size_delta, count_delta = deltas[folder_id]
+        for ancestor in ancestor_ids(path):
+            per_folder[ancestor][0] += size_delta
+            per_folder[ancestor][1] += count_delta
+
+    # One UPDATE per distinct delta (a single upload touches the whole ancestor chain with one statement)
+    by_delta: Dict[Tuple[int, int], List[int]] = defaultdict(list)
+    for folder_id, (size_delta, count_delta) in per_folder.items():
+        by_delta[(size_delta, count_delta)].append(folder_id)
+    for (size_delta, count_delta), folder_ids in by_delta.items():
+        await db.execute(
+            update(Folder).where(Folder.id.in_(folder_ids))
+            .values(total_size=Folder.total_size + size_delta, file_count=Folder.file_count + count_delta)
+            .execution_options(synchronize_session=False)
+        )
+
+async def adjust_folder_usage(db: AsyncSession, folder_id: Optional[int], size_delta: int, count_delta: int = 0) -> None:
+    await apply_folder_usage(db, {folder_id: (size_delta, count_delta)})
+
+async def adjust_user_usage(db: AsyncSession, user_id: Optional[int], size_delta: int, count_delta: int = 0) -> None:
+    """Keeps users.used_bytes / file_count (files outside the trash) in step; part of the caller's transaction."""
+    if user_id is None or not (size_delta or count_delta):
+        return
+    await db.execute(
+        update(User).where(User.id == user_id)
+        .values(used_bytes=User.used_bytes + size_delta, file_count=User.file_count + count_delta)
+        .execution_options(synchronize_session=False)
+    )
+
+async def subtree_files(db: AsyncSession, folder: Folder) -> List[Tuple[File, str]]:
+    """(file, path inside the folder) for every file in the subtree, e.g. (f, "docs/2024/a.txt")."""
+    res = await db.execute(
+        select(Folder.id, Folder.parent_id, Folder.name).where(Folder.owner_id == folder.owner_id).where(subtree_filter(folder.path))
+    )
+    rows = res.all()
+    parents = {fid: (parent_id, name) for fid, parent_id, name in rows}
+
+    prefixes: Dict[int, str] = {folder.id: ""}
+    def _prefix(fid: int) -> str:
+        if fid not in prefixes:
+            parent_id, name = parents[fid]
+            prefixes[fid] = f"{_prefix(parent_id)}{name}/"
+        return prefixes[fid]
+
+    files = await db.execute(
+        select(File).where(File.folder_id.in_(list(parents))).where(File.deleted_at.is_(None)).order_by(File.folder_id, File.filename)
+    )
+    return [(f, _prefix(f.folder_id) + f.filename) for f in files.scalars().all()]
+
+def encode_cursor(kind: str, name: str, item_id: int) -> str:
+    return base64.urlsafe_b64encode(json.dumps([kind, name, item_id]).encode()).decode()
+
+def decode_cursor(cursor: Optional[str]) -> Optional[Tuple[str, str, int]]:
+    if not cursor:
+        return None
+    try:
+        kind, name, item_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        if kind not in ("folder", "file"):
+            raise ValueError(kind)
+        return kind, str(name), int(item_id)
+    except Exception:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+async def list_folder_items(db: AsyncSession, owner_id: int, folder_id: Optional[int], cursor: Optional[str], limit: int) -> dict:
+    """Subfolders first, then files, both by (name, id); keyset pagination with an opaque cursor."""
+    after = decode_cursor(cursor)
+    items: List[dict] = []
+
+    if after is None or after[0] == "folder":
+        q = select(Folder).where(Folder.owner_id == owner_id)
+        q = q.where(Folder.parent_id.is_(None) if folder_id is None else Folder.parent_id == folder_id)
+        if after is not None:
+            q = q.where((Folder.name > after[1]) | ((Folder.name == after[1]) & (Folder.id > after[2])))
+        res = await db.execute(q.order_by(Folder.name, Folder.id).limit(limit + 1))
+        for f in res.scalars().all():
+            items.append({
+                "type": "folder", "id": f.id, "name": f.name,
+                "size": f.total_size, "file_count": f.file_count,
+                "created_at": f.created_at.isoformat() if f.created_at else None,
+            })
+
+    if len(items) <= limit:
+        q = select(File).where(File.uploaded_by == owner_id).where(File.deleted_at.is_(None))
+        q = q.where(File.folder_id.is_(None) if folder_id is None else File.folder_id == folder_id)
+        if after is not None and after[0] == "file":
+            q = q.where((File.filename > after[1]) | ((File.filename == after[1]) & (File.id > after[2])))
+        res = await db.execute(q.order_by(File.filename, File.id).limit(limit + 1 - len(items)))
+        for f in res.scalars().all():
+            items.append({
+                "type": "file", "id": f.id, "name": f.filename, "size": f.size,
+                "uploaded_at": f.uploaded_at.isoformat() if f.uploaded_at else None,
+            })
+
+    next_cursor = None
+    if len(items) > limit:
+        items = items[:limit]
+        last = items[-1]
+        next_cursor = encode_cursor(last["type"], last["name"], last["id"])
+    return {"items": items, "next_cursor": next_cursor}
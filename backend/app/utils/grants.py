@@ -0,0 +1,73 @@
+from typing import Iterable, Optional
+
+from fastapi import HTTPException, status
+from sqlalchemy import delete, func, insert, select, union_all
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.grant import FileAccess, FileGrant, LEVEL_READ, LEVEL_WRITE
+from app.models.group import Group, GroupMember
+from app.models.user import User
+from app.utils.permissions import check_permission
+
+# File sharing between accounts. file_grants (user or group, read/write) is the source of truth;
+# file_access is derived from it: one row per (user, file) with the highest level any grant gives.
+# Authorization is then one primary-key lookup / indexed join instead of walking grants and groups.
+# Every change to grants or group membership rebuilds the affected slice in the same transaction.
+
+LEVELS = {"read": LEVEL_READ, "write": LEVEL_WRITE}
+LEVEL_NAMES = {level: name for name, level in LEVELS.items()}
+
+async def rebuild_access(
+    db: AsyncSession,
+    user_ids: Optional[Iterable[int]] = None,
+    file_ids: Optional[Iterable[int]] = None,
+) -> None:
+    """Recomputes file_access for these users and/or files (both None = everything); the caller commits."""
+    user_ids = None if user_ids is None else sorted(set(user_ids))
+    file_ids = None if file_ids is None else sorted(set(file_ids))
+    if user_ids == [] or file_ids == []:
+        return
+
+    direct = select(
+        FileGrant.grantee_user_id.label("user_id"), FileGrant.file_id.label("file_id"), FileGrant.level.label("level")
+    ).where(FileGrant.grantee_user_id.is_not(None))
+    via_group = select(
+        GroupMember.user_id.label("user_id"), FileGrant.file_id.label("file_id"), FileGrant.level.label("level")
+    ).join(GroupMember, GroupMember.group_id == FileGrant.grantee_group_id)
+    clear = delete(FileAccess)
+    if user_ids is not None:
+        direct = direct.where(FileGrant.grantee_user_id.in_(user_ids))
+        via_group = via_group.where(GroupMember.user_id.in_(user_ids))
+        clear = clear.where(FileAccess.user_id.in_(user_ids))
+    if file_ids is not None:
+        direct = direct.where(FileGrant.file_id.in_(file_ids))
+        via_group = via_group.where(FileGrant.file_id.in_(file_ids))
+        clear = clear.where(FileAccess.file_id.in_(file_ids))
+
+    grants = union_all(direct, via_group).subquery()
+    effective = select(grants.c.user_id, grants.c.file_id, func.max(grants.c.level)).group_by(grants.c.user_id, grants.c.file_id)
+    await db.execute(clear)
+    await db.execute(insert(FileAccess).from_select(["user_id", "file_id", "level"], effective))
+
+async def group_member_ids(db: AsyncSession, group_id: int) -> list:
+    res = await db.execute(select(GroupMember.user_id).where(GroupMember.group_id == group_id))
+    return list(res.scalars().all())
+
+async def get_manageable_group(db: AsyncSession, user: User, group_id: int) -> Group:
+    # Members are managed by the group's creator or an admin
+    group = await db.get(Group, group_id)
+    if group is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Group not found")
+    if group.owner_id != user.id and not check_permission(user, "update", "user_account"):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Only the group owner or an admin can change this group")
+    return group
+
+def grant_out(grant: FileGrant) -> dict:
+    return {
+        "id": grant.id,
+        "file_id": grant.file_id,
+        "user_id": grant.grantee_user_id,
+        "group_id": grant.grantee_group_id,
+        "level": LEVEL_NAMES[grant.level],
+        "created_at": grant.created_at.isoformat() if grant.created_at else None,
+    }
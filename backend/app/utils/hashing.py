@@ -0,0 +1,219 @@
+import asyncio
+import hashlib
+import importlib.util
+import mmap
+import os
+import secrets
+from concurrent.futures import ThreadPoolExecutor
+from typing import BinaryIO, List, NamedTuple, Optional, Tuple
+
+from app.utils import config
+
+# Content hashing. Every stored checksum is recorded with its algorithm (checksum_algo on blobs / file_versions):
+#   - "sha256": the whole content through SHA-256 (every row written before algorithms were recorded),
+#   - "sha256-tree" / "blake3-tree": the content is cut into TREE_CHUNK_SIZE chunks, each chunk is hashed on its
+#     own (leaves), and the checksum is the hash of the size and the concatenated leaves. Leaves are independent, so
+#     they are computed by several threads (hashlib and blake3 release the GIL), and they are kept
+#     (blobs.chunk_digests) to check a byte range - or find the damaged part of a blob - without the rest.
+# blake3 is optional (pip install blake3); HASH_ALGORITHM picks the algorithm of new content.
+
+SHA256 = "sha256"
+SHA256_TREE = "sha256-tree"
+BLAKE3_TREE = "blake3-tree"
+TREE_CHUNK_SIZE = 4 * 1024 * 1024  # part of the tree algorithms' definition: never change it
+DIGEST_SIZE = 32
+
+HAS_BLAKE3 = importlib.util.find_spec("blake3") is not None
+ALGORITHMS = (SHA256, SHA256_TREE) + ((BLAKE3_TREE,) if HAS_BLAKE3 else ())
+
+_READ_CHUNK = 1024 * 1024
+_OFFLOAD_MIN = 64 * 1024
+
+class Digest(NamedTuple):
+    size: int
+    checksum: str
+    algo: str
+    chunks: Optional[bytes] = None  # concatenated leaf digests (tree algorithms)
+
+def is_tree(algo: str) -> bool:
+    return algo in (SHA256_TREE, BLAKE3_TREE)
+
+def default_algorithm() -> str:
+    if config.HASH_ALGORITHM in ALGORITHMS:
+        return config.HASH_ALGORITHM
+    print(f"HASH_ALGORITHM={config.HASH_ALGORITHM} is not available, using {SHA256_TREE}")
+    return SHA256_TREE
+
+def _new(algo: str):
+    if algo == BLAKE3_TREE:
+        import blake3
+
+        return blake3.blake3()
+    return hashlib.sha256()
+
+def leaf_digest(algo: str, chunk) -> bytes:
+    h = _new(algo)
+    h.update(chunk)
+    return h.digest()
+
+def tree_root(algo: str, size: int, chunks: bytes) -> str:
+    h = _new(algo)
+    h.update(b"tree:" + size.to_bytes(8, "big"))
+    h.update(chunks)
+    return h.hexdigest()
+
+class Hasher:
+    """Incremental hashing in the calling thread (reads that are already off the event loop)."""
+
+    def __init__(self, algo: Optional[str] = None):
+        self.algo = algo or default_algorithm()
+        self.size = 0
+        self._h = None if is_tree(self.algo) else _new(self.algo)
+        self._buf = bytearray()
+        self._leaves: List[bytes] = []
+
+    def update(self, data) -> None:
+        self.size += len(data)
+        if self._h is not None:
+            self._h.update(data)
+            return
+        self._buf += data
+        while len(self._buf) >= TREE_CHUNK_SIZE:
+            self._leaves.append(leaf_digest(self.algo, memoryview(self._buf)[:TREE_CHUNK_SIZE]))
+            del self._buf[:TREE_CHUNK_SIZE]
+
+    def digest(self) -> Digest:
+        if self._h is not None:
+            return Digest(self.size, self._h.hexdigest(), self.algo)
+        if self._buf:
+            self._leaves.append(leaf_digest(self.algo, bytes(self._buf)))
+            self._buf.clear()
+        chunks = b"".join(self._leaves)
+        return Digest(self.size, tree_root(self.algo, self.size, chunks), self.algo, chunks)
+
+class StreamHasher:
+    """
+    Hashing of a stream received on the event loop (uploads): the hashing itself runs in worker threads.
+    Tree leaves are hashed while the next chunks arrive, at most HASH_THREADS at a time per stream.
+    """
+
+    def __init__(self, algo: Optional[str] = None):
+        self.algo = algo or default_algorithm()
+        self.size = 0
+        self._h = None if is_tree(self.algo) else _new(self.algo)
+        self._buf = bytearray()
+        self._leaves: List[asyncio.Future] = []
+
+    async def update(self, data: bytes) -> None:
+        self.size += len(data)
+        if self._h is not None:
+            # Sequential by nature: off the loop only when the piece is worth a thread hop
+            if len(data) >= _OFFLOAD_MIN:
+                await asyncio.to_thread(self._h.update, data)
+            else:
+                self._h.update(data)
+            return
+        self._buf += data
+        while len(self._buf) >= TREE_CHUNK_SIZE:
+            chunk = bytes(self._buf[:TREE_CHUNK_SIZE])
+            del self._buf[:TREE_CHUNK_SIZE]
+            running = [f for f in self._leaves if not f.done()]
+            if len(running) >= max(1, config.HASH_THREADS):
+                await running[0]
+            self._leaves.append(asyncio.ensure_future(asyncio.to_thread(leaf_digest, self.algo, chunk)))
+
+    async def digest(self) -> Digest:
+        if self._h is not None:
+            return Digest(self.size, self._h.hexdigest(), self.algo)
+        if self._buf:
+            self._leaves.append(asyncio.ensure_future(asyncio.to_thread(leaf_digest, self.algo, bytes(self._buf))))
+            self._buf.clear()
+        chunks = b"".join(await asyncio.gather(*self._leaves))
+        return Digest(self.size, tree_root(self.algo, self.size, chunks), self.algo, chunks)
+
+# --- whole files (blocking) ---
+
+def hash_stream(f: BinaryIO, algo: Optional[str] = None) -> Digest:
+    hasher = Hasher(algo)
+    for data in iter(lambda: f.read(_READ_CHUNK), b""):
+        hasher.update(data)
+    return hasher.digest()
+
+def hash_file(path: str, algo: Optional[str] = None, threads: int = 1, mmap_min_bytes: int = 16 * 1024 * 1024) -> Digest:
+    """Digest of a local file; big files are mapped, and tree leaves are spread over `threads` threads."""
+    algo = algo or default_algorithm()
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if size == 0 or size < mmap_min_bytes:
+            return hash_stream(f, algo)
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            view = memoryview(mapped)
+            try:
+                if not is_tree(algo):
+                    # One update over the mapping: no read() copies, and the GIL is released for the whole buffer
+                    h = _new(algo)
+                    h.update(view)
+                    return Digest(size, h.hexdigest(), algo)
+                offsets = range(0, size, TREE_CHUNK_SIZE)
+                if threads > 1:
+                    with ThreadPoolExecutor(max_workers=threads) as pool:
+                        leaves = list(pool.map(lambda o: leaf_digest(algo, view[o:o + TREE_CHUNK_SIZE]), offsets))
+                else:
+                    leaves = [leaf_digest(algo, view[o:o + TREE_CHUNK_SIZE]) for o in offsets]
+            finally:
+                view.release()
+    chunks = b"".join(leaves)
+    return Digest(size, tree_root(algo, size, chunks), algo, chunks)
+
+# --- ranged checks ---
+
+def chunk_range(index: int, size: int) -> Tuple[int, int]:
+    start = index * TREE_CHUNK_SIZE
+    return start, min(start + TREE_CHUNK_SIZE, size)
+
+def damaged_ranges(expected: Optional[bytes], actual: Optional[bytes], size: int) -> List[Tuple[int, int]]:
+    """Byte ranges [start, end) whose leaf differs between two digests of the same tree algorithm."""
+    if not expected or not actual:
+        return []
+    count = max(len(expected), len(actual)) // DIGEST_SIZE
+    return [
+        chunk_range(i, size) for i in range(count)
+        if expected[i * DIGEST_SIZE:(i + 1) * DIGEST_SIZE] != actual[i * DIGEST_SIZE:(i + 1) * DIGEST_SIZE]
+    ]
+
+def verify_range(f: BinaryIO, algo: str, chunks: bytes, start: int, end: int) -> List[Tuple[int, int]]:
+    """Checks only the chunks overlapping [start, end) of a seekable file; returns the damaged ranges."""
+    damaged = []
+    for index in range(start // TREE_CHUNK_SIZE, (max(end, start + 1) - 1) // TREE_CHUNK_SIZE + 1):
+        expected = chunks[index * DIGEST_SIZE:(index + 1) * DIGEST_SIZE]
+        if not expected:
+            break
+        f.seek(index * TREE_CHUNK_SIZE)
+        data = f.read(TREE_CHUNK_SIZE)
+        if leaf_digest(algo, data) != expected:
+            damaged.append((index * TREE_CHUNK_SIZE, index * TREE_CHUNK_SIZE + len(data)))
+    return damaged
+
+# --- proof of possession (upload preflight) ---
+# Matching a checksum proves nothing about having the content (checksums of other users' files can be known),
+# so linking to content the caller does not reference yet needs a proof: sha256 over the nonce (ASCII hex)
+# followed by the bytes of a few ranges picked at random, which only the content itself answers.
+
+PROOF_RANGES = 3
+PROOF_RANGE_SIZE = 4096
+
+def possession_challenge(size: int) -> Tuple[str, List[Tuple[int, int]]]:
+    """(nonce, [start, end) ranges) for content of `size` bytes; small content is asked for whole."""
+    nonce = secrets.token_hex(16)
+    if size <= PROOF_RANGES * PROOF_RANGE_SIZE:
+        return nonce, [(0, size)]
+    starts = sorted(secrets.randbelow(size - PROOF_RANGE_SIZE + 1) for _ in range(PROOF_RANGES))
+    return nonce, [(start, start + PROOF_RANGE_SIZE) for start in starts]
+
+def possession_digest(f: BinaryIO, nonce: str, ranges: List[Tuple[int, int]]) -> str:
+    h = hashlib.sha256(nonce.encode())
+    for start, end in ranges:
+        f.seek(start)
+        h.update(f.read(end - start))
+    return h.hexdigest()
+
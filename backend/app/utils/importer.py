@@ -0,0 +1,271 @@
+import asyncio
+import os
+import shutil
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from fastapi import HTTPException, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.file import File
+from app.models.folder import Folder
+from app.storage import _abs_under_root
+from app.utils import config
+from app.utils.hashing import Digest, default_algorithm, hash_file
+from app.utils.ingest import IngestItem, ingest_files
+from app.utils.metrics import STORAGE_BYTES
+
+# Server-side import of an existing directory tree into a user's storage (admin job / python -m app.import_tree):
+#   - the tree is walked with os.scandir; every directory becomes a folder (an existing one with that name is reused),
+#   - file contents are hashed (HASH_ALGORITHM) in a process pool (mmap for big files), so dedup against live blobs happens
+#     before any byte is written and duplicates cost no I/O at all,
+#   - new content is placed in STORAGE_ROOT by reflink (copy-on-write clone) or hard link where the filesystem
+#     allows it, a plain copy otherwise,
+#   - rows go through the bulk ingest path in IMPORT_BATCH_SIZE transactions.
+# Resume: a file already present in its target folder with the same size is skipped, so running the same
+# import again (or a job requeued after a restart) continues where the previous run stopped.
+
+LINK_MODES = ("reflink", "hardlink", "copy")
+FICLONE = 0x40049409  # linux/fs.h: _IOW(0x94, 9, int)
+_MAX_REPORTED_FAILURES = 1000
+
+ProgressCallback = Callable[[int, int, str], Awaitable[None]]
+
+# --- hashing (runs in the worker processes) ---
+
+def hash_files(paths: List[str], algo: str, mmap_min_bytes: int) -> List[object]:
+    # Digest per path, or the error text; one task per chunk of paths keeps the IPC overhead small
+    results: List[object] = []
+    for path in paths:
+        try:
+            results.append(hash_file(path, algo, mmap_min_bytes=mmap_min_bytes))
+        except OSError as e:
+            results.append(str(e))
+    return results
+
+# --- placing the content (blocking: run via asyncio.to_thread) ---
+
+def _reflink(src: str, dest: str) -> None:
+    import fcntl
+
+    with open(src, "rb") as fin, open(dest, "wb") as fout:
+        fcntl.ioctl(fout.fileno(), FICLONE, fin.fileno())
+
+def place_file(src: str, rel_path: str, mode: str) -> str:
+    """Puts src at rel_path under STORAGE_ROOT; returns how: "reflink", "hardlink" or "copy"."""
+    dest = _abs_under_root(rel_path)
+    tmp = dest + f".{uuid.uuid4().hex}.part"
+    try:
+        method = "copy"
+        if mode == "hardlink":
+            try:
+                os.link(src, tmp)
+                method = "hardlink"
+            except OSError:
+                pass
+        if method == "copy" and mode in ("reflink", "hardlink"):
+            try:
+                _reflink(src, tmp)
+                method = "reflink"
+            except (OSError, ImportError):
+                Path(tmp).unlink(missing_ok=True)
+        if method == "copy":
+            shutil.copyfile(src, tmp)
+        os.replace(tmp, dest)
+        return method
+    except BaseException:
+        Path(tmp).unlink(missing_ok=True)
+        raise
+
+# --- walking the tree ---
+
+def _scan_dir(path: str) -> Tuple[List[Tuple[str, int]], List[str], int]:
+    # (files with their stat size, subdirectories, skipped entries); symlinks and special files are skipped
+    files, dirs, skipped = [], [], 0
+    with os.scandir(path) as it:
+        for entry in it:
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    dirs.append(entry.name)
+                elif entry.is_file(follow_symlinks=False):
+                    files.append((entry.name, entry.stat(follow_symlinks=False).st_size))
+                else:
+                    skipped += 1
+            except OSError:
+                skipped += 1
+    files.sort()
+    dirs.sort()
+    return files, dirs, skipped
+
+def count_tree(root: str) -> Tuple[int, int]:
+    """(files, bytes) under root, for progress reporting; same filtering as the import walk."""
+    files = size = 0
+    stack = [root]
+    while stack:
+        path = stack.pop()
+        try:
+            entries, dirs, _ = _scan_dir(path)
+        except OSError:
+            continue
+        files += len(entries)
+        size += sum(s for _, s in entries)
+        stack.extend(os.path.join(path, d) for d in dirs)
+    return files, size
+
+def resolve_import_source(source: str) -> str:
+    """Real path of an import source; it must be a directory inside one of IMPORT_ALLOWED_ROOTS."""
+    if not config.IMPORT_ALLOWED_ROOTS:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Server-side import is disabled (IMPORT_ALLOWED_ROOTS is not set)")
+    path = os.path.realpath(source)
+    allowed = [os.path.realpath(root) for root in config.IMPORT_ALLOWED_ROOTS]
+    if not any(path == root or path.startswith(root + os.sep) for root in allowed):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Source is outside IMPORT_ALLOWED_ROOTS")
+    if not os.path.isdir(path):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Source is not a directory")
+    return path
+
+# --- the import ---
+
+async def _child_folder(db: AsyncSession, owner_id: int, parent: Optional[Folder], name: str, stats: dict) -> Folder:
+    parent_id = parent.id if parent else None
+    q = select(Folder).where(Folder.owner_id == owner_id).where(Folder.name == name)
+    q = q.where(Folder.parent_id.is_(None) if parent_id is None else Folder.parent_id == parent_id)
+    folder = (await db.execute(q.limit(1))).scalars().first()
+    if folder is not None:
+        return folder
+    folder = Folder(owner_id=owner_id, parent_id=parent_id, name=name, path="", total_size=0, file_count=0)
+    db.add(folder)
+    await db.flush()
+    folder.path = f"{parent.path if parent else '/'}{folder.id}/"
+    await db.commit()
+    stats["folders_created"] += 1
+    return folder
+
+async def _already_imported(db: AsyncSession, owner_id: int, folder_id: Optional[int], files: List[Tuple[str, int]]) -> set:
+    # Names present (live) in the target folder with the same size: done by an earlier run
+    present = set()
+    names = [name for name, _ in files]
+    for start in range(0, len(names), 500):
+        res = await db.execute(
+            select(File.filename, File.size)
+            .where(File.uploaded_by == owner_id)
+            .where(File.folder_id.is_(None) if folder_id is None else File.folder_id == folder_id)
+            .where(File.filename.in_(names[start:start + 500]))
+            .where(File.deleted_at.is_(None))
+        )
+        present.update(res.all())
+    return {name for name, size in files if (name, size) in present}
+
+async def import_tree(
+    db: AsyncSession,
+    owner_id: int,
+    source: str,
+    folder_id: Optional[int] = None,
+    link_mode: Optional[str] = None,
+    progress: Optional[ProgressCallback] = None,
+) -> dict:
+    """
+    Imports every regular file under `source` (already validated) into the owner's folder `folder_id`
+    (None = top level), mirroring its directory structure. Returns the counters of the run.
+    """
+    link_mode = link_mode or config.IMPORT_LINK_MODE
+    if link_mode not in LINK_MODES:
+        raise ValueError(f"Unknown link mode: {link_mode}")
+    root_folder = None
+    if folder_id is not None:
+        root_folder = await db.get(Folder, folder_id)
+        if root_folder is None or root_folder.owner_id != owner_id:
+            raise ValueError("Target folder not found")
+
+    stats: Dict[str, object] = {
+        "files": 0, "imported": 0, "deduplicated": 0, "skipped_existing": 0, "skipped_entries": 0,
+        "failed": 0, "bytes": 0, "folders_created": 0, "reflink": 0, "hardlink": 0, "copy": 0,
+    }
+    failures: List[dict] = []
+    total_files, total_bytes = await asyncio.to_thread(count_tree, source)
+    done = 0
+
+    async def _report(message: str) -> None:
+        if progress is not None:
+            await progress(done, total_files, message)
+
+    loop = asyncio.get_running_loop()
+    algo = default_algorithm()
+    workers = max(1, config.IMPORT_HASH_WORKERS)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+
+        async def _hash(paths: List[str]) -> List[object]:
+            # Chunks spread over the pool; results keep the order of paths
+            step = max(1, min(256, -(-len(paths) // workers)))
+            parts = await asyncio.gather(*(
+                loop.run_in_executor(pool, hash_files, paths[i:i + step], algo, config.IMPORT_MMAP_MIN_BYTES)
+                for i in range(0, len(paths), step)
+            ))
+            return [result for part in parts for result in part]
+
+        def _store_from(src: str, digest: Digest):
+            async def _store(rel_path: str) -> Digest:
+                method = await asyncio.to_thread(place_file, src, rel_path, link_mode)
+                stats[method] += 1
+                STORAGE_BYTES.inc(digest.size, op="import_" + method)
+                return digest
+            return _store
+
+        # Depth-first, names sorted: the same order on every run
+        stack: List[Tuple[str, str, Optional[Folder]]] = [(source, "", root_folder)]
+        while stack:
+            path, rel_dir, folder = stack.pop()
+            try:
+                files, dirs, skipped = await asyncio.to_thread(_scan_dir, path)
+            except OSError as e:
+                failures.append({"path": rel_dir or ".", "detail": str(e)})
+                stats["failed"] += 1
+                continue
+            stats["skipped_entries"] += skipped
+            owner_folder_id = folder.id if folder else None
+
+            for name in reversed(dirs):
+                if len(name) > 255 or "\\" in name:
+                    failures.append({"path": os.path.join(rel_dir, name), "detail": "Invalid folder name"})
+                    stats["failed"] += 1
+                    continue
+                child = await _child_folder(db, owner_id, folder, name, stats)
+                stack.append((os.path.join(path, name), os.path.join(rel_dir, name), child))
+
+            if not files:
+                continue
+            done_before = await _already_imported(db, owner_id, owner_folder_id, files)
+            todo = [(name, size) for name, size in files if name not in done_before]
+            stats["skipped_existing"] += len(done_before)
+            done += len(done_before)
+
+            for start in range(0, len(todo), config.IMPORT_BATCH_SIZE):
+                chunk = todo[start:start + config.IMPORT_BATCH_SIZE]
+                hashed = await _hash([os.path.join(path, name) for name, _ in chunk])
+                items = []
+                for (name, _), result in zip(chunk, hashed):
+                    if isinstance(result, str) or len(name) > 255:
+                        failures.append({"path": os.path.join(rel_dir, name), "detail": result if isinstance(result, str) else "Name too long"})
+                        stats["failed"] += 1
+                        continue
+                    items.append(IngestItem(name, _store_from(os.path.join(path, name), result), result))
+
+                uploaded, failed = await ingest_files(
+                    db, owner_id, items, notes="import", folder_id=owner_folder_id, batch_size=config.IMPORT_BATCH_SIZE
+                )
+                stats["imported"] += len(uploaded)
+                stats["deduplicated"] += sum(1 for u in uploaded if u["duplicate"])
+                stats["bytes"] += sum(u["size"] or 0 for u in uploaded)
+                stats["failed"] += len(failed)
+                failures.extend({"path": os.path.join(rel_dir, f["filename"]), "detail": f["detail"]} for f in failed)
+                done += len(chunk)
+                await _report(f"{done}/{total_files} files ({rel_dir or '.'})")
+
+    stats["files"] = total_files
+    stats["total_bytes"] = total_bytes
+    stats["failures"] = failures[:_MAX_REPORTED_FAILURES]
+    await _report(f"{done}/{total_files} files")
+    return stats
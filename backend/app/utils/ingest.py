@@ -0,0 +1,313 @@
+import asyncio
+from collections import Counter
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, List, NamedTuple, Optional, Tuple
+from sqlalchemy import select, func, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.blob import Blob
+from app.models.file import File
+from app.models.file_version import FileVersion
+from app.models.log_book import LogBook
+from app.storage import build_rel_path, unlink_rel_paths
+from app.utils import config
+from app.utils.blobs import find_live_blobs, add_blob_refs
+from app.utils.changes import record_file_changes
+from app.utils.folders import adjust_folder_usage, adjust_user_usage
+from app.utils.hashing import Digest
+from app.utils.metrics import UPLOAD_DEDUP
+from app.utils.previews import enqueue_previews
+from app.utils.share_cache import invalidate_file_shares
+
+# Many-file ingestion: the same rules as POST /api/upload (new file or next version, dedup
+# against live blobs, "upload" audit row), but resolved with set-based queries per batch,
+# blobs written concurrently and one commit per batch instead of two per file.
+
+class IngestItem(NamedTuple):
+    filename: str
+    # Writes the content to the given path (relative to STORAGE_ROOT) and returns its Digest
+    store: Callable[[str], Awaitable[Digest]]
+    # Digest when known up front (server-side import): if a live blob already has it,
+    # the version is linked to that blob and store is never called
+    digest: Optional[Digest] = None
+
+class _Planned(NamedTuple):
+    item: IngestItem
+    file: File
+    version: int
+    rel_path: str
+    is_new: bool
+
+def _key(digest: Digest) -> Tuple[str, str]:
+    return digest.algo, digest.checksum
+
+async def _find_live(db: AsyncSession, digests: List[Digest]) -> Dict[Tuple[str, str], Blob]:
+    # (algo, checksum) -> live blob; one set-based lookup per algorithm (normally just one)
+    by_algo: Dict[str, List[str]] = {}
+    for digest in digests:
+        by_algo.setdefault(digest.algo, []).append(digest.checksum)
+    found: Dict[Tuple[str, str], Blob] = {}
+    for algo, checksums in by_algo.items():
+        for checksum, blob in (await find_live_blobs(db, checksums, algo)).items():
+            found[(algo, checksum)] = blob
+    return found
+
+async def ingest_files(
+    db: AsyncSession,
+    user_id: int,
+    items: List[IngestItem],
+    notes: Optional[str] = None,
+    client_ip: Optional[str] = None,
+    folder_id: Optional[int] = None,
+    batch_size: Optional[int] = None,
+) -> Tuple[List[dict], List[dict]]:
+    """Returns (uploaded, failed); a failing batch is rolled back without affecting the others."""
+    batch_size = batch_size or config.BULK_UPLOAD_BATCH_SIZE
+    uploaded: List[dict] = []
+    failed: List[dict] = []
+
+    unique: List[IngestItem] = []
+    seen = set()
+    for item in items:
+        if item.filename in seen:
+            failed.append({"filename": item.filename, "detail": "Duplicate filename in request"})
+            continue
+        seen.add(item.filename)
+        unique.append(item)
+
+    semaphore = asyncio.Semaphore(config.BULK_UPLOAD_CONCURRENCY)
+    preview_sources: List[Tuple[str, str, str]] = []
+    for start in range(0, len(unique), batch_size):
+        batch = unique[start:start + batch_size]
+        written: List[str] = []
+        try:
+            uploaded.extend(await _ingest_batch(db, user_id, folder_id, batch, semaphore, notes, client_ip, failed, written, preview_sources))
+        except Exception as e:
+            await db.rollback()
+            await asyncio.to_thread(unlink_rel_paths, written)
+            reported = {f["filename"] for f in failed}
+            failed.extend(
+                {"filename": item.filename, "detail": f"Internal server error: {str(e)}"}
+                for item in batch if item.filename not in reported
+            )
+    # One preview job for everything committed above
+    await enqueue_previews(db, preview_sources)
+    return uploaded, failed
+
+async def _resolve_targets(
+    db: AsyncSession, user_id: int, folder_id: Optional[int], filenames: List[str]
+) -> Dict[str, Tuple[File, int, bool]]:
+    # filename -> (File, next version number, is_new); new File rows are flushed to get their ids
+    res = await db.execute(
+        select(File)
+        .where(File.uploaded_by == user_id)
+        .where(File.folder_id.is_(None) if folder_id is None else File.folder_id == folder_id)
+        .where(File.filename.in_(filenames))
+        .where(File.deleted_at.is_(None))
+        .order_by(File.id)
+    )
+    existing: Dict[str, File] = {}
+    for f in res.scalars().all():
+        existing.setdefault(f.filename, f)
+
+    max_versions: Dict[int, int] = {}
+    if existing:
+        res = await db.execute(
+            select(FileVersion.file_id, func.max(FileVersion.version_number))
+            .where(FileVersion.file_id.in_([f.id for f in existing.values()]))
+            .group_by(FileVersion.file_id)
+        )
+        max_versions = dict(res.all())
+
+    new_files = {
+        name: File(filename=name, filepath="", size=None, uploaded_by=user_id, current_version=1, folder_id=folder_id)
+        for name in filenames if name not in existing
+    }
+    db.add_all(new_files.values())
+    await db.flush()
+
+    targets: Dict[str, Tuple[File, int, bool]] = {name: (f, 1, True) for name, f in new_files.items()}
+    for name, f in existing.items():
+        max_version = max_versions.get(f.id)
+        targets[name] = (f, (max_version if max_version is not None else f.current_version or 0) + 1, False)
+    return targets
+
+async def link_existing_blob(
+    db: AsyncSession,
+    user_id: int,
+    filename: str,
+    blob: Blob,
+    notes: Optional[str] = None,
+    client_ip: Optional[str] = None,
+    folder_id: Optional[int] = None,
+) -> Optional[dict]:
+    """
+    Creates the file (or its next version) on top of an already stored blob - no data transfer.
+    Returns None (and rolls back) if the blob was released concurrently.
+    """
+    f, version, is_new = (await _resolve_targets(db, user_id, folder_id, [filename]))[filename]
+    claimed = await db.execute(
+        update(Blob).where(Blob.id == blob.id).where(Blob.ref_count > 0).values(ref_count=Blob.ref_count + 1)
+        .execution_options(synchronize_session=False)
+    )
+    if claimed.rowcount != 1:
+        await db.rollback()
+        return None
+
+    await adjust_folder_usage(db, folder_id, blob.size - (0 if is_new else f.size or 0), 1 if is_new else 0)
+    await adjust_user_usage(db, user_id, blob.size - (0 if is_new else f.size or 0), 1 if is_new else 0)
+    f.filepath = blob.filepath
+    f.size = blob.size
+    f.current_version = version
+    db.add(FileVersion(
+        file_id=f.id, version_number=version, filepath=blob.filepath, size=blob.size, notes=notes,
+        checksum=blob.checksum, checksum_algo=blob.checksum_algo,
+    ))
+    db.add(LogBook(
+        user_id=user_id, action="upload", file_id=f.id, ip_address=client_ip, timestamp=datetime.utcnow(),
+        details={"size": blob.size, "version": version, "duplicate": True, "preflight": True},
+    ))
+    await record_file_changes(db, user_id, [(f.id, "created" if is_new else "updated")])
+    await db.commit()
+    if not is_new:
+        invalidate_file_shares(f.id)
+    UPLOAD_DEDUP.inc(result="hit")
+    return {"file_id": f.id, "filename": f.filename, "size": blob.size, "version": version, "duplicate": True}
+
+async def _store_now(p: _Planned, semaphore: asyncio.Semaphore) -> Digest:
+    async with semaphore:
+        return await p.item.store(p.rel_path)
+
+async def _ingest_batch(
+    db: AsyncSession,
+    user_id: int,
+    folder_id: Optional[int],
+    batch: List[IngestItem],
+    semaphore: asyncio.Semaphore,
+    notes: Optional[str],
+    client_ip: Optional[str],
+    failed: List[dict],
+    written: List[str],
+    preview_sources: List[Tuple[str, str, str]],
+) -> List[dict]:
+    # 1. Existing files and their latest version numbers (two queries for the whole batch)
+    targets = await _resolve_targets(db, user_id, folder_id, [i.filename for i in batch])
+    plan: List[_Planned] = []
+    for item in batch:
+        f, version, is_new = targets[item.filename]
+        plan.append(_Planned(item, f, version, build_rel_path(user_id, f.id, item.filename, version), is_new))
+
+    # 2. Write the blobs concurrently (bounded); known content that is already stored is not written at all
+    known = await _find_live(db, [p.item.digest for p in plan if p.item.digest])
+    first_known: Dict[Tuple[str, str], _Planned] = {}
+    for p in plan:
+        if p.item.digest and _key(p.item.digest) not in known:
+            first_known.setdefault(_key(p.item.digest), p)
+
+    async def _store(p: _Planned):
+        digest = p.item.digest
+        if digest and (_key(digest) in known or first_known[_key(digest)] is not p):
+            return None
+        return await _store_now(p, semaphore)
+
+    results = await asyncio.gather(*(_store(p) for p in plan), return_exceptions=True)
+    stored: List[Tuple[_Planned, Digest, bool]] = []
+    for p, result in zip(plan, results):
+        if isinstance(result, BaseException):
+            failed.append({"filename": p.item.filename, "detail": f"Storage error: {str(result)}"})
+            if p.is_new:
+                await db.delete(p.file)
+            continue
+        if result is None:
+            stored.append((p, p.item.digest, False))
+            continue
+        written.append(p.rel_path)
+        stored.append((p, result, True))
+
+    # 3. Claim the live blobs this batch links to. Content whose blob was released meanwhile (trash purge,
+    #    retention, rehash) is stored as a new blob: from the uploaded copy, or written now if there was none.
+    live = dict(known)
+    live.update(await _find_live(db, [digest for _, digest, wrote in stored if wrote and _key(digest) not in known]))
+    released = await add_blob_refs(db, Counter(live[_key(d)].id for _, d, _ in stored if _key(d) in live))
+    live = {key: blob for key, blob in live.items() if blob.id not in released}
+    copied = {_key(d) for _, d, wrote in stored if wrote}
+    rewrite: Dict[Tuple[str, str], int] = {}
+    for i, (p, digest, wrote) in enumerate(stored):
+        if _key(digest) not in live and _key(digest) not in copied:
+            rewrite.setdefault(_key(digest), i)
+    if rewrite:
+        results = await asyncio.gather(
+            *(_store_now(stored[i][0], semaphore) for i in rewrite.values()), return_exceptions=True
+        )
+        lost = set()
+        for (key, i), result in zip(rewrite.items(), results):
+            p = stored[i][0]
+            if isinstance(result, BaseException):
+                lost.add(key)
+                continue
+            written.append(p.rel_path)
+            stored[i] = (p, result, True)
+        for p, digest, wrote in stored:
+            if not wrote and _key(digest) in lost:
+                failed.append({"filename": p.item.filename, "detail": "Storage error: content is no longer available"})
+                if p.is_new:
+                    await db.delete(p.file)
+        stored = [s for s in stored if s[2] or _key(s[1]) not in lost]
+
+    new_blobs: Dict[Tuple[str, str], Blob] = {}
+    duplicates: List[str] = []
+    now = datetime.utcnow()
+    uploaded = []
+    size_delta = count_delta = 0
+    for p, digest, wrote in stored:
+        blob = live.get(_key(digest))
+        if blob is None:
+            blob = new_blobs.get(_key(digest))
+            if blob is not None:
+                blob.ref_count += 1
+        is_deduplicated = blob is not None
+        if blob is None:
+            blob = Blob(
+                checksum=digest.checksum, checksum_algo=digest.algo, chunk_digests=digest.chunks,
+                filepath=p.rel_path, size=digest.size, ref_count=1,
+            )
+            new_blobs[_key(digest)] = blob
+            db.add(blob)
+        elif wrote:
+            duplicates.append(p.rel_path)
+
+        size_delta += blob.size - (0 if p.is_new else p.file.size or 0)
+        count_delta += 1 if p.is_new else 0
+        p.file.filepath = blob.filepath
+        p.file.size = blob.size
+        p.file.current_version = p.version
+        db.add(FileVersion(
+            file_id=p.file.id, version_number=p.version, filepath=blob.filepath, size=blob.size, notes=notes,
+            checksum=digest.checksum, checksum_algo=digest.algo,
+        ))
+        db.add(LogBook(
+            user_id=user_id, action="upload", file_id=p.file.id, ip_address=client_ip, timestamp=now,
+            details={"size": blob.size, "version": p.version, "duplicate": is_deduplicated, "bulk": True},
+        ))
+        uploaded.append({
+            "file_id": p.file.id, "filename": p.file.filename, "size": blob.size,
+            "version": p.version, "duplicate": is_deduplicated,
+        })
+
+    await adjust_folder_usage(db, folder_id, size_delta, count_delta)
+    await adjust_user_usage(db, user_id, size_delta, count_delta)
+    await record_file_changes(db, user_id, [(p.file.id, "created" if p.is_new else "updated") for p, _, _ in stored])
+    await db.commit()
+    written.clear()
+
+    # 4. After commit: drop the redundant copies and stale share cache entries
+    errors = await asyncio.to_thread(unlink_rel_paths, duplicates)
+    for err in errors:
+        print(f"Bulk upload cleanup failed: {err}")
+    for p, digest, _ in stored:
+        if not p.is_new:
+            invalidate_file_shares(p.file.id)
+        preview_sources.append((digest.checksum, p.file.filepath, p.file.filename))
+    UPLOAD_DEDUP.inc(len(stored) - len(new_blobs), result="hit")
+    UPLOAD_DEDUP.inc(len(new_blobs), result="miss")
+    return uploaded
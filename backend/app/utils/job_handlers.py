@@ -0,0 +1,189 @@
+import asyncio
+import csv
+import os
+import shutil
+from sqlalchemy import select, func, desc
+
+from app.models.log_book import LogBook
+from app.models.user import User
+from app.utils.accounts import purge_account
+from app.utils.archives import zip_members, open_zip, add_member
+from app.utils.backup import create_backup
+from app.utils.bundle_cache import bundle_key, get_or_build_bundle
+from app.utils.file_ops import delete_file_record, purge_trash
+from app.utils.folders import get_user_folder, subtree_files
+from app.utils.importer import import_tree
+from app.utils.jobs import JobContext, job_handler
+from app.utils.logging import log_action, log_actions, LOGBOOK_CSV_FIELDS, logbook_csv_row
+from app.utils.permissions import filter_files_user_can
+from app.utils.previews import generate_previews
+from app.utils.rehash import rehash_blobs
+from app.utils.retention import prune_versions
+from app.utils.scrubber import scrub_blobs
+from app.utils.tiering import demote_cold_blobs
+
+# Handlers are registered on import (app/main.py imports this module).
+
+async def _job_user(ctx: JobContext) -> User:
+    user = await ctx.db.get(User, ctx.user_id)
+    if user is None:
+        raise ValueError("Job owner no longer exists")
+    return user
+
+@job_handler("download_zip", concurrency=2, priority=10)
+async def build_zip_job(ctx: JobContext):
+    user = await _job_user(ctx)
+    if ctx.params.get("folder_id") is not None:
+        # Whole folder: archive paths relative to it
+        folder = await get_user_folder(ctx.db, user, ctx.params["folder_id"])
+        entries = await subtree_files(ctx.db, folder)
+        members = zip_members([f for f, _ in entries], {f.id: arcname for f, arcname in entries})
+    else:
+        files = await filter_files_user_can(ctx.db, user, ctx.params.get("file_ids", []), "read")
+        members = zip_members(files)
+    if not members:
+        raise ValueError("No authorized files found for the given IDs")
+
+    key = await bundle_key(ctx.db, members)
+
+    async def _build(tmp_path: str) -> None:
+        with open_zip(tmp_path) as zip_file:
+            for done, (file_obj, abs_path, arcname) in enumerate(members, 1):
+                await asyncio.to_thread(add_member, zip_file, abs_path, arcname)
+                await ctx.report(done, len(members), f"{done}/{len(members)} files")
+
+    bundle_path, cache_hit = await get_or_build_bundle(key, _build)
+    # The cached bundle may be evicted before the job result expires, so the artifact gets its own link
+    dest = ctx.artifact("files_download.zip")
+    try:
+        await asyncio.to_thread(os.link, bundle_path, dest)
+    except OSError:
+        await asyncio.to_thread(shutil.copyfile, bundle_path, dest)
+
+    await log_actions(ctx.db, user.id, "download", [f.id for f, _, _ in members], {"zip_part": True, "job_id": ctx.job_id})
+
+    return {"files": len(members), "size": os.path.getsize(dest), "cached": cache_hit}
+
+@job_handler("delete_files", concurrency=1, priority=0)
+async def delete_files_job(ctx: JobContext):
+    user = await _job_user(ctx)
+    requested = ctx.params.get("file_ids", [])
+    files = await filter_files_user_can(ctx.db, user, requested, "delete")
+    allowed = {f.id for f in files}
+    failed = [{"id": f_id, "detail": "File not found or no permission"} for f_id in requested if f_id not in allowed]
+
+    deleted_count = 0
+    for done, file_obj in enumerate(files, 1):
+        file_id = file_obj.id
+        try:
+            errors = await delete_file_record(ctx.db, file_obj)
+            if errors:
+                failed.append({"id": file_id, "detail": "; ".join(errors)})
+            await log_action(ctx.db, user_id=user.id, action="delete", file_id=file_id, details={"batch": True, "job_id": ctx.job_id})
+            deleted_count += 1
+        except Exception as e:
+            await ctx.db.rollback()
+            failed.append({"id": file_id, "detail": f"Internal server error: {str(e)}"})
+        await ctx.report(done, len(files), f"{done}/{len(files)} files")
+
+    return {"deleted_count": deleted_count, "failed_to_delete": failed}
+
+@job_handler("logbook_export", concurrency=1, priority=0)
+async def logbook_export_job(ctx: JobContext):
+    total = (await ctx.db.execute(select(func.count(LogBook.id)))).scalar_one()
+    dest = ctx.artifact("logbook_export.csv")
+
+    # Plain columns (no joined user/file rows), streamed in chunks
+    result = await ctx.db.stream(
+        select(LogBook.id, LogBook.user_id, LogBook.action, LogBook.timestamp, LogBook.file_id, LogBook.details)
+        .order_by(desc(LogBook.timestamp))
+        .execution_options(yield_per=5000)
+    )
+    written = 0
+    with open(dest, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=LOGBOOK_CSV_FIELDS)
+        writer.writeheader()
+        async for partition in result.partitions(5000):
+            writer.writerows(logbook_csv_row(row) for row in partition)
+            written += len(partition)
+            await ctx.report(written, total, f"{written}/{total} rows")
+
+    return {"rows": written}
+
+@job_handler("generate_previews", concurrency=1, priority=-10)
+async def generate_previews_job(ctx: JobContext):
+    items = ctx.params.get("items", [])
+    generated, failed = 0, 0
+    for done, item in enumerate(items, 1):
+        try:
+            generated += len(await generate_previews(item["checksum"], item["path"], item["filename"]))
+        except Exception as e:
+            # Unreadable / unsupported content: no preview, the rest of the batch goes on
+            failed += 1
+            print(f"Preview generation failed for {item['path']}: {e}")
+        await ctx.report(done, len(items), f"{done}/{len(items)} files")
+    return {"derivatives": generated, "failed": failed}
+
+@job_handler("import_tree", concurrency=1, priority=-5)
+async def import_tree_job(ctx: JobContext):
+    # Resumable: files already imported (same name and size in the target folder) are skipped
+    async def _progress(done: int, total: int, message: str) -> None:
+        await ctx.report(done, total, message)
+
+    return await import_tree(
+        ctx.db, ctx.params["owner_id"], ctx.params["source"], ctx.params.get("folder_id"),
+        ctx.params.get("link_mode"), progress=_progress,
+    )
+
+@job_handler("backup", concurrency=1, priority=-5)
+async def backup_job(ctx: JobContext):
+    async def _progress(done: int, total: int, message: str) -> None:
+        await ctx.report(done, total, message)
+
+    return await create_backup(progress=_progress)
+
+@job_handler("rehash_blobs", concurrency=1, priority=-10)
+async def rehash_blobs_job(ctx: JobContext):
+    # Resumable: blobs already on the target algorithm are not selected again
+    async def _progress(done: int, total: int, message: str) -> None:
+        await ctx.report(done, total, message)
+
+    return await rehash_blobs(ctx.db, ctx.params.get("algorithm"), progress=_progress)
+
+@job_handler("purge_account", concurrency=1, priority=-5)
+async def purge_account_job(ctx: JobContext):
+    # Resumable: every step selects what is still left of the account
+    async def _progress(done: int, total: int, message: str) -> None:
+        await ctx.report(done, total, message)
+
+    return await purge_account(ctx.db, ctx.params["user_id"], progress=_progress)
+
+@job_handler("retention_prune", concurrency=1, priority=-5)
+async def retention_prune_job(ctx: JobContext):
+    # Every batch is committed on its own; a rerun only finds what is still over the limits
+    async def _progress(done: int, total: int, message: str) -> None:
+        await ctx.report(done, total, message)
+
+    return await prune_versions(ctx.db, user_id=ctx.params.get("user_id"), progress=_progress)
+
+
+@job_handler("trash_purge", concurrency=1, priority=-5)
+async def trash_purge_job(ctx: JobContext):
+    # Every batch is committed on its own; a rerun only finds what is still in the expired trash
+    async def _progress(done: int, total: int, message: str) -> None:
+        await ctx.report(done, total, message)
+
+    return await purge_trash(ctx.db, progress=_progress)
+
+@job_handler("integrity_scrub", concurrency=1, priority=-10)
+async def integrity_scrub_job(ctx: JobContext):
+    # One batch, serialized with the periodic scrub
+    return await scrub_blobs(ctx.db, batch_size=ctx.params.get("batch_size"))
+
+@job_handler("tiering_sweep", concurrency=1, priority=-10)
+async def tiering_sweep_job(ctx: JobContext):
+    # Blobs are moved one by one; a rerun picks up whatever is still hot and cold enough
+    async def _progress(done: int, total: int, message: str) -> None:
+        await ctx.report(done, total, message)
+
+    return await demote_cold_blobs(ctx.db, limit=ctx.params.get("limit"), progress=_progress)
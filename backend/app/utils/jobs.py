@@ -0,0 +1,267 @@
+import asyncio
+import shutil
+import time
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, NamedTuple, Optional
+from uuid import uuid4
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db import AsyncSessionLocal
+from app.models.job import Job
+from app.storage import _abs_under_root, safe_name
+from app.utils import config
+
+# Lightweight persistent job queue. Jobs live in the `jobs` table; a runner started from
+# lifespan claims them with a conditional UPDATE (safe with several worker processes),
+# respects a per-type concurrency limit and runs blocking work through asyncio.to_thread.
+
+class JobCancelled(Exception):
+    pass
+
+class JobType(NamedTuple):
+    handler: Callable[["JobContext"], Awaitable[Optional[Dict[str, Any]]]]
+    concurrency: int
+    priority: int
+
+_job_types: Dict[str, JobType] = {}
+
+def job_handler(job_type: str, concurrency: int = 1, priority: int = 0):
+    """Registers `async def handler(ctx) -> dict | None` for a job type."""
+    def _register(func):
+        _job_types[job_type] = JobType(func, concurrency, priority)
+        return func
+    return _register
+
+def _utcnow() -> datetime:
+    return datetime.utcnow()
+
+def job_artifact_rel_dir(job_id: str) -> str:
+    return f"jobs/{job_id}"
+
+class JobContext:
+    def __init__(self, job: Job, db: AsyncSession):
+        self.job_id = job.id
+        self.user_id = job.user_id
+        self.params = job.params or {}
+        self.db = db
+        self.result_path: Optional[str] = None
+        self.result_filename: Optional[str] = None
+        self._last_report = 0.0
+
+    def artifact(self, filename: str) -> str:
+        """Reserves the job's downloadable artifact and returns its absolute path."""
+        rel = f"{job_artifact_rel_dir(self.job_id)}/{safe_name(filename)}"
+        self.result_path = rel
+        self.result_filename = filename
+        return _abs_under_root(rel)
+
+    async def report(self, done: int, total: int, message: Optional[str] = None, force: bool = False) -> None:
+        """Stores progress (throttled) and raises JobCancelled if a cancel was requested."""
+        now = time.monotonic()
+        if not force and now - self._last_report < config.JOB_PROGRESS_INTERVAL_SECONDS:
+            return
+        self._last_report = now
+        # Separate session: never commits the handler's own pending work
+        async with AsyncSessionLocal() as db:
+            await db.execute(
+                update(Job).where(Job.id == self.job_id).values(
+                    progress=(done / total) if total else 1.0,
+                    progress_message=message,
+                    heartbeat_at=_utcnow(),
+                )
+            )
+            await db.commit()
+            cancel = await db.execute(select(Job.cancel_requested).where(Job.id == self.job_id))
+            if cancel.scalar_one_or_none():
+                raise JobCancelled()
+
+async def enqueue_job(
+    db: AsyncSession,
+    job_type: str,
+    user_id: Optional[int],
+    params: Optional[Dict[str, Any]] = None,
+    priority: Optional[int] = None,
+) -> Job:
+    if job_type not in _job_types:
+        raise ValueError(f"Unknown job type: {job_type}")
+    job = Job(
+        id=str(uuid4()),
+        type=job_type,
+        status="queued",
+        priority=_job_types[job_type].priority if priority is None else priority,
+        user_id=user_id,
+        params=params or {},
+        progress=0.0,
+        cancel_requested=0,
+        created_at=_utcnow(),
+    )
+    db.add(job)
+    await db.commit()
+    if _runner is not None:
+        _runner.wake()
+    return job
+
+class JobRunner:
+    def __init__(self, max_workers: int):
+        self.max_workers = max_workers
+        self._running: Dict[str, int] = {}
+        self._tasks: set = set()
+        self._wake = asyncio.Event()
+        self._loop_task: Optional[asyncio.Task] = None
+
+    def wake(self) -> None:
+        self._wake.set()
+
+    def start(self) -> None:
+        self._loop_task = asyncio.create_task(self._loop(), name="job-runner")
+
+    async def stop(self) -> None:
+        if self._loop_task:
+            self._loop_task.cancel()
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*([self._loop_task] if self._loop_task else []), *self._tasks, return_exceptions=True)
+
+    def _free_types(self):
+        if sum(self._running.values()) >= self.max_workers:
+            return []
+        return [t for t, spec in _job_types.items() if self._running.get(t, 0) < spec.concurrency]
+
+    async def _loop(self) -> None:
+        await self._requeue_stale()
+        while True:
+            try:
+                while await self._claim_next():
+                    pass
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Job runner claim failed: {e}")
+            self._wake.clear()
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=config.JOB_POLL_INTERVAL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _requeue_stale(self) -> None:
+        # Jobs left "running" by a crashed worker: no heartbeat for JOB_STALE_SECONDS
+        cutoff = _utcnow() - timedelta(seconds=config.JOB_STALE_SECONDS)
+        async with AsyncSessionLocal() as db:
+            await db.execute(
+                update(Job)
+                .where(Job.status == "running")
+                .where(Job.heartbeat_at < cutoff)
+                .values(status="queued", progress=0.0, progress_message="requeued after worker restart")
+            )
+            await db.commit()
+
+    async def _claim_next(self) -> bool:
+        free = self._free_types()
+        if not free:
+            return False
+        async with AsyncSessionLocal() as db:
+            res = await db.execute(
+                select(Job.id, Job.type)
+                .where(Job.status == "queued")
+                .where(Job.type.in_(free))
+                .order_by(Job.priority.desc(), Job.created_at)
+                .limit(1)
+            )
+            row = res.first()
+            if row is None:
+                return False
+            now = _utcnow()
+            claimed = await db.execute(
+                update(Job)
+                .where(Job.id == row.id)
+                .where(Job.status == "queued")
+                .values(status="running", started_at=now, heartbeat_at=now)
+            )
+            await db.commit()
+            if claimed.rowcount != 1:
+                return True  # another worker got it; try the next one
+
+        self._running[row.type] = self._running.get(row.type, 0) + 1
+        task = asyncio.create_task(self._execute(row.id, row.type), name=f"job-{row.id}")
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return True
+
+    async def _heartbeat(self, job_id: str) -> None:
+        # Keeps a running job from looking stale while its handler goes a long time between progress reports
+        while True:
+            await asyncio.sleep(config.JOB_HEARTBEAT_SECONDS)
+            try:
+                async with AsyncSessionLocal() as db:
+                    await db.execute(
+                        update(Job).where(Job.id == job_id).where(Job.status == "running").values(heartbeat_at=_utcnow())
+                    )
+                    await db.commit()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Job {job_id} heartbeat failed: {e}")
+
+    async def _execute(self, job_id: str, job_type: str) -> None:
+        heartbeat = asyncio.create_task(self._heartbeat(job_id), name=f"job-{job_id}-heartbeat")
+        try:
+            async with AsyncSessionLocal() as db:
+                job = await db.get(Job, job_id)
+                ctx = JobContext(job, db)
+                values: Dict[str, Any]
+                try:
+                    result = await _job_types[job_type].handler(ctx)
+                    values = {
+                        "status": "succeeded", "progress": 1.0, "progress_message": "done", "result": result,
+                        "result_path": ctx.result_path, "result_filename": ctx.result_filename,
+                    }
+                except JobCancelled:
+                    await db.rollback()
+                    values = {"status": "cancelled"}
+                    _remove_artifacts(job_id)
+                except asyncio.CancelledError:
+                    # Shutdown: leave it running; the next start requeues it once the heartbeat is stale
+                    raise
+                except Exception as e:
+                    await db.rollback()
+                    values = {"status": "failed", "error": str(e)}
+                    _remove_artifacts(job_id)
+                values["finished_at"] = _utcnow()
+                await db.execute(update(Job).where(Job.id == job_id).values(**values))
+                await db.commit()
+        finally:
+            heartbeat.cancel()
+            self._running[job_type] -= 1
+            self.wake()
+
+def _remove_artifacts(job_id: str) -> None:
+    shutil.rmtree(_abs_under_root(job_artifact_rel_dir(job_id)), ignore_errors=True)
+
+async def expire_job_artifacts() -> None:
+    # Periodic: drop downloadable results older than JOB_ARTIFACT_TTL_SECONDS
+    cutoff = _utcnow() - timedelta(seconds=config.JOB_ARTIFACT_TTL_SECONDS)
+    async with AsyncSessionLocal() as db:
+        res = await db.execute(
+            select(Job.id).where(Job.finished_at < cutoff).where(Job.result_path.is_not(None))
+        )
+        job_ids = res.scalars().all()
+        for job_id in job_ids:
+            await asyncio.to_thread(_remove_artifacts, job_id)
+        if job_ids:
+            await db.execute(update(Job).where(Job.id.in_(job_ids)).values(result_path=None))
+            await db.commit()
+
+_runner: Optional[JobRunner] = None
+
+def start_job_runner() -> JobRunner:
+    global _runner
+    _runner = JobRunner(config.JOB_MAX_WORKERS)
+    _runner.start()
+    return _runner
+
+async def stop_job_runner() -> None:
+    global _runner
+    if _runner is not None:
+        await _runner.stop()
+        _runner = None
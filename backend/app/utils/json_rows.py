@@ -0,0 +1,79 @@
+import json
+from datetime import date, datetime
+from typing import AsyncIterator, List, Optional, Sequence
+
+from fastapi import HTTPException, status
+from fastapi.responses import Response, StreamingResponse
+from sqlalchemy.engine import Row
+from sqlalchemy.ext.asyncio import AsyncResult
+
+from app.utils import config
+
+# JSON for list endpoints, encoded straight from SQLAlchemy Row tuples (select the columns, not the entity):
+# no per-row dicts for the columnar format, no jsonable_encoder, no isoformat() per value.
+#   - format "objects" (default): [{"id": 1, "filename": ...}, ...], the same shape as before,
+#   - format "columnar": {"columns": ["id", "filename", ...], "rows": [[1, "a.txt", ...], ...]} (frontend grid).
+# Up to JSON_STREAM_THRESHOLD rows are one response with Content-Length; bigger results are streamed
+# from the DB cursor in chunks of JSON_STREAM_CHUNK_ROWS rows.
+
+try:
+    import orjson
+except ImportError:  # optional: stdlib json, several times slower on big lists
+    orjson = None
+
+ROW_FORMATS = ("objects", "columnar")
+
+def _default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+def dumps(value) -> bytes:
+    if orjson is not None:
+        # datetimes are written natively, in the same format as isoformat()
+        return orjson.dumps(value, default=_default)
+    return json.dumps(value, default=_default, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+def _encode_rows(rows: Sequence[Row], columns: Sequence[str], columnar: bool) -> bytes:
+    """Rows as JSON array items without the brackets ('' for no rows)."""
+    if columnar:
+        return dumps([tuple(r) for r in rows])[1:-1]
+    return dumps([dict(zip(columns, r)) for r in rows])[1:-1]
+
+async def rows_response(
+    result: AsyncResult,
+    columns: Sequence[str],
+    row_format: str = "objects",
+    not_found: Optional[str] = None,
+) -> Response:
+    """
+    result: `await session.stream(select(...))`, columns: the JSON keys, in select order.
+    not_found: 404 detail for an empty result (the default is an empty list).
+    """
+    if row_format not in ROW_FORMATS:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Invalid format: {row_format}")
+    columnar = row_format == "columnar"
+    head, tail = (b'{"columns":' + dumps(list(columns)) + b',"rows":[', b"]}") if columnar else (b"[", b"]")
+
+    first: List[Row] = await result.fetchmany(config.JSON_STREAM_THRESHOLD + 1)
+    if not first and not_found:
+        await result.close()
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=not_found)
+    if len(first) <= config.JSON_STREAM_THRESHOLD:
+        await result.close()
+        return Response(head + _encode_rows(first, columns, columnar) + tail, media_type="application/json")
+
+    async def _chunks() -> AsyncIterator[bytes]:
+        # The session (get_session) stays open until the body is sent: the cursor is read as we go
+        try:
+            yield head + _encode_rows(first, columns, columnar)
+            while True:
+                rows = await result.fetchmany(config.JSON_STREAM_CHUNK_ROWS)
+                if not rows:
+                    break
+                yield b"," + _encode_rows(rows, columns, columnar)
+            yield tail
+        finally:
+            await result.close()
+
+    return StreamingResponse(_chunks(), media_type="application/json")
@@ -24,3 +24,28 @@ async def log_action(
     await db.commit()
     await db.refresh(entry)
     return entry
+
+async def log_actions(
+    db: AsyncSession,
+    user_id: Optional[int],
+    action: str,
+    file_ids,
+    details: Optional[Dict[str, Any]] = None,
+) -> None:
+    # Same as log_action for many files, but one commit for the whole batch
+    now = datetime.utcnow()
+    for file_id in file_ids:
+        db.add(LogBook(user_id=user_id, action=action, file_id=file_id, details=dict(details or {}), timestamp=now))
+    await db.commit()
+
+LOGBOOK_CSV_FIELDS = ['id', 'user_id', 'action', 'timestamp', 'file_id', 'details']
+
+def logbook_csv_row(entry) -> Dict[str, Any]:
+    return {
+        'id': entry.id,
+        'user_id': entry.user_id,
+        'action': entry.action,
+        'timestamp': entry.timestamp.isoformat() if entry.timestamp else '',
+        'file_id': entry.file_id,
+        'details': str(entry.details)
+    }
@@ -0,0 +1,268 @@
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+# Minimal in-process metrics registry rendered in the Prometheus text format on GET /metrics.
+# Each worker process keeps its own values (scrape every worker, or sum them in Prometheus).
+
+LabelKey = Tuple[str, ...]
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_registry: List["_Metric"] = []
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(names: Iterable[str], values: Iterable[str], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def _key(self, labels: Dict[str, str]) -> LabelKey:
+        return tuple(str(labels.get(n, "")) for n in self.labelnames)
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"] + self._samples()
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Iterable[str] = ()):
+        super().__init__(name, help, labelnames)
+        self._values: Dict[LabelKey, float] = {}
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, k)} {v}" for k, v in items]
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, labelnames: Iterable[str] = (), callback: Optional[Callable[[], float]] = None):
+        super().__init__(name, help, labelnames)
+        self._values: Dict[LabelKey, float] = {}
+        self._callback = callback  # read at scrape time (unlabelled gauges only)
+
+    def set(self, value: float, **labels) -> None:
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels) -> None:
+        self.inc(-amount, **labels)
+
+    def _samples(self) -> List[str]:
+        if self._callback is not None:
+            try:
+                return [f"{self.name} {float(self._callback())}"]
+            except Exception:
+                return []
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, k)} {v}" for k, v in items]
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Iterable[str] = (), buckets: Iterable[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # key -> ([count per bucket..., +Inf], sum)
+        self._values: Dict[LabelKey, Tuple[List[int], float]] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        idx = bisect_left(self.buckets, value)
+        with self._lock:
+            counts, total = self._values.get(key) or ([0] * (len(self.buckets) + 1), 0.0)
+            counts[idx] += 1
+            self._values[key] = (counts, total + value)
+
+    def time(self, **labels) -> "_Timer":
+        return _Timer(self, labels)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = [(k, list(c), s) for k, (c, s) in self._values.items()]
+        lines = []
+        for key, counts, total in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                bucket_labels = _format_labels(self.labelnames, key, 'le="%s"' % le)
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {total}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {cumulative}")
+        return lines
+
+class _Timer:
+    def __init__(self, histogram: Histogram, labels: Dict[str, str]):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start, **self.labels)
+        return False
+
+def render_metrics() -> str:
+    return "\n".join(line for metric in _registry for line in metric.render()) + "\n"
+
+
+# --- HTTP ---
+HTTP_REQUESTS = Counter("http_requests_total", "HTTP requests by route, method and status", ("route", "method", "status"))
+HTTP_LATENCY = Histogram("http_request_duration_seconds", "HTTP request latency by route", ("route", "method"))
+HTTP_BYTES_IN = Counter("http_request_bytes_total", "Request body bytes received by route", ("route",))
+HTTP_BYTES_OUT = Counter("http_response_bytes_total", "Response body bytes sent by route", ("route",))
+HTTP_IN_FLIGHT = Gauge("http_requests_in_flight", "Requests currently being handled")
+
+# --- Storage ---
+STORAGE_OP_SECONDS = Histogram("storage_operation_seconds", "Storage operation duration", ("op",))
+STORAGE_BYTES = Counter("storage_bytes_total", "Bytes moved by storage operations", ("op",))
+UPLOAD_DEDUP = Counter("upload_dedup_total", "Uploads by deduplication result", ("result",))
+SHARE_CACHE = Counter("share_cache_lookups_total", "Public share link resolutions", ("result",))
+BLOB_SCRUB = Counter("blob_scrub_total", "Blobs verified by the integrity scrubber", ("result",))
+BUNDLE_CACHE = Counter("zip_bundle_cache_lookups_total", "download-zip bundle cache lookups", ("result",))
+BUNDLE_CACHE_BYTES = Gauge("zip_bundle_cache_bytes", "Bytes held by the download-zip bundle cache (last sweep)")
+BLOB_TIER_MOVES = Counter("blob_tier_moves_total", "Blobs moved between the hot and cold storage tier", ("direction",))
+
+# --- Database ---
+DB_QUERY_SECONDS = Histogram("db_query_seconds", "SQL statement execution time", ("statement",))
+
+# --- Admission control ---
+ADMISSION = Counter("admission_total", "Admission control decisions", ("scope", "result"))
+ADMISSION_IN_FLIGHT = Gauge("admission_in_flight", "Requests holding an admission slot", ("scope",))
+ADMISSION_WAIT_SECONDS = Histogram("admission_queue_wait_seconds", "Time spent waiting for a fair-queue slot", ("scope",))
+
+# --- Cluster ---
+INVALIDATIONS = Counter("cluster_invalidations_total", "Cache invalidation messages between worker processes", ("result",))
+
+# --- Startup ---
+APP_STARTUP_SECONDS = Gauge("app_startup_seconds", "Time from importing the app to serving, by phase", ("phase",))
+
+# --- Event loop ---
+EVENT_LOOP_LAG = Histogram(
+    "event_loop_lag_seconds", "Delay of a periodic event-loop tick beyond its schedule",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0),
+)
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware: latency, status and body bytes per route template (not per raw path)."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        state = {"status": 500, "bytes_in": 0, "bytes_out": 0}
+
+        async def _receive():
+            message = await receive()
+            if message["type"] == "http.request":
+                state["bytes_in"] += len(message.get("body", b""))
+            return message
+
+        async def _send(message):
+            if message["type"] == "http.response.start":
+                state["status"] = message["status"]
+            elif message["type"] == "http.response.body":
+                state["bytes_out"] += len(message.get("body", b""))
+            await send(message)
+
+        HTTP_IN_FLIGHT.inc()
+        try:
+            await self.app(scope, _receive, _send)
+        finally:
+            HTTP_IN_FLIGHT.dec()
+            route = scope.get("route")
+            route_path = getattr(route, "path", None) or "unmatched"
+            method = scope.get("method", "")
+            HTTP_LATENCY.observe(time.perf_counter() - start, route=route_path, method=method)
+            HTTP_REQUESTS.inc(route=route_path, method=method, status=state["status"])
+            HTTP_BYTES_IN.inc(state["bytes_in"], route=route_path)
+            HTTP_BYTES_OUT.inc(state["bytes_out"], route=route_path)
+
+
+def instrument_engine(engine) -> None:
+    """Registers SQLAlchemy cursor events for query timing and pool gauges for an (async) engine."""
+    from sqlalchemy import event
+
+    sync_engine = getattr(engine, "sync_engine", engine)
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+        if context is not None:
+            context._query_timed = True
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        starts = conn.info.get("query_start")
+        if starts:
+            verb = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else "OTHER"
+            DB_QUERY_SECONDS.observe(time.perf_counter() - starts.pop(), statement=verb)
+
+    @event.listens_for(sync_engine, "handle_error")
+    def _error(context):
+        # A failed statement never reaches after_cursor_execute: drop its start time
+        conn = context.connection
+        starts = conn.info.get("query_start") if conn is not None else None
+        if starts and getattr(context.execution_context, "_query_timed", False):
+            starts.pop()
+
+    pool = sync_engine.pool
+    for attr, help in (
+        ("checkedout", "DB connections currently checked out"),
+        ("size", "Configured DB pool size"),
+        ("overflow", "DB pool overflow connections in use"),
+    ):
+        if hasattr(pool, attr):
+            Gauge(f"db_pool_{attr}", help, callback=getattr(pool, attr))
+
+
+def make_event_loop_lag_probe(interval_seconds: float):
+    """Returns a job for start_periodic() that records how late each tick fires."""
+    last = {"t": None}
+
+    async def _probe():
+        now = time.monotonic()
+        if last["t"] is not None:
+            EVENT_LOOP_LAG.observe(max(now - last["t"] - interval_seconds, 0.0))
+        last["t"] = now
+
+    return _probe
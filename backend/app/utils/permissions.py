@@ -1,7 +1,8 @@
 from fastapi import HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
-from app.models.file import File
+from sqlalchemy import select, or_
+from app.models.file import File, TRASH_PURGE_NOW
+from app.models.grant import FileAccess, LEVEL_READ, LEVEL_WRITE
 from app.models.user import User # New import
 from app.core.permissions_map import PERMISSIONS_MAP # New import (assuming you create this file)
 
@@ -23,13 +24,29 @@ def check_permission(user: User, action: str, resource: str) -> bool:
     allowed_actions = PERMISSIONS_MAP[user_role_str].get(resource, [])
     return action in allowed_actions
 
-async def assert_user_can_download(db: AsyncSession, user: User, file_id: int) -> File:
-    # Checks if the user can download the file based on ownership or admin privileges."""
-    res = await db.execute(select(File).where(File.id == file_id))
-    file = res.scalar_one_or_none()
-    
-    if not file:
+# Grant level needed for an action on a shared file (delete and re-sharing stay with the owner)
+SHARED_ACTION_LEVELS = {"read": LEVEL_READ, "update": LEVEL_WRITE}
+
+async def _file_with_access(db: AsyncSession, user: User, file_id: int):
+    # The file and the user's granted level on it (None if not shared with them): one indexed join
+    res = await db.execute(
+        select(File, FileAccess.level)
+        .outerjoin(FileAccess, (FileAccess.file_id == File.id) & (FileAccess.user_id == user.id))
+        .where(File.id == file_id)
+        .where(File.deleted_at.is_(None))
+    )
+    row = res.first()
+    if row is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="File not found")
+    return row[0], row[1]
+
+def _granted(user: User, action: str, level) -> bool:
+    needed = SHARED_ACTION_LEVELS.get(action)
+    return needed is not None and level is not None and level >= needed and check_permission(user, action, "shared_file")
+
+async def assert_user_can_download(db: AsyncSession, user: User, file_id: int) -> File:
+    # Checks if the user can download the file based on ownership, a grant or admin privileges."""
+    file, level = await _file_with_access(db, user, file_id)
         
     owner_id = file.uploaded_by
     
@@ -41,11 +58,31 @@ async def assert_user_can_download(db: AsyncSession, user: User, file_id: int) -
     if owner_id == user.id and check_permission(user, "read", "own_file"):
         return file
 
+    # 3. Shared with the user (read or write grant)
+    if _granted(user, "read", level):
+        return file
+
     raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="No permission for this file")
 
-async def assert_user_can_delete(db: AsyncSession, user: User, file_id: int) -> File:
+async def assert_user_can_write(db: AsyncSession, user: User, file_id: int) -> File:
+    # Changing the content (e.g. rollback): owner, admin or a write grant
+    file, level = await _file_with_access(db, user, file_id)
+
+    if check_permission(user, "update", "file"):
+        return file
+    if file.uploaded_by == user.id and check_permission(user, "update", "own_file"):
+        return file
+    if _granted(user, "update", level):
+        return file
+
+    raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="No write permission for this file")
+
+async def assert_user_can_delete(db: AsyncSession, user: User, file_id: int, in_trash: bool = False) -> File:
     # Checks if the user can delete the file based on ownership or admin privileges."""
-    res = await db.execute(select(File).where(File.id == file_id))
+    # in_trash: the file must be in the trash instead (restore / delete permanently)
+    q = select(File).where(File.id == file_id)
+    q = q.where(File.deleted_at > TRASH_PURGE_NOW) if in_trash else q.where(File.deleted_at.is_(None))
+    res = await db.execute(q)
     file = res.scalar_one_or_none()
     
     if not file:
@@ -61,4 +98,25 @@ async def assert_user_can_delete(db: AsyncSession, user: User, file_id: int) ->
     if owner_id == user.id and check_permission(user, "delete", "own_file"):
         return file
 
-    raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Only owner or admin can delete this file")
\ No newline at end of file
+    raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Only owner or admin can delete this file")
+
+async def filter_files_user_can(db: AsyncSession, user: User, file_ids, action: str = "read") -> list[File]:
+    # Set-based variant of assert_user_can_download/write/delete for batch jobs: returns only the
+    # existing files the user may act on, in one query (owned or granted) instead of one per id.
+    ids = list(set(file_ids))
+    if not ids:
+        return []
+    q = select(File).where(File.id.in_(ids)).where(File.deleted_at.is_(None))
+    if not check_permission(user, action, "file"):
+        allowed = []
+        if check_permission(user, action, "own_file"):
+            allowed.append(File.uploaded_by == user.id)
+        needed = SHARED_ACTION_LEVELS.get(action)
+        if needed is not None and check_permission(user, action, "shared_file"):
+            q = q.outerjoin(FileAccess, (FileAccess.file_id == File.id) & (FileAccess.user_id == user.id))
+            allowed.append(FileAccess.level >= needed)
+        if not allowed:
+            return []
+        q = q.where(or_(*allowed))
+    res = await db.execute(q)
+    return list(res.scalars().all())
@@ -0,0 +1,145 @@
+import asyncio
+import importlib.util
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, List, Optional, Tuple
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.storage import _abs_under_root
+from app.utils import config
+from app.utils.jobs import enqueue_job
+from app.utils.tiering import ensure_hot
+
+# Preview derivatives (image thumbnails, first page of text/CSV), generated in a process pool
+# and stored by the *source checksum* under STORAGE_ROOT/previews/<aa>/<checksum>/<kind>.<ext>,
+# so every deduplicated copy of the same content shares them.
+
+PREVIEW_DIR = "previews"
+THUMB_SIZES = (256, 1024)
+
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".gif", ".webp", ".bmp", ".tif", ".tiff"}
+TEXT_EXTENSIONS = {".txt", ".csv", ".tsv", ".md", ".log", ".json", ".xml", ".yaml", ".yml", ".ini", ".py", ".js", ".html", ".css"}
+
+# Pillow is optional: without it only text previews are generated
+HAS_PILLOW = importlib.util.find_spec("PIL") is not None
+
+KIND_FILES = {f"thumb_{size}": f"thumb_{size}.jpg" for size in THUMB_SIZES}
+KIND_FILES["text"] = "text.txt"
+KIND_MEDIA_TYPES = {"jpg": "image/jpeg", "txt": "text/plain; charset=utf-8"}
+
+def preview_kinds(filename: str) -> List[str]:
+    ext = os.path.splitext(filename or "")[1].lower()
+    if ext in IMAGE_EXTENSIONS and HAS_PILLOW:
+        return [f"thumb_{size}" for size in THUMB_SIZES]
+    if ext in TEXT_EXTENSIONS:
+        return ["text"]
+    return []
+
+def derivative_rel_path(checksum: str, kind: str) -> str:
+    return f"{PREVIEW_DIR}/{checksum[:2]}/{checksum}/{KIND_FILES[kind]}"
+
+def media_type_for(kind: str) -> str:
+    return KIND_MEDIA_TYPES[KIND_FILES[kind].rsplit(".", 1)[1]]
+
+def missing_kinds(checksum: str, filename: str) -> List[str]:
+    return [k for k in preview_kinds(filename) if not os.path.isfile(_abs_under_root(derivative_rel_path(checksum, k)))]
+
+# --- runs in the worker processes (top-level functions only: they are pickled) ---
+
+def _write_atomic(dest: str, data: bytes) -> None:
+    tmp = f"{dest}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, dest)
+
+def _render_text(src: str, max_bytes: int, max_lines: int) -> bytes:
+    with open(src, "rb") as f:
+        head = f.read(max_bytes)
+    text = head.decode("utf-8", errors="replace")
+    if len(head) == max_bytes and "\n" in text:
+        text = text[:text.rfind("\n") + 1]  # don't cut the last line in half
+    return "".join(text.splitlines(keepends=True)[:max_lines]).encode("utf-8")
+
+def _render_thumbnails(src: str, sizes: List[int]) -> Dict[int, bytes]:
+    import io
+    from PIL import Image, ImageOps
+
+    out = {}
+    with Image.open(src) as im:
+        im.draft("RGB", (max(sizes), max(sizes)))  # JPEG: decode at reduced scale
+        im = ImageOps.exif_transpose(im).convert("RGB")
+        for size in sorted(sizes, reverse=True):
+            im.thumbnail((size, size))
+            buf = io.BytesIO()
+            im.save(buf, "JPEG", quality=85, optimize=True)
+            out[size] = buf.getvalue()
+    return out
+
+def render_derivatives(src: str, dest_paths: Dict[str, str], max_bytes: int, max_lines: int) -> List[str]:
+    """Worker entry point: kind -> absolute destination. Returns the kinds written."""
+    written = []
+    if "text" in dest_paths:
+        _write_atomic(dest_paths["text"], _render_text(src, max_bytes, max_lines))
+        written.append("text")
+    sizes = [int(k.split("_")[1]) for k in dest_paths if k.startswith("thumb_")]
+    if sizes:
+        for size, data in _render_thumbnails(src, sizes).items():
+            _write_atomic(dest_paths[f"thumb_{size}"], data)
+            written.append(f"thumb_{size}")
+    return written
+
+# --- async side ---
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+def _process_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=config.PREVIEW_WORKERS)
+    return _pool
+
+def shutdown_preview_pool() -> None:
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+async def generate_previews(checksum: str, rel_path: str, filename: str) -> List[str]:
+    kinds = missing_kinds(checksum, filename)
+    if not kinds:
+        return []
+    source = await ensure_hot(rel_path)
+    if source is None:
+        return []
+    dest_paths = {k: _abs_under_root(derivative_rel_path(checksum, k)) for k in kinds}
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        _process_pool(), render_derivatives,
+        source, dest_paths, config.PREVIEW_TEXT_BYTES, config.PREVIEW_TEXT_LINES,
+    )
+
+async def enqueue_previews(db: AsyncSession, sources: Iterable[Tuple[str, str, str]]) -> None:
+    """sources: (checksum, blob path, filename). One low-priority job for everything that still lacks previews."""
+    items, seen = [], set()
+    for checksum, rel_path, filename in sources:
+        if not checksum or checksum in seen:
+            continue
+        seen.add(checksum)
+        if missing_kinds(checksum, filename):
+            items.append({"checksum": checksum, "path": rel_path, "filename": filename})
+    if items:
+        await enqueue_job(db, "generate_previews", None, {"items": items})
+
+# checksum -> monotonic time of the last on-demand request (a polling client must not flood the queue)
+_requested: Dict[str, float] = {}
+REQUEST_RETRY_SECONDS = 60
+
+async def request_previews(db: AsyncSession, checksum: str, rel_path: str, filename: str) -> None:
+    now = time.monotonic()
+    if now - _requested.get(checksum, float("-inf")) < REQUEST_RETRY_SECONDS:
+        return
+    for key in [k for k, t in _requested.items() if now - t >= REQUEST_RETRY_SECONDS]:
+        del _requested[key]
+    _requested[checksum] = now
+    await enqueue_previews(db, [(checksum, rel_path, filename)])
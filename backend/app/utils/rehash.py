@@ -0,0 +1,175 @@
+import asyncio
+import os
+import shutil
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
+
+from app.models.blob import Blob
+from app.models.blob_check import BlobCheck
+from app.models.file import File
+from app.models.file_version import FileVersion
+from app.storage import _abs_under_root, locate_blob, open_blob, unlink_rel_paths
+from app.utils import config
+from app.utils.blobs import _adopt_legacy_path, _exists_on_disk, _not_quarantined, _untracked_path, find_live_blob
+from app.utils.hashing import Digest, Hasher, default_algorithm
+from app.utils.previews import PREVIEW_DIR
+from app.utils.share_cache import invalidate_file_shares
+
+# Moves stored content to another checksum algorithm (the "rehash_blobs" job), so that dedup works again after
+# HASH_ALGORITHM changed: new uploads are only compared with blobs hashed the same way.
+# Every blob is read once and hashed with its recorded algorithm (verification: a blob that no longer matches is
+# left for the scrubber) and the target one. A blob whose new checksum equals another blob's is merged into it:
+# versions and files point at the surviving path, references are added up and the duplicate is deleted.
+
+ProgressCallback = Callable[[int, int, str], Awaitable[None]]
+
+def _read_digests(rel_path: str, old_algo: str, new_algo: str) -> Optional[Tuple[Digest, Digest]]:
+    # Blocking. One pass over the hot or cold copy, both hashes fed from the same buffer
+    abs_path = locate_blob(rel_path)
+    if abs_path is None:
+        return None
+    old, new = Hasher(old_algo), Hasher(new_algo)
+    with open_blob(abs_path) as f:
+        for data in iter(lambda: f.read(1024 * 1024), b""):
+            old.update(data)
+            new.update(data)
+    return old.digest(), new.digest()
+
+def _move_previews(old_checksum: str, new_checksum: str) -> None:
+    # Previews are stored by checksum (app/utils/previews.py); missing ones would be regenerated on demand anyway
+    old_dir = _abs_under_root(f"{PREVIEW_DIR}/{old_checksum[:2]}/{old_checksum}")
+    if not os.path.isdir(old_dir):
+        return
+    new_dir = _abs_under_root(f"{PREVIEW_DIR}/{new_checksum[:2]}/{new_checksum}")
+    if os.path.isdir(new_dir):
+        shutil.rmtree(old_dir, ignore_errors=True)
+    else:
+        os.replace(old_dir, new_dir)
+
+async def _adopt_untracked(db: AsyncSession, algo: str) -> int:
+    # Versions from before the blobs table: give them blob rows so they are rehashed (and dedup targets) too
+    res = await db.execute(
+        select(FileVersion.filepath, func.max(FileVersion.checksum), func.max(FileVersion.checksum_algo))
+        .where(_untracked_path).where(FileVersion.checksum.is_not(None)).where(FileVersion.checksum_algo != algo)
+        .group_by(FileVersion.filepath)
+    )
+    adopted = 0
+    for path, checksum, old_algo in res.all():
+        if path and await asyncio.to_thread(_exists_on_disk, path):
+            await _adopt_legacy_path(db, path, checksum, old_algo)
+            adopted += 1
+    await db.commit()
+    return adopted
+
+async def rehash_blobs(
+    db: AsyncSession,
+    algo: Optional[str] = None,
+    batch_size: Optional[int] = None,
+    progress: Optional[ProgressCallback] = None,
+) -> Dict[str, int]:
+    """Rehashes every live blob not hashed with `algo` (default: HASH_ALGORITHM); one transaction per batch."""
+    algo = algo or default_algorithm()
+    batch_size = batch_size or config.HASH_MIGRATION_BATCH
+    stats = {"adopted": await _adopt_untracked(db, algo), "rehashed": 0, "merged": 0, "missing": 0, "mismatch": 0, "bytes": 0}
+
+    pending = (
+        select(Blob.id, Blob.filepath, Blob.checksum, Blob.checksum_algo, Blob.size, Blob.ref_count)
+        .where(Blob.checksum_algo != algo).where(Blob.ref_count > 0).where(_not_quarantined)
+    )
+    total = (await db.execute(select(func.count()).select_from(pending.subquery()))).scalar_one()
+    done = 0
+    last_id = 0
+    while True:
+        rows = (await db.execute(pending.where(Blob.id > last_id).order_by(Blob.id).limit(batch_size))).all()
+        if not rows:
+            break
+        last_id = rows[-1].id
+        unlink: List[str] = []
+        touched_paths: List[str] = []
+        moved_previews: List[Tuple[str, str]] = []
+        for row in rows:
+            digests = await asyncio.to_thread(_read_digests, row.filepath, row.checksum_algo, algo)
+            if digests is None:
+                stats["missing"] += 1
+                continue
+            old, new = digests
+            if old.checksum != row.checksum:
+                stats["mismatch"] += 1  # the scrubber quarantines it
+                continue
+            stats["bytes"] += new.size
+            touched_paths.append(row.filepath)
+
+            target = await find_live_blob(db, new.checksum, algo)
+            if target is not None and target.id != row.id:
+                touched_paths.append(target.filepath)
+                merged = aliased(Blob)
+                await db.execute(
+                    update(FileVersion).where(FileVersion.filepath == row.filepath)
+                    .values(filepath=target.filepath, checksum=new.checksum, checksum_algo=algo)
+                    .execution_options(synchronize_session=False)
+                )
+                await db.execute(
+                    update(File).where(File.filepath == row.filepath).values(filepath=target.filepath)
+                    .execution_options(synchronize_session=False)
+                )
+                await db.execute(
+                    update(Blob).where(Blob.id == target.id)
+                    .values(ref_count=Blob.ref_count + select(merged.ref_count).where(merged.id == row.id).scalar_subquery())
+                    .execution_options(synchronize_session=False)
+                )
+                await db.execute(delete(BlobCheck).where(BlobCheck.blob_id == row.id))
+                await db.execute(delete(Blob).where(Blob.id == row.id))
+                unlink.append(row.filepath)
+                stats["merged"] += 1
+            else:
+                await db.execute(
+                    update(Blob).where(Blob.id == row.id)
+                    .values(checksum=new.checksum, checksum_algo=algo, chunk_digests=new.chunks)
+                    .execution_options(synchronize_session=False)
+                )
+                await db.execute(
+                    update(FileVersion).where(FileVersion.filepath == row.filepath)
+                    .values(checksum=new.checksum, checksum_algo=algo)
+                    .execution_options(synchronize_session=False)
+                )
+                moved_previews.append((row.checksum, new.checksum))
+                stats["rehashed"] += 1
+
+        # Files whose content changed path or checksum (merged ones are found under the surviving path):
+        # their cached share targets are stale
+        affected = set()
+        for start in range(0, len(touched_paths), 500):
+            res = await db.execute(
+                select(FileVersion.file_id).where(FileVersion.filepath.in_(touched_paths[start:start + 500])).distinct()
+            )
+            affected.update(res.scalars().all())
+        await db.commit()
+
+        for file_id in affected:
+            invalidate_file_shares(file_id)
+        errors = await asyncio.to_thread(unlink_rel_paths, unlink)
+        for err in errors:
+            print(f"Rehash cleanup failed: {err}")
+        for old_checksum, new_checksum in moved_previews:
+            try:
+                await asyncio.to_thread(_move_previews, old_checksum, new_checksum)
+            except OSError as e:
+                print(f"Rehash: previews of {old_checksum} not moved: {e}")
+
+        done += len(rows)
+        if progress is not None:
+            await progress(done, total, f"{done}/{total} blobs")
+    return stats
+
+async def hashing_report(db: AsyncSession) -> dict:
+    res = await db.execute(
+        select(Blob.checksum_algo, func.count(), func.coalesce(func.sum(Blob.size), 0))
+        .where(Blob.ref_count > 0).group_by(Blob.checksum_algo)
+    )
+    return {
+        "algorithm": default_algorithm(),
+        "blobs": {algo: {"blobs": count, "bytes": int(size)} for algo, count, size in res.all()},
+    }
@@ -0,0 +1,225 @@
+import asyncio
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Sequence
+from sqlalchemy import select, func, delete
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db import AsyncSessionLocal
+from app.models.file import File
+from app.models.file_version import FileVersion
+from app.models.retention_policy import VersionRetentionPolicy
+from app.models.share_link import ShareLink
+from app.storage import unlink_rel_paths
+from app.utils.blobs import release_blob_paths
+from app.utils import config
+
+@dataclass
+class RetentionRules:
+    keep_last: Optional[int] = None
+    keep_daily_days: Optional[int] = None
+    keep_monthly_months: Optional[int] = None
+    max_history_bytes: Optional[int] = None
+
+    @property
+    def active(self) -> bool:
+        return any(v is not None for v in (
+            self.keep_last, self.keep_daily_days, self.keep_monthly_months, self.max_history_bytes
+        ))
+
+    @classmethod
+    def from_policy(cls, policy: VersionRetentionPolicy) -> "RetentionRules":
+        return cls(
+            keep_last=policy.keep_last,
+            keep_daily_days=policy.keep_daily_days,
+            keep_monthly_months=policy.keep_monthly_months,
+            max_history_bytes=policy.max_history_bytes,
+        )
+
+def global_retention_rules() -> RetentionRules:
+    return RetentionRules(
+        keep_last=config.RETENTION_KEEP_LAST,
+        keep_daily_days=config.RETENTION_KEEP_DAILY_DAYS,
+        keep_monthly_months=config.RETENTION_KEEP_MONTHLY_MONTHS,
+        max_history_bytes=config.RETENTION_MAX_HISTORY_BYTES,
+    )
+
+async def rules_for_user(db: AsyncSession, user_id: int) -> tuple[RetentionRules, str]:
+    res = await db.execute(select(VersionRetentionPolicy).where(VersionRetentionPolicy.user_id == user_id))
+    policy = res.scalar_one_or_none()
+    if policy is not None:
+        return RetentionRules.from_policy(policy), "user"
+    return global_retention_rules(), "global"
+
+def _naive_utc(ts: datetime) -> datetime:
+    if ts.tzinfo is not None:
+        ts = ts.astimezone(timezone.utc).replace(tzinfo=None)
+    return ts
+
+def select_prunable_versions(
+    versions: Sequence,
+    current_version: Optional[int],
+    rules: RetentionRules,
+    now: datetime,
+    pinned: Iterable[int] = (),
+) -> List:
+    """
+    Returns the versions of one file that the rules no longer keep.
+    `versions` are rows with version_number, uploaded_at and size.
+
+    Safety rules: the version referenced by File.current_version and the newest version are
+    never pruned, so File.filepath stays valid and the next upload still gets max + 1.
+    Versions in `pinned` (e.g. targeted by an active share link) are never pruned either.
+    """
+    if not rules.active or len(versions) < 2:
+        return []
+
+    ordered = sorted(versions, key=lambda v: v.version_number, reverse=True)
+    protected = {ordered[0].version_number, *pinned}
+    if current_version is not None:
+        protected.add(current_version)
+
+    has_keep_rules = any(v is not None for v in (rules.keep_last, rules.keep_daily_days, rules.keep_monthly_months))
+    if not has_keep_rules:
+        keep = {v.version_number for v in ordered}
+    else:
+        keep = set(protected)
+        if rules.keep_last is not None:
+            keep.update(v.version_number for v in ordered[:rules.keep_last])
+
+        now = _naive_utc(now)
+        daily_cutoff = now - timedelta(days=rules.keep_daily_days or 0)
+        seen_days, seen_months = set(), set()
+        for v in ordered:
+            ts = _naive_utc(v.uploaded_at)
+            if rules.keep_daily_days and ts >= daily_cutoff:
+                # Newest version of each day inside the daily window
+                if ts.date() not in seen_days:
+                    seen_days.add(ts.date())
+                    keep.add(v.version_number)
+            elif rules.keep_monthly_months:
+                # Then newest version of each month, for the given number of months
+                month = (ts.year, ts.month)
+                if month not in seen_months and len(seen_months) < rules.keep_monthly_months:
+                    seen_months.add(month)
+                    keep.add(v.version_number)
+
+    if rules.max_history_bytes is not None:
+        # Newest history first: versions that no longer fit in the byte budget are trimmed, and only
+        # the kept ones count toward it
+        used = 0
+        for v in ordered:
+            if v.version_number in protected or v.version_number not in keep:
+                continue
+            if used + (v.size or 0) > rules.max_history_bytes:
+                keep.discard(v.version_number)
+            else:
+                used += v.size or 0
+
+    return [v for v in ordered if v.version_number not in keep]
+
+async def prune_versions(
+    db: AsyncSession,
+    batch_size: int = config.RETENTION_PRUNE_BATCH_SIZE,
+    user_id: Optional[int] = None,
+    progress: Optional[Callable[[int, int, str], Awaitable[None]]] = None,
+) -> Dict[str, int]:
+    """
+    Applies retention to all files (or one user's files) in keyset-paginated batches of file ids.
+    Each batch is deleted with one statement, blob references are released in bulk and the
+    batch is committed before unreferenced blobs are removed from disk.
+    `progress` gets the position of the scan in the file id range.
+    """
+    global_rules = global_retention_rules()
+    stats = {"files_scanned": 0, "versions_pruned": 0, "bytes_pruned": 0, "blobs_removed": 0}
+    now = datetime.now(timezone.utc)
+    last_file_id = 0
+    max_file_id = 0
+    if progress is not None:
+        max_file_id = (await db.execute(select(func.max(FileVersion.file_id)))).scalar_one_or_none() or 0
+
+    while True:
+        q = (
+            select(FileVersion.file_id)
+            .where(FileVersion.file_id > last_file_id)
+            .group_by(FileVersion.file_id)
+            .having(func.count(FileVersion.id) > 1)
+            .order_by(FileVersion.file_id)
+            .limit(batch_size)
+        )
+        if user_id is not None or not global_rules.active:
+            q = q.join(File, File.id == FileVersion.file_id)
+            if user_id is not None:
+                q = q.where(File.uploaded_by == user_id)
+            if not global_rules.active:
+                # Only users with their own policy have anything to prune
+                q = q.where(File.uploaded_by.in_(select(VersionRetentionPolicy.user_id)))
+
+        file_ids = (await db.execute(q)).scalars().all()
+        if not file_ids:
+            break
+        last_file_id = file_ids[-1]
+        stats["files_scanned"] += len(file_ids)
+        if progress is not None:
+            await progress(min(last_file_id, max_file_id), max_file_id, f"{stats['files_scanned']} files scanned")
+
+        files = (await db.execute(
+            select(File.id, File.uploaded_by, File.current_version).where(File.id.in_(file_ids))
+        )).all()
+        owners = {f.uploaded_by for f in files if f.uploaded_by is not None}
+        policies_res = await db.execute(
+            select(VersionRetentionPolicy).where(VersionRetentionPolicy.user_id.in_(owners))
+        )
+        user_rules = {p.user_id: RetentionRules.from_policy(p) for p in policies_res.scalars().all()}
+
+        versions_res = await db.execute(
+            select(
+                FileVersion.id, FileVersion.file_id, FileVersion.version_number,
+                FileVersion.uploaded_at, FileVersion.size, FileVersion.filepath,
+            ).where(FileVersion.file_id.in_(file_ids))
+        )
+        by_file = defaultdict(list)
+        for v in versions_res.all():
+            by_file[v.file_id].append(v)
+
+        # Versions pinned by share links that haven't expired
+        pinned_res = await db.execute(
+            select(ShareLink.file_id, ShareLink.version_number)
+            .where(ShareLink.file_id.in_(file_ids))
+            .where(ShareLink.version_number.is_not(None))
+            .where((ShareLink.expires_at.is_(None)) | (ShareLink.expires_at > now.replace(tzinfo=None)))
+        )
+        pinned = defaultdict(set)
+        for file_id, version_number in pinned_res.all():
+            pinned[file_id].add(version_number)
+
+        victims = []
+        for f in files:
+            rules = user_rules.get(f.uploaded_by, global_rules)
+            victims.extend(select_prunable_versions(by_file[f.id], f.current_version, rules, now, pinned[f.id]))
+
+        if not victims:
+            continue
+
+        await db.execute(
+            delete(FileVersion).where(FileVersion.id.in_([v.id for v in victims]))
+            .execution_options(synchronize_session=False)
+        )
+        orphaned = await release_blob_paths(db, [v.filepath for v in victims])
+        await db.commit()
+
+        if orphaned:
+            await asyncio.to_thread(unlink_rel_paths, orphaned)
+        stats["versions_pruned"] += len(victims)
+        stats["bytes_pruned"] += sum(v.size or 0 for v in victims)
+        stats["blobs_removed"] += len(orphaned)
+
+    return stats
+
+async def run_scheduled_prune() -> None:
+    # Entry point for the periodic loop registered in app/main.py
+    async with AsyncSessionLocal() as db:
+        stats = await prune_versions(db)
+    if stats["versions_pruned"]:
+        print(f"Version retention: {stats}")
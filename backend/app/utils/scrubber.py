@@ -0,0 +1,166 @@
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+from sqlalchemy import select, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db import AsyncSessionLocal
+from app.models.blob import Blob
+from app.models.blob_check import BlobCheck
+from app.storage import _abs_under_root, locate_blob, open_blob
+from app.utils import config
+from app.utils.hashing import Digest, Hasher, damaged_ranges
+from app.utils.metrics import BLOB_SCRUB, STORAGE_BYTES
+
+# Background integrity scrubber: re-hashes stored blobs, least recently verified first, and
+# records the result in blob_checks. Corrupt blobs are moved to STORAGE_ROOT/quarantine and
+# excluded from deduplication (see find_live_blob); missing ones are only flagged.
+
+QUARANTINE_DIR = "quarantine"
+
+class _ByteRateLimiter:
+    """Token bucket shared by the hashing threads (bytes per second)."""
+
+    def __init__(self, rate: int):
+        self.rate = rate
+        self._allowance = float(rate)
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, n: int) -> None:
+        if self.rate <= 0:
+            return
+        with self._lock:
+            now = time.monotonic()
+            self._allowance = min(self.rate, self._allowance + (now - self._last) * self.rate) - n
+            self._last = now
+            wait = -self._allowance / self.rate if self._allowance < 0 else 0.0
+        if wait:
+            time.sleep(wait)
+
+_executor: Optional[ThreadPoolExecutor] = None
+_limiter: Optional[_ByteRateLimiter] = None
+_scrub_lock = asyncio.Lock()
+
+def _pool() -> Tuple[ThreadPoolExecutor, _ByteRateLimiter]:
+    global _executor, _limiter
+    if _executor is None:
+        # Own pool: a long scrub must not starve the default executor used by request handlers
+        _executor = ThreadPoolExecutor(max_workers=config.SCRUB_WORKERS, thread_name_prefix="scrub")
+        _limiter = _ByteRateLimiter(config.SCRUB_MAX_BYTES_PER_SECOND)
+    return _executor, _limiter
+
+def _hash_file(abs_path: str, algo: str, limiter: _ByteRateLimiter) -> Digest:
+    # Large sequential reads into one reusable buffer; hashlib releases the GIL on big updates
+    hasher = Hasher(algo)
+    buf = bytearray(config.SCRUB_READ_CHUNK_BYTES)
+    view = memoryview(buf)
+    with open_blob(abs_path) as f:
+        while True:
+            n = f.readinto(buf)
+            if not n:
+                break
+            limiter.acquire(n)
+            hasher.update(view[:n])
+    return hasher.digest()
+
+def _verify(blob_id: int, rel_path: str, checksum: str, algo: str, expected_size: Optional[int], limiter: _ByteRateLimiter) -> Dict:
+    # Hot copy, or the cold-tier one (compressed copies are hashed decompressed)
+    abs_path = locate_blob(rel_path)
+    if abs_path is None:
+        return {"status": "missing", "detail": "stored file not found"}
+    try:
+        digest = _hash_file(abs_path, algo, limiter)
+        actual, size = digest.checksum, digest.size
+    except FileNotFoundError:
+        return {"status": "missing", "detail": "stored file not found"}
+    except OSError as e:
+        return {"status": "corrupt", "detail": f"read error: {e}", "size": 0}
+
+    if actual == checksum and (expected_size is None or size == expected_size):
+        return {"status": "ok", "size": size}
+
+    detail = f"checksum {actual} != {checksum}" if actual != checksum else f"size {size} != {expected_size}"
+    # Move aside: nothing serves or links to it any more, but the bytes are kept for inspection
+    quarantine_rel = f"{QUARANTINE_DIR}/{blob_id}-{os.path.basename(abs_path)}"
+    try:
+        os.replace(abs_path, _abs_under_root(quarantine_rel))
+    except OSError as e:
+        detail += f"; quarantine failed: {e}"
+        quarantine_rel = None
+    # Tree hashes: the leaves let _scrub_batch name the damaged parts
+    return {"status": "corrupt", "detail": detail, "size": size, "quarantine_path": quarantine_rel, "chunks": digest.chunks}
+
+async def _describe_damage(db: AsyncSession, rows, results) -> None:
+    # Compares the leaves of corrupt tree-hashed blobs with the ones recorded at upload (loaded only for these)
+    damaged = {row.id: (row, result) for row, result in zip(rows, results) if result.get("chunks")}
+    if not damaged:
+        return
+    res = await db.execute(select(Blob.id, Blob.chunk_digests).where(Blob.id.in_(list(damaged))))
+    for blob_id, recorded in res.all():
+        row, result = damaged[blob_id]
+        ranges = damaged_ranges(recorded, result["chunks"], max(result.get("size", 0), row.size or 0))
+        if ranges:
+            result["detail"] += "; damaged byte ranges " + ", ".join(f"{start}-{end - 1}" for start, end in ranges[:20])
+
+async def scrub_blobs(db: AsyncSession, batch_size: Optional[int] = None) -> Dict[str, int]:
+    """Verifies one batch of blobs (never-verified first, then the oldest verification)."""
+    # One pass at a time (periodic loop vs. the admin endpoint) so batches don't overlap
+    async with _scrub_lock:
+        return await _scrub_batch(db, batch_size or config.SCRUB_BATCH_SIZE)
+
+async def _scrub_batch(db: AsyncSession, batch_size: int) -> Dict[str, int]:
+    res = await db.execute(
+        select(Blob.id, Blob.filepath, Blob.checksum, Blob.checksum_algo, Blob.size)
+        .outerjoin(BlobCheck, BlobCheck.blob_id == Blob.id)
+        .where(or_(BlobCheck.status.is_(None), BlobCheck.status != "corrupt"))
+        .order_by(BlobCheck.verified_at.asc().nulls_first(), Blob.id)
+        .limit(batch_size)
+    )
+    rows = res.all()
+    stats = {"checked": 0, "ok": 0, "missing": 0, "corrupt": 0, "bytes": 0}
+    if not rows:
+        return stats
+
+    executor, limiter = _pool()
+    loop = asyncio.get_running_loop()
+    results = await asyncio.gather(*(
+        loop.run_in_executor(executor, _verify, row.id, row.filepath, row.checksum, row.checksum_algo, row.size, limiter)
+        for row in rows
+    ))
+
+    # Blobs released while we were hashing: nothing to record
+    still_there = await db.execute(select(Blob.id).where(Blob.id.in_([row.id for row in rows])))
+    live_ids = set(still_there.scalars().all())
+    await _describe_damage(db, rows, results)
+    now = datetime.utcnow()
+    for row, result in zip(rows, results):
+        if row.id not in live_ids:
+            continue
+        await db.merge(BlobCheck(
+            blob_id=row.id,
+            status=result["status"],
+            verified_at=now,
+            detail=result.get("detail"),
+            quarantine_path=result.get("quarantine_path"),
+        ))
+        stats["checked"] += 1
+        stats[result["status"]] += 1
+        stats["bytes"] += result.get("size", 0)
+        BLOB_SCRUB.inc(result=result["status"])
+        if result["status"] != "ok":
+            print(f"Integrity scrub: blob {row.id} ({row.filepath}) {result['status']}: {result.get('detail')}")
+    await db.commit()
+    STORAGE_BYTES.inc(stats["bytes"], op="scrub")
+    return stats
+
+async def run_scheduled_scrub() -> None:
+    # Entry point for the periodic loop registered in app/main.py
+    async with AsyncSessionLocal() as db:
+        stats = await scrub_blobs(db)
+    if stats["missing"] or stats["corrupt"]:
+        print(f"Integrity scrub: {stats}")
@@ -1,15 +1,19 @@
-from passlib.context import CryptContext
 from datetime import datetime, timedelta, timezone
+from functools import lru_cache
 import jwt
 from app.utils.config import SECRET_KEY, ALGORITHM
 
-pwd_context = CryptContext(schemes=["bcrypt_sha256", "bcrypt"], deprecated="auto")
+@lru_cache(maxsize=None)
+def pwd_context():
+    # passlib + bcrypt backend are only needed for register/login, so they load on the first use
+    from passlib.context import CryptContext
+    return CryptContext(schemes=["bcrypt_sha256", "bcrypt"], deprecated="auto")
 
 def hash_password(password: str) -> str:
-    return pwd_context.hash(password)
+    return pwd_context().hash(password)
 
 def verify_password(plain: str, hashed: str) -> bool:
-    return pwd_context.verify(plain, hashed)
+    return pwd_context().verify(plain, hashed)
 
 def create_access_token(subject: dict, expires_delta: timedelta) -> str:
     now = datetime.now(timezone.utc)
@@ -22,3 +26,24 @@ def create_access_token(subject: dict, expires_delta: timedelta) -> str:
         "exp": int((now + expires_delta).timestamp()),
     }
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+
+# Signed share URLs: a JWT with its own audience, so it can't be used as a login token (and vice versa).
+# Everything needed to serve the download is inside the token, so validating it needs no DB lookup.
+SHARE_TOKEN_AUDIENCE = "share"
+
+def create_share_token(file_id: int, rel_path: str, filename: str, checksum: str | None, expires_delta: timedelta) -> str:
+    now = datetime.now(timezone.utc)
+    to_encode = {
+        "aud": SHARE_TOKEN_AUDIENCE,
+        "fid": file_id,
+        "p": rel_path,
+        "n": filename,
+        "c": checksum,
+        "iat": int(now.timestamp()),
+        "exp": int((now + expires_delta).timestamp()),
+    }
+    return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+
+def decode_share_token(token: str) -> dict:
+    # Raises jwt.InvalidTokenError (incl. ExpiredSignatureError) on a bad or expired token
+    return jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM], audience=SHARE_TOKEN_AUDIENCE)
@@ -0,0 +1,210 @@
+import time
+from collections import OrderedDict, defaultdict
+from datetime import datetime
+from typing import Dict, NamedTuple, Optional, Set, Tuple
+from sqlalchemy import insert, select, update, and_, func
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db import AsyncSessionLocal
+from app.models.file import File
+from app.models.file_version import FileVersion
+from app.models.log_book import LogBook
+from app.models.share_link import ShareLink
+from app.utils import config
+from app.utils.cluster import on_invalidate, publish
+
+class ShareTarget(NamedTuple):
+    file_id: int
+    rel_path: str                           # blob path; the route resolves its tier (tiering.ensure_hot)
+    filename: str
+    checksum: Optional[str]
+    size: Optional[int]
+    expires_at: Optional[datetime] = None   # naive UTC, from share_links
+    max_downloads: Optional[int] = None
+    tracked: bool = False                   # True for share_links rows (download_count is kept)
+
+# share_id -> (target, expires_at); OrderedDict doubles as the LRU order
+_cache: "OrderedDict[str, Tuple[ShareTarget, float]]" = OrderedDict()
+_share_ids_by_file: Dict[int, Set[str]] = defaultdict(set)
+
+# (share_id, file_id) -> downloads not yet written to log_book
+_pending_downloads: Dict[Tuple[str, int], int] = defaultdict(int)
+# share_links.id -> downloads not yet added to download_count (unlimited links only)
+_pending_link_counts: Dict[str, int] = defaultdict(int)
+
+def get_cached_share(share_id: str) -> Optional[ShareTarget]:
+    hit = _cache.get(share_id)
+    if hit is None:
+        return None
+    target, expires_at = hit
+    if expires_at < time.monotonic():
+        _drop(share_id)
+        return None
+    _cache.move_to_end(share_id)
+    return target
+
+def _remember(share_id: str, target: ShareTarget) -> None:
+    _cache[share_id] = (target, time.monotonic() + config.SHARE_CACHE_TTL_SECONDS)
+    _cache.move_to_end(share_id)
+    _share_ids_by_file[target.file_id].add(share_id)
+    while len(_cache) > config.SHARE_CACHE_MAX_ENTRIES:
+        oldest, _ = next(iter(_cache.items()))
+        _drop(oldest)
+
+def _drop(share_id: str) -> None:
+    hit = _cache.pop(share_id, None)
+    if hit is not None:
+        ids = _share_ids_by_file.get(hit[0].file_id)
+        if ids is not None:
+            ids.discard(share_id)
+            if not ids:
+                _share_ids_by_file.pop(hit[0].file_id, None)
+
+# Invalidations go to every worker process (app/utils/cluster.py); entries a worker misses expire by TTL
+def invalidate_share(share_id: str) -> None:
+    publish("share", share_id)
+
+def invalidate_file_shares(file_id: int) -> None:
+    # Call whenever the file's current blob changes or the file/link goes away
+    publish("share_file", file_id)
+
+@on_invalidate("share")
+def _drop_share(share_id: str) -> None:
+    _drop(share_id)
+
+@on_invalidate("share_file")
+def _drop_file_shares(file_id: str) -> None:
+    for share_id in list(_share_ids_by_file.get(int(file_id), ())):
+        _drop(share_id)
+
+async def resolve_share(db: AsyncSession, share_id: str) -> Optional[ShareTarget]:
+    target = get_cached_share(share_id)
+    if target is not None:
+        return target
+
+    target = await _load_share_link(db, share_id) or await _load_legacy_share(db, share_id)
+    if target is not None:
+        _remember(share_id, target)
+    return target
+
+async def _load_share_link(db: AsyncSession, share_id: str) -> Optional[ShareTarget]:
+    # One query: the link, its file and the pinned (or current) version
+    res = await db.execute(
+        select(
+            ShareLink.file_id, ShareLink.expires_at, ShareLink.max_downloads,
+            File.filename, File.filepath, File.size,
+            FileVersion.filepath.label("version_path"), FileVersion.size.label("version_size"), FileVersion.checksum,
+        )
+        .join(File, File.id == ShareLink.file_id)
+        .outerjoin(FileVersion, and_(
+            FileVersion.file_id == File.id,
+            FileVersion.version_number == func.coalesce(ShareLink.version_number, File.current_version),
+        ))
+        .where(ShareLink.id == share_id)
+        .where(File.deleted_at.is_(None))
+    )
+    row = res.first()
+    if row is None:
+        return None
+    rel_path = row.version_path or row.filepath
+    if not rel_path:
+        return None
+    return ShareTarget(
+        file_id=row.file_id,
+        rel_path=rel_path,
+        filename=row.filename,
+        checksum=row.checksum,
+        size=row.version_size if row.version_path else row.size,
+        expires_at=row.expires_at,
+        max_downloads=row.max_downloads,
+        tracked=True,
+    )
+
+async def _load_legacy_share(db: AsyncSession, share_id: str) -> Optional[ShareTarget]:
+    # Single never-expiring link stored in File.share_link_id
+    res = await db.execute(
+        select(File.id, File.filepath, File.filename, File.size, FileVersion.checksum)
+        .outerjoin(FileVersion, and_(
+            FileVersion.file_id == File.id,
+            FileVersion.version_number == File.current_version,
+        ))
+        .where(File.share_link_id == share_id)
+        .where(File.deleted_at.is_(None))
+    )
+    row = res.first()
+    if row is None or not row.filepath:
+        return None
+    return ShareTarget(
+        file_id=row.id,
+        rel_path=row.filepath,
+        filename=row.filename,
+        checksum=row.checksum,
+        size=row.size,
+    )
+
+async def claim_limited_download(db: AsyncSession, share_id: str) -> bool:
+    # Atomic check-and-increment for links with max_downloads; False once the limit is reached
+    res = await db.execute(
+        update(ShareLink)
+        .where(ShareLink.id == share_id)
+        .where(ShareLink.download_count < ShareLink.max_downloads)
+        .values(download_count=ShareLink.download_count + 1)
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+    return res.rowcount == 1
+
+def record_share_download(share_id: str, file_id: int, count_on_link: bool = False) -> None:
+    _pending_downloads[(share_id, file_id)] += 1
+    if count_on_link:
+        _pending_link_counts[share_id] += 1
+
+def pending_link_downloads(share_id: str) -> int:
+    return _pending_link_counts.get(share_id, 0)
+
+async def flush_share_downloads(db: AsyncSession) -> int:
+    """Writes one aggregated download_share row per link and returns the number of downloads flushed."""
+    if not _pending_downloads:
+        return 0
+    pending = dict(_pending_downloads)
+    link_counts = dict(_pending_link_counts)
+    _pending_downloads.clear()
+    _pending_link_counts.clear()
+
+    try:
+        # Files deleted since the download keep the audit row, just without the FK
+        file_ids = {file_id for _, file_id in pending}
+        existing_res = await db.execute(select(File.id).where(File.id.in_(file_ids)))
+        existing = set(existing_res.scalars().all())
+
+        now = datetime.utcnow()
+        rows = [
+            {
+                "user_id": None,
+                "action": "download_share",
+                "file_id": file_id if file_id in existing else None,
+                "timestamp": now,
+                "details": {"share_id": share_id, "count": count},
+            }
+            for (share_id, file_id), count in pending.items()
+        ]
+        await db.execute(insert(LogBook), rows)
+        for share_id, count in link_counts.items():
+            await db.execute(
+                update(ShareLink).where(ShareLink.id == share_id)
+                .values(download_count=ShareLink.download_count + count)
+                .execution_options(synchronize_session=False)
+            )
+        await db.commit()
+    except Exception:
+        # Put the counts back so the next flush retries them
+        for key, count in pending.items():
+            _pending_downloads[key] += count
+        for key, count in link_counts.items():
+            _pending_link_counts[key] += count
+        raise
+    return sum(pending.values())
+
+async def run_scheduled_flush() -> None:
+    async with AsyncSessionLocal() as db:
+        await flush_share_downloads(db)
@@ -0,0 +1,232 @@
+import asyncio
+import gzip
+import os
+import shutil
+import uuid
+from collections import defaultdict
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+from sqlalchemy import bindparam, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db import AsyncSessionLocal
+from app.models.blob import Blob
+from app.storage import _abs_under_root, cold_abs_path, locate_blob, open_blob
+from app.utils import config
+from app.utils.blobs import _not_quarantined
+from app.utils.metrics import BLOB_TIER_MOVES, STORAGE_BYTES
+
+# Hot/cold tiering of blobs:
+#   - reads are counted in memory per blob path (record_blob_access) and flushed to blobs.access_count /
+#     last_accessed_at every BLOB_ACCESS_FLUSH_SECONDS, so a download costs no extra write,
+#   - the leader's sweep moves blobs not read for TIER_COLD_AFTER_DAYS to COLD_ROOT (gzip when it pays off),
+#   - a download of a cold blob copies it back first (ensure_hot); zip builds and the scrubber read the cold
+#     copy in place (storage.locate_blob / open_blob).
+# blobs.tier / compressed are the placement record; readers only need the path (hot first, then cold).
+
+_COPY_CHUNK = 1024 * 1024
+
+# blob path -> reads not yet written to blobs, and the time of the last one
+_pending_access: Dict[str, int] = defaultdict(int)
+_last_access: Dict[str, datetime] = {}
+# One promotion per path at a time in this worker
+_promotions: Dict[str, asyncio.Lock] = {}
+
+def record_blob_access(rel_path: Optional[str]) -> None:
+    if rel_path:
+        _pending_access[rel_path] += 1
+        _last_access[rel_path] = datetime.utcnow()
+
+async def flush_blob_access(db: AsyncSession) -> int:
+    """Adds the counted reads to blobs (one executemany) and returns how many were flushed."""
+    if not _pending_access:
+        return 0
+    pending = dict(_pending_access)
+    last = dict(_last_access)
+    _pending_access.clear()
+    _last_access.clear()
+
+    blobs = Blob.__table__
+    try:
+        await db.execute(
+            update(blobs).where(blobs.c.filepath == bindparam("p"))
+            .values(access_count=blobs.c.access_count + bindparam("n"), last_accessed_at=bindparam("t")),
+            [{"p": path, "n": n, "t": last[path]} for path, n in pending.items()],
+        )
+        await db.commit()
+    except Exception:
+        # Put the counts back so the next flush retries them
+        for path, n in pending.items():
+            _pending_access[path] += n
+            _last_access.setdefault(path, last[path])
+        raise
+    return sum(pending.values())
+
+async def run_scheduled_access_flush() -> None:
+    async with AsyncSessionLocal() as db:
+        await flush_blob_access(db)
+
+# --- moving bytes (blocking: run via asyncio.to_thread) ---
+
+def _write_atomically(dest: str, fill) -> int:
+    # Into a temp file next to dest, fsync'ed before the rename: the source copy is deleted afterwards
+    os.makedirs(os.path.dirname(dest), exist_ok=True)
+    tmp = dest + f".{uuid.uuid4().hex}.part"
+    try:
+        with open(tmp, "wb") as raw:
+            fill(raw)
+            raw.flush()
+            os.fsync(raw.fileno())
+        size = os.path.getsize(tmp)
+        os.replace(tmp, dest)
+        return size
+    except BaseException:
+        Path(tmp).unlink(missing_ok=True)
+        raise
+
+def _copy_to_cold(rel_path: str, compress: bool) -> Tuple[bool, int]:
+    """Copies the hot blob to the cold tier; returns (compressed, bytes stored)."""
+    src = _abs_under_root(rel_path)
+    size = os.path.getsize(src)
+    if compress:
+        def _gzip(raw):
+            with open(src, "rb") as fin, gzip.GzipFile(fileobj=raw, mode="wb", compresslevel=6, mtime=0) as fout:
+                shutil.copyfileobj(fin, fout, _COPY_CHUNK)
+        dest = cold_abs_path(rel_path, True)
+        stored = _write_atomically(dest, _gzip)
+        if stored < size * 0.9:
+            return True, stored
+        # Already compressed content (media, archives): keep it as is
+        os.unlink(dest)
+
+    def _raw(raw):
+        with open(src, "rb") as fin:
+            shutil.copyfileobj(fin, raw, _COPY_CHUNK)
+    return False, _write_atomically(cold_abs_path(rel_path, False), _raw)
+
+def _copy_to_hot(cold_path: str, rel_path: str) -> int:
+    def _fill(raw):
+        with open_blob(cold_path) as fin:
+            shutil.copyfileobj(fin, raw, _COPY_CHUNK)
+    return _write_atomically(_abs_under_root(rel_path), _fill)
+
+# --- promotion (on download) ---
+
+async def ensure_hot(rel_path: str) -> Optional[str]:
+    """
+    Absolute hot path of the blob, copying it back from the cold tier first if needed.
+    None if it is in neither tier. Uses its own session: the caller's transaction is not touched.
+    """
+    hot = _abs_under_root(rel_path)
+    if os.path.isfile(hot):
+        return hot
+    if not config.COLD_STORAGE_ROOT:
+        return None
+
+    lock = _promotions.setdefault(rel_path, asyncio.Lock())
+    try:
+        async with lock:
+            if os.path.isfile(hot):
+                return hot  # promoted while we waited
+            cold = await asyncio.to_thread(locate_blob, rel_path)
+            if cold is None:
+                return None
+            try:
+                size = await asyncio.to_thread(_copy_to_hot, cold, rel_path)
+            except FileNotFoundError:
+                # Another worker promoted it and removed the cold copy mid-read
+                return hot if os.path.isfile(hot) else None
+
+            async with AsyncSessionLocal() as db:
+                await db.execute(
+                    update(Blob).where(Blob.filepath == rel_path).values(tier="hot", compressed=False)
+                    .execution_options(synchronize_session=False)
+                )
+                await db.commit()
+            await asyncio.to_thread(Path(cold).unlink, missing_ok=True)
+            BLOB_TIER_MOVES.inc(direction="promote")
+            STORAGE_BYTES.inc(size, op="tier_promote")
+            return hot
+    finally:
+        if not lock.locked():
+            _promotions.pop(rel_path, None)
+
+# --- demotion (leader's periodic sweep) ---
+
+async def demote_cold_blobs(
+    db: AsyncSession,
+    limit: Optional[int] = None,
+    progress: Optional[Callable[[int, int, str], Awaitable[None]]] = None,
+) -> Dict[str, int]:
+    """Moves up to `limit` blobs not read for TIER_COLD_AFTER_DAYS (least recently read first) to the cold tier."""
+    stats = {"demoted": 0, "skipped": 0, "bytes": 0, "stored_bytes": 0}
+    if not config.COLD_STORAGE_ROOT:
+        return stats
+    cutoff = datetime.utcnow() - timedelta(days=config.TIER_COLD_AFTER_DAYS)
+    res = await db.execute(
+        select(Blob.id, Blob.filepath, Blob.size)
+        .where(Blob.tier == "hot").where(Blob.ref_count > 0)
+        .where(Blob.last_accessed_at < cutoff)
+        .where(func.coalesce(Blob.size, 0) >= config.TIER_MIN_SIZE_BYTES)
+        .where(_not_quarantined)
+        .order_by(Blob.last_accessed_at)
+        .limit(limit or config.TIER_SWEEP_BATCH)
+    )
+    rows = res.all()
+    for done, row in enumerate(rows):
+        if progress is not None:
+            await progress(done, len(rows), f"{stats['demoted']} blobs demoted")
+        if row.filepath in _pending_access:
+            stats["skipped"] += 1  # read since the last flush
+            continue
+        try:
+            compressed, stored = await asyncio.to_thread(_copy_to_cold, row.filepath, config.TIER_COMPRESS)
+        except OSError as e:
+            # Missing hot file included: that is the scrubber's report, not ours
+            print(f"Tiering: blob {row.id} ({row.filepath}) not demoted: {e}")
+            stats["skipped"] += 1
+            continue
+
+        moved = await db.execute(
+            update(Blob).where(Blob.id == row.id).where(Blob.tier == "hot")
+            .values(tier="cold", compressed=compressed)
+            .execution_options(synchronize_session=False)
+        )
+        await db.commit()
+        if moved.rowcount != 1:
+            # Released while we were copying
+            await asyncio.to_thread(Path(cold_abs_path(row.filepath, compressed)).unlink, missing_ok=True)
+            stats["skipped"] += 1
+            continue
+        await asyncio.to_thread(Path(_abs_under_root(row.filepath)).unlink, missing_ok=True)
+        stats["demoted"] += 1
+        stats["bytes"] += row.size or 0
+        stats["stored_bytes"] += stored
+        BLOB_TIER_MOVES.inc(direction="demote")
+        STORAGE_BYTES.inc(row.size or 0, op="tier_demote")
+    return stats
+
+async def tier_report(db: AsyncSession) -> dict:
+    res = await db.execute(
+        select(Blob.tier, Blob.compressed, func.count(), func.coalesce(func.sum(Blob.size), 0))
+        .group_by(Blob.tier, Blob.compressed)
+    )
+    report = {"hot": {"blobs": 0, "bytes": 0}, "cold": {"blobs": 0, "bytes": 0, "compressed_blobs": 0}}
+    for tier, compressed, count, size in res.all():
+        entry = report.setdefault(tier, {"blobs": 0, "bytes": 0})
+        entry["blobs"] += count
+        entry["bytes"] += int(size)
+        if tier == "cold" and compressed:
+            entry["compressed_blobs"] += count
+    report["enabled"] = bool(config.COLD_STORAGE_ROOT)
+    report["cold_after_days"] = config.TIER_COLD_AFTER_DAYS
+    return report
+
+async def run_scheduled_tiering() -> None:
+    # Entry point for the periodic loop registered in app/main.py
+    async with AsyncSessionLocal() as db:
+        stats = await demote_cold_blobs(db)
+    if stats["demoted"] or stats["skipped"]:
+        print(f"Tiering sweep: {stats}")
@@ -0,0 +1,379 @@
+"""
+Benchmark harness for the file API.
+
+Boots the FastAPI app in-process (httpx ASGI transport, no sockets) against a temporary storage
+root and a temporary SQLite database (or --database-url for Postgres) and drives the hot paths.
+
+    cd backend
+    python -m benchmarks.run                       # all scenarios, JSON report on stdout
+    python -m benchmarks.run -s upload,list_files --list-sizes 1000,100000 -o bench.json
+    python -m benchmarks.run --baseline bench.json --max-regression 0.25   # exit 1 on regression
+
+Failed requests are left out of the timings; any failure marks its data point invalid and the run exits 1.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import resource
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+SCENARIOS = ("upload", "download", "range_read", "download_zip", "list_files", "logbook_export", "batch_delete", "startup")
+KB = 1024
+MB = 1024 * 1024
+
+
+def _percentile(values, pct):
+    if not values:
+        return None
+    ordered = sorted(values)
+    idx = min(int(round(pct / 100 * (len(ordered) - 1))), len(ordered) - 1)
+    return ordered[idx]
+
+
+def _peak_rss_mb():
+    # ru_maxrss is KiB on Linux and bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(rss / (MB if sys.platform == "darwin" else KB), 1)
+
+
+class Bench:
+    def __init__(self, client, args):
+        self.client = client
+        self.args = args
+        self.results = []
+        self.headers = {}
+        self.user_id = None
+        self._name_seq = 0
+
+    def _unique_name(self, prefix):
+        self._name_seq += 1
+        return f"{prefix}-{self._name_seq}.bin"
+
+    async def setup_user(self):
+        from sqlalchemy import update
+        from app.db import AsyncSessionLocal
+        from app.models.user import User, UserRole
+
+        creds = {"username": "bench", "email": "bench@example.com", "password": "bench-password"}
+        await self.client.post("/api/register", json=creds)
+        async with AsyncSessionLocal() as db:
+            # Admin so the logbook export scenario is allowed
+            await db.execute(update(User).where(User.username == "bench").values(role=UserRole.admin))
+            await db.commit()
+        res = await self.client.post("/api/login", json={"username": creds["username"], "password": creds["password"]})
+        res.raise_for_status()
+        body = res.json()
+        self.headers = {"Authorization": f"Bearer {body['token']}"}
+        self.user_id = body["user"]["id"]
+
+    async def measure(self, scenario, params, ops, bytes_per_op=0, concurrency=None):
+        """
+        Runs the coroutine factories in `ops` with the configured concurrency and records latencies.
+        Failed ops (status >= 400) are counted but left out of throughput and latency; a data point
+        with errors is marked "valid": false and fails the run.
+        """
+        sem = asyncio.Semaphore(concurrency or self.args.concurrency)
+        latencies = []
+        errors = 0
+
+        async def _one(op):
+            nonlocal errors
+            async with sem:
+                start = time.perf_counter()
+                res = await op()
+                if res.status_code >= 400:
+                    errors += 1
+                else:
+                    latencies.append(time.perf_counter() - start)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(_one(op) for op in ops))
+        elapsed = time.perf_counter() - started
+
+        result = {
+            "scenario": scenario,
+            "params": params,
+            "ops": len(latencies) + errors,
+            "errors": errors,
+            "valid": errors == 0,
+            "seconds": round(elapsed, 4),
+            "ops_per_sec": round(len(latencies) / elapsed, 2) if elapsed else None,
+            "mb_per_sec": round(len(latencies) * bytes_per_op / MB / elapsed, 2) if elapsed and bytes_per_op else None,
+            "p50_ms": round(_percentile(latencies, 50) * 1000, 3) if latencies else None,
+            "p99_ms": round(_percentile(latencies, 99) * 1000, 3) if latencies else None,
+            "mean_ms": round(statistics.fmean(latencies) * 1000, 3) if latencies else None,
+            "peak_rss_mb": _peak_rss_mb(),
+        }
+        self.results.append(result)
+        print(f"  {scenario} {params}: {result['ops_per_sec']} ops/s, p50 {result['p50_ms']} ms, p99 {result['p99_ms']} ms", file=sys.stderr)
+        if errors:
+            print(f"  {scenario} {params}: {errors} of {len(ops)} ops failed, data point invalid", file=sys.stderr)
+        return result
+
+    async def upload_one(self, filename, payload):
+        return await self.client.post("/api/upload", headers=self.headers, files={"file": (filename, payload)})
+
+    # --- scenarios ---
+
+    async def scenario_upload(self):
+        rng = random.Random(42)
+        for size in self.args.upload_sizes:
+            for dup_ratio in self.args.dup_ratios:
+                unique = os.urandom(size)
+                ops = []
+                for _ in range(self.args.iterations):
+                    # Duplicates reuse one payload, the rest get fresh random content
+                    payload = unique if rng.random() < dup_ratio else os.urandom(size)
+                    name = self._unique_name("up")
+                    ops.append(lambda name=name, payload=payload: self.upload_one(name, payload))
+                await self.measure("upload", {"size": size, "dup_ratio": dup_ratio}, ops, bytes_per_op=size)
+
+    async def _seed_file(self, size):
+        res = await self.upload_one(self._unique_name("seed"), os.urandom(size))
+        res.raise_for_status()
+        return res.json()["file_id"]
+
+    async def scenario_download(self):
+        for size in self.args.upload_sizes:
+            file_id = await self._seed_file(size)
+            ops = [lambda: self.client.get(f"/api/download/{file_id}", headers=self.headers)] * self.args.iterations
+            await self.measure("download", {"size": size}, ops, bytes_per_op=size)
+
+    async def scenario_range_read(self):
+        size = max(self.args.upload_sizes)
+        chunk = min(64 * KB, size)
+        file_id = await self._seed_file(size)
+        rng = random.Random(7)
+        ops = []
+        for _ in range(self.args.iterations):
+            start = rng.randrange(0, max(size - chunk, 1))
+            headers = {**self.headers, "Range": f"bytes={start}-{start + chunk - 1}"}
+            ops.append(lambda headers=headers: self.client.get(f"/api/download/{file_id}", headers=headers))
+        await self.measure("range_read", {"size": size, "chunk": chunk}, ops, bytes_per_op=chunk)
+
+    async def scenario_download_zip(self):
+        for count in self.args.zip_counts:
+            size = self.args.zip_member_size
+            ids = [await self._seed_file(size) for _ in range(count)]
+            ops = [lambda: self.client.post("/api/files/download-zip", headers=self.headers, json={"file_ids": ids})] * max(self.args.iterations // 10, 1)
+            await self.measure("download_zip", {"files": count, "member_size": size}, ops, bytes_per_op=count * size)
+
+    async def _bulk_insert_files(self, count):
+        # Listing only reads metadata, so rows are inserted directly instead of uploaded
+        from sqlalchemy import insert
+        from app.db import AsyncSessionLocal
+        from app.models.file import File
+
+        now = datetime.utcnow()
+        async with AsyncSessionLocal() as db:
+            for offset in range(0, count, 10_000):
+                rows = [
+                    {
+                        "filename": f"list-{offset + i}.txt",
+                        "filepath": f"user/{self.user_id}/file/0/v1/list-{offset + i}.txt",
+                        "size": 1024,
+                        "uploaded_by": self.user_id,
+                        "uploaded_at": now - timedelta(seconds=offset + i),
+                        "current_version": 1,
+                    }
+                    for i in range(min(10_000, count - offset))
+                ]
+                await db.execute(insert(File), rows)
+                await db.commit()
+
+    async def scenario_list_files(self):
+        seeded = 0
+        for target in sorted(self.args.list_sizes):
+            await self._bulk_insert_files(target - seeded)
+            seeded = target
+            for sort, fmt in (("date_desc", "objects"), ("name_asc", "objects"), ("date_desc", "columnar")):
+                params = {"sort": sort, "format": fmt}
+                ops = [lambda params=params: self.client.get("/api/files", headers=self.headers, params=params)] * self.args.list_iterations
+                await self.measure("list_files", {"files": target, "sort": sort, "format": fmt}, ops)
+
+    async def scenario_logbook_export(self):
+        from sqlalchemy import insert
+        from app.db import AsyncSessionLocal
+        from app.models.log_book import LogBook
+
+        now = datetime.utcnow()
+        async with AsyncSessionLocal() as db:
+            for offset in range(0, self.args.log_rows, 10_000):
+                rows = [
+                    {"user_id": self.user_id, "action": "download", "timestamp": now - timedelta(seconds=offset + i), "details": {"i": offset + i}}
+                    for i in range(min(10_000, self.args.log_rows - offset))
+                ]
+                await db.execute(insert(LogBook), rows)
+                await db.commit()
+        ops = [lambda: self.client.get("/api/logbook/export", headers=self.headers)] * self.args.list_iterations
+        await self.measure("logbook_export", {"rows": self.args.log_rows}, ops)
+
+    async def scenario_batch_delete(self):
+        batch = self.args.delete_batch
+        rounds = max(self.args.iterations // 10, 1)
+        batches = [[await self._seed_file(KB) for _ in range(batch)] for _ in range(rounds)]
+        ops = [lambda ids=ids: self.client.post("/api/delete-multiple", headers=self.headers, json={"file_ids": ids}) for ids in batches]
+        await self.measure("batch_delete", {"batch": batch}, ops)
+
+    async def scenario_startup(self):
+        # A fresh worker process from spawn to "lifespan startup done" against the already migrated
+        # database (DB_SCHEMA_MODE=check, like a production worker); one at a time
+        env = {**os.environ, "DB_SCHEMA_MODE": "check"}
+        backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+        async def _boot():
+            proc = await asyncio.to_thread(
+                subprocess.run, [sys.executable, "-c", STARTUP_PROBE], cwd=backend_dir, env=env, capture_output=True
+            )
+            if proc.returncode != 0:
+                print(proc.stderr.decode(errors="replace")[-2000:], file=sys.stderr)
+            return _Status(200 if proc.returncode == 0 else 500)
+
+        result = await self.measure("startup", {}, [_boot] * self.args.startup_runs, concurrency=1)
+        budget_ms = float(os.environ.get("STARTUP_BUDGET_SECONDS", "0.5")) * 1000
+        if result["p50_ms"] and result["p50_ms"] > budget_ms:
+            print(f"  startup p50 {result['p50_ms']} ms is over the {budget_ms:.0f} ms budget", file=sys.stderr)
+
+
+# Imports the app and runs its lifespan startup + shutdown in a fresh interpreter
+STARTUP_PROBE = """
+import asyncio
+from app.main import app
+async def main():
+    async with app.router.lifespan_context(app):
+        pass
+asyncio.run(main())
+"""
+
+
+class _Status:
+    def __init__(self, status_code):
+        self.status_code = status_code
+
+
+def compare(results, baseline, max_regression):
+    """Returns a list of human-readable regressions against a previous report."""
+    previous = {(r["scenario"], json.dumps(r["params"], sort_keys=True)): r for r in baseline["results"]}
+    regressions = []
+    for r in results:
+        old = previous.get((r["scenario"], json.dumps(r["params"], sort_keys=True)))
+        if not old or not old.get("valid", True):
+            continue
+        if not r.get("valid", True):
+            regressions.append(f"{r['scenario']} {r['params']}: {r['errors']} failed ops")
+            continue
+        if old.get("p99_ms") and r.get("p99_ms") and r["p99_ms"] > old["p99_ms"] * (1 + max_regression):
+            regressions.append(f"{r['scenario']} {r['params']}: p99 {old['p99_ms']} -> {r['p99_ms']} ms")
+        if old.get("ops_per_sec") and r.get("ops_per_sec") and r["ops_per_sec"] < old["ops_per_sec"] * (1 - max_regression):
+            regressions.append(f"{r['scenario']} {r['params']}: throughput {old['ops_per_sec']} -> {r['ops_per_sec']} ops/s")
+    return regressions
+
+
+def _int_list(value):
+    return [int(v) for v in value.split(",") if v]
+
+
+def _float_list(value):
+    return [float(v) for v in value.split(",") if v]
+
+
+def parse_args(argv=None):
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument("-s", "--scenarios", default=",".join(SCENARIOS), help="comma separated subset of: " + ", ".join(SCENARIOS))
+    p.add_argument("--database-url", default=None, help="async SQLAlchemy URL (default: temp SQLite file)")
+    p.add_argument("-n", "--iterations", type=int, default=50, help="operations per upload/download data point")
+    p.add_argument("-c", "--concurrency", type=int, default=8)
+    p.add_argument("--upload-sizes", type=_int_list, default=[4 * KB, 256 * KB, 4 * MB])
+    p.add_argument("--dup-ratios", type=_float_list, default=[0.0, 0.5, 0.9])
+    p.add_argument("--zip-counts", type=_int_list, default=[10, 100])
+    p.add_argument("--zip-member-size", type=int, default=64 * KB)
+    p.add_argument("--list-sizes", type=_int_list, default=[1000, 10000], help="e.g. 1000,100000,1000000")
+    p.add_argument("--list-iterations", type=int, default=10)
+    p.add_argument("--log-rows", type=int, default=50000)
+    p.add_argument("--delete-batch", type=int, default=50)
+    p.add_argument("--startup-runs", type=int, default=10, help="fresh processes booted by the startup scenario")
+    p.add_argument("-o", "--output", help="write the JSON report here instead of stdout")
+    p.add_argument("--baseline", help="previous JSON report to compare against")
+    p.add_argument("--max-regression", type=float, default=0.2, help="allowed relative p99/throughput regression")
+    p.add_argument("--keep", action="store_true", help="keep the temporary storage root and database")
+    return p.parse_args(argv)
+
+
+async def run(args):
+    import httpx
+    from app.main import app
+
+    results = []
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            bench = Bench(client, args)
+            await bench.setup_user()
+            for name in args.scenarios.split(","):
+                name = name.strip()
+                if name not in SCENARIOS:
+                    raise SystemExit(f"Unknown scenario: {name}")
+                print(f"[{name}]", file=sys.stderr)
+                await getattr(bench, f"scenario_{name}")()
+            results = bench.results
+    return results
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    workdir = tempfile.mkdtemp(prefix="cloud-bench-")
+    # Must be set before app modules are imported: config reads them at import time
+    os.environ["STORAGE_ROOT"] = os.path.join(workdir, "storage")
+    os.environ["DATABASE_URL"] = args.database_url or f"sqlite+aiosqlite:///{os.path.join(workdir, 'bench.db')}"
+    os.environ.setdefault("RETENTION_PRUNE_INTERVAL_SECONDS", "86400")
+    # The temporary database starts empty: migrate it in-process
+    os.environ["DB_SCHEMA_MODE"] = "migrate"
+    # Rate limits and per-user slots would turn the load into 429s: measure the endpoints, not admission
+    os.environ["ADMISSION_ENABLED"] = "0"
+
+    try:
+        results = asyncio.run(run(args))
+    finally:
+        if not args.keep:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        "generated_at": datetime.utcnow().isoformat() + "Z",
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "database": "custom" if args.database_url else "sqlite",
+        "concurrency": args.concurrency,
+        "results": results,
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+    failed = False
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.max_regression)
+        for line in regressions:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        failed = bool(regressions)
+    invalid = [r for r in results if not r["valid"]]
+    for r in invalid:
+        print(f"ERRORS {r['scenario']} {r['params']}: {r['errors']} failed ops", file=sys.stderr)
+    if failed or invalid:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
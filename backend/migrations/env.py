@@ -0,0 +1,50 @@
+import asyncio
+from logging.config import fileConfig
+
+from sqlalchemy import pool
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from alembic import context
+
+from app.db import _import_models
+from app.models.base import Base
+from app.utils.config import DATABASE_URL
+
+config = context.config
+
+# Called from the CLI (alembic upgrade head): configure logging from alembic.ini.
+# Called from app.db.run_migrations: the app's connection is passed in and logging is left alone.
+if config.config_file_name is not None and "connection" not in config.attributes:
+    fileConfig(config.config_file_name)
+
+_import_models()
+target_metadata = Base.metadata
+
+def _configure(**kwargs) -> None:
+    # render_as_batch: SQLite can't ALTER most things, Alembic recreates the table instead
+    context.configure(target_metadata=target_metadata, render_as_batch=True, compare_type=True, **kwargs)
+
+def run_migrations_offline() -> None:
+    # alembic upgrade head --sql: print the DDL instead of running it
+    _configure(url=DATABASE_URL, literal_binds=True, dialect_opts={"paramstyle": "named"})
+    with context.begin_transaction():
+        context.run_migrations()
+
+def do_run_migrations(connection: Connection) -> None:
+    _configure(connection=connection)
+    with context.begin_transaction():
+        context.run_migrations()
+
+async def run_async_migrations() -> None:
+    engine = create_async_engine(DATABASE_URL, poolclass=pool.NullPool)
+    async with engine.connect() as connection:
+        await connection.run_sync(do_run_migrations)
+    await engine.dispose()
+
+if context.is_offline_mode():
+    run_migrations_offline()
+elif "connection" in config.attributes:
+    do_run_migrations(config.attributes["connection"])
+else:
+    asyncio.run(run_async_migrations())
@@ -0,0 +1,286 @@
+"""baseline schema
+
+Everything up to folders, blob checks, upload sessions (the ZIP bundle cache lives on disk only).
+
+Revision ID: 0001
+Revises: 
+Create Date: 2026-10-19 06:24:24.904209
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '0001'
+down_revision: Union[str, Sequence[str], None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Databases created by the old create_all() bootstrap are adopted: only what is missing is created
+    inspector = sa.inspect(op.get_bind())
+    existing = set(inspector.get_table_names())
+
+    if 'blobs' not in existing:
+        op.create_table('blobs',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('checksum', sa.String(length=64), nullable=False),
+        sa.Column('filepath', sa.String(length=1024), nullable=False),
+        sa.Column('size', sa.BigInteger(), nullable=True),
+        sa.Column('ref_count', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('filepath')
+        )
+        with op.batch_alter_table('blobs', schema=None) as batch_op:
+            batch_op.create_index(batch_op.f('ix_blobs_checksum'), ['checksum'], unique=False)
+            batch_op.create_index(batch_op.f('ix_blobs_id'), ['id'], unique=False)
+
+    if 'users' not in existing:
+        op.create_table('users',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('username', sa.String(length=50), nullable=False),
+        sa.Column('email', sa.String(length=255), nullable=False),
+        sa.Column('hashed_password', sa.String(length=255), nullable=False),
+        sa.Column('role', sa.Enum('admin', 'user', name='userrole'), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('email'),
+        sa.UniqueConstraint('username')
+        )
+
+    if 'blob_checks' not in existing:
+        op.create_table('blob_checks',
+        sa.Column('blob_id', sa.Integer(), nullable=False),
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('verified_at', sa.DateTime(), nullable=False),
+        sa.Column('detail', sa.Text(), nullable=True),
+        sa.Column('quarantine_path', sa.String(length=1024), nullable=True),
+        sa.ForeignKeyConstraint(['blob_id'], ['blobs.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('blob_id')
+        )
+        with op.batch_alter_table('blob_checks', schema=None) as batch_op:
+            batch_op.create_index(batch_op.f('ix_blob_checks_status'), ['status'], unique=False)
+            batch_op.create_index(batch_op.f('ix_blob_checks_verified_at'), ['verified_at'], unique=False)
+
+    if 'folders' not in existing:
+        op.create_table('folders',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('owner_id', sa.Integer(), nullable=False),
+        sa.Column('parent_id', sa.Integer(), nullable=True),
+        sa.Column('name', sa.String(length=255), nullable=False),
+        sa.Column('path', sa.String(length=2048), nullable=False),
+        sa.Column('total_size', sa.BigInteger(), nullable=False),
+        sa.Column('file_count', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['owner_id'], ['users.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['parent_id'], ['folders.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('owner_id', 'parent_id', 'name', name='uq_folders_owner_parent_name')
+        )
+        with op.batch_alter_table('folders', schema=None) as batch_op:
+            batch_op.create_index('idx_folders_owner_path', ['owner_id', 'path'], unique=False)
+            batch_op.create_index('idx_folders_parent_name', ['parent_id', 'name', 'id'], unique=False)
+            batch_op.create_index(batch_op.f('ix_folders_id'), ['id'], unique=False)
+            batch_op.create_index(batch_op.f('ix_folders_owner_id'), ['owner_id'], unique=False)
+
+    if 'jobs' not in existing:
+        op.create_table('jobs',
+        sa.Column('id', sa.String(length=36), nullable=False),
+        sa.Column('type', sa.String(length=50), nullable=False),
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('priority', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=True),
+        sa.Column('params', sa.JSON(), nullable=True),
+        sa.Column('progress', sa.Float(), nullable=False),
+        sa.Column('progress_message', sa.String(length=255), nullable=True),
+        sa.Column('result', sa.JSON(), nullable=True),
+        sa.Column('result_path', sa.String(length=1024), nullable=True),
+        sa.Column('result_filename', sa.String(length=255), nullable=True),
+        sa.Column('error', sa.Text(), nullable=True),
+        sa.Column('cancel_requested', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('started_at', sa.DateTime(), nullable=True),
+        sa.Column('heartbeat_at', sa.DateTime(), nullable=True),
+        sa.Column('finished_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id')
+        )
+        with op.batch_alter_table('jobs', schema=None) as batch_op:
+            batch_op.create_index('idx_jobs_status_priority', ['status', 'priority', 'created_at'], unique=False)
+            batch_op.create_index(batch_op.f('ix_jobs_user_id'), ['user_id'], unique=False)
+
+    if 'version_retention_policies' not in existing:
+        op.create_table('version_retention_policies',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('keep_last', sa.Integer(), nullable=True),
+        sa.Column('keep_daily_days', sa.Integer(), nullable=True),
+        sa.Column('keep_monthly_months', sa.Integer(), nullable=True),
+        sa.Column('max_history_bytes', sa.BigInteger(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('user_id')
+        )
+
+    if 'files' not in existing:
+        op.create_table('files',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('filename', sa.String(length=255), nullable=False),
+        sa.Column('filepath', sa.String(length=1024), nullable=False),
+        sa.Column('size', sa.Integer(), nullable=True),
+        sa.Column('uploaded_by', sa.Integer(), nullable=True),
+        sa.Column('uploaded_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=False),
+        sa.Column('current_version', sa.Integer(), nullable=True),
+        sa.Column('folder_id', sa.Integer(), nullable=True),
+        sa.Column('share_link_id', sa.String(length=36), nullable=True),
+        sa.ForeignKeyConstraint(['folder_id'], ['folders.id'], ondelete='SET NULL'),
+        sa.ForeignKeyConstraint(['uploaded_by'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('id')
+        )
+        with op.batch_alter_table('files', schema=None) as batch_op:
+            batch_op.create_index('ix_files_folder_filename', ['folder_id', 'filename', 'id'], unique=False)
+            batch_op.create_index(batch_op.f('ix_files_share_link_id'), ['share_link_id'], unique=True)
+            batch_op.create_index('ix_files_uploaded_at_desc', [sa.literal_column('uploaded_at DESC')], unique=False)
+
+    if 'upload_sessions' not in existing:
+        op.create_table('upload_sessions',
+        sa.Column('id', sa.String(length=36), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('filename', sa.String(length=255), nullable=False),
+        sa.Column('checksum', sa.String(length=64), nullable=False),
+        sa.Column('size', sa.BigInteger(), nullable=False),
+        sa.Column('notes', sa.Text(), nullable=True),
+        sa.Column('folder_id', sa.Integer(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('expires_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['folder_id'], ['folders.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id')
+        )
+        with op.batch_alter_table('upload_sessions', schema=None) as batch_op:
+            batch_op.create_index(batch_op.f('ix_upload_sessions_expires_at'), ['expires_at'], unique=False)
+            batch_op.create_index(batch_op.f('ix_upload_sessions_user_id'), ['user_id'], unique=False)
+
+    if 'file_versions' not in existing:
+        op.create_table('file_versions',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('file_id', sa.Integer(), nullable=False),
+        sa.Column('version_number', sa.Integer(), nullable=False),
+        sa.Column('filepath', sa.String(length=255), nullable=False),
+        sa.Column('size', sa.Integer(), nullable=True),
+        sa.Column('uploaded_at', sa.DateTime(), nullable=False),
+        sa.Column('notes', sa.Text(), nullable=True),
+        sa.Column('checksum', sa.String(length=64), nullable=True),
+        sa.ForeignKeyConstraint(['file_id'], ['files.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id')
+        )
+        with op.batch_alter_table('file_versions', schema=None) as batch_op:
+            batch_op.create_index('idx_file_version', ['file_id', 'version_number'], unique=False)
+            batch_op.create_index(batch_op.f('ix_file_versions_checksum'), ['checksum'], unique=False)
+            batch_op.create_index(batch_op.f('ix_file_versions_file_id'), ['file_id'], unique=False)
+            batch_op.create_index(batch_op.f('ix_file_versions_id'), ['id'], unique=False)
+
+    if 'log_book' not in existing:
+        op.create_table('log_book',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=True),
+        sa.Column('action', sa.String(), nullable=False),
+        sa.Column('file_id', sa.Integer(), nullable=True),
+        sa.Column('timestamp', sa.DateTime(), nullable=False),
+        sa.Column('ip_address', sa.String(), nullable=True),
+        sa.Column('details', sa.JSON(), nullable=True),
+        sa.CheckConstraint("action in ('login','logout','upload','download','delete','rollback','download_share','share_create')", name='ck_log_book_action'),
+        sa.ForeignKeyConstraint(['file_id'], ['files.id'], ondelete='SET NULL'),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='SET NULL'),
+        sa.PrimaryKeyConstraint('id')
+        )
+        with op.batch_alter_table('log_book', schema=None) as batch_op:
+            batch_op.create_index('idx_log_timestamp', ['timestamp'], unique=False)
+            batch_op.create_index(batch_op.f('ix_log_book_file_id'), ['file_id'], unique=False)
+            batch_op.create_index(batch_op.f('ix_log_book_id'), ['id'], unique=False)
+            batch_op.create_index(batch_op.f('ix_log_book_user_id'), ['user_id'], unique=False)
+
+    if 'share_links' not in existing:
+        op.create_table('share_links',
+        sa.Column('id', sa.String(length=36), nullable=False),
+        sa.Column('file_id', sa.Integer(), nullable=False),
+        sa.Column('created_by', sa.Integer(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('expires_at', sa.DateTime(), nullable=True),
+        sa.Column('max_downloads', sa.Integer(), nullable=True),
+        sa.Column('download_count', sa.Integer(), nullable=False),
+        sa.Column('version_number', sa.Integer(), nullable=True),
+        sa.ForeignKeyConstraint(['created_by'], ['users.id'], ondelete='SET NULL'),
+        sa.ForeignKeyConstraint(['file_id'], ['files.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id')
+        )
+        with op.batch_alter_table('share_links', schema=None) as batch_op:
+            batch_op.create_index('idx_share_links_file_version', ['file_id', 'version_number'], unique=False)
+            batch_op.create_index(batch_op.f('ix_share_links_file_id'), ['file_id'], unique=False)
+
+    if 'files' in existing and 'folder_id' not in {c['name'] for c in inspector.get_columns('files')}:
+        with op.batch_alter_table('files', schema=None) as batch_op:
+            batch_op.add_column(sa.Column('folder_id', sa.Integer(), nullable=True))
+            batch_op.create_foreign_key('fk_files_folder_id', 'folders', ['folder_id'], ['id'], ondelete='SET NULL')
+            batch_op.create_index('ix_files_folder_filename', ['folder_id', 'filename', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('share_links', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_share_links_file_id'))
+        batch_op.drop_index('idx_share_links_file_version')
+
+    op.drop_table('share_links')
+    with op.batch_alter_table('log_book', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_log_book_user_id'))
+        batch_op.drop_index(batch_op.f('ix_log_book_id'))
+        batch_op.drop_index(batch_op.f('ix_log_book_file_id'))
+        batch_op.drop_index('idx_log_timestamp')
+
+    op.drop_table('log_book')
+    with op.batch_alter_table('file_versions', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_file_versions_id'))
+        batch_op.drop_index(batch_op.f('ix_file_versions_file_id'))
+        batch_op.drop_index(batch_op.f('ix_file_versions_checksum'))
+        batch_op.drop_index('idx_file_version')
+
+    op.drop_table('file_versions')
+    with op.batch_alter_table('upload_sessions', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_upload_sessions_user_id'))
+        batch_op.drop_index(batch_op.f('ix_upload_sessions_expires_at'))
+
+    op.drop_table('upload_sessions')
+    with op.batch_alter_table('files', schema=None) as batch_op:
+        batch_op.drop_index('ix_files_uploaded_at_desc')
+        batch_op.drop_index(batch_op.f('ix_files_share_link_id'))
+        batch_op.drop_index('ix_files_folder_filename')
+
+    op.drop_table('files')
+    op.drop_table('version_retention_policies')
+    with op.batch_alter_table('jobs', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_jobs_user_id'))
+        batch_op.drop_index('idx_jobs_status_priority')
+
+    op.drop_table('jobs')
+    with op.batch_alter_table('folders', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_folders_owner_id'))
+        batch_op.drop_index(batch_op.f('ix_folders_id'))
+        batch_op.drop_index('idx_folders_parent_name')
+        batch_op.drop_index('idx_folders_owner_path')
+
+    op.drop_table('folders')
+    with op.batch_alter_table('blob_checks', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_blob_checks_verified_at'))
+        batch_op.drop_index(batch_op.f('ix_blob_checks_status'))
+
+    op.drop_table('blob_checks')
+    op.drop_table('users')
+    with op.batch_alter_table('blobs', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_blobs_id'))
+        batch_op.drop_index(batch_op.f('ix_blobs_checksum'))
+
+    op.drop_table('blobs')
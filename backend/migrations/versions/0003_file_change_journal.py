@@ -0,0 +1,50 @@
+"""file_changes journal (GET /api/changes) and users.change_floor
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-19 06:39:25.136395
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0003'
+down_revision: Union[str, Sequence[str], None] = '0002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('file_changes',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('file_id', sa.Integer(), nullable=False),
+    sa.Column('op', sa.String(length=10), nullable=False),
+    sa.Column('changed_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sqlite_autoincrement=True,
+    )
+    with op.batch_alter_table('file_changes', schema=None) as batch_op:
+        batch_op.create_index('idx_file_changes_user_file', ['user_id', 'file_id'], unique=False)
+        batch_op.create_index('idx_file_changes_user_id', ['user_id', 'id'], unique=False)
+
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('change_floor', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.drop_column('change_floor')
+
+    with op.batch_alter_table('file_changes', schema=None) as batch_op:
+        batch_op.drop_index('idx_file_changes_user_id')
+        batch_op.drop_index('idx_file_changes_user_file')
+
+    op.drop_table('file_changes')
\ No newline at end of file
@@ -0,0 +1,96 @@
+"""groups, file_grants and the materialized file_access index
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-19 06:42:20.429447
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0004'
+down_revision: Union[str, Sequence[str], None] = '0003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('groups',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=100), nullable=False),
+    sa.Column('owner_id', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['owner_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('name')
+    )
+    with op.batch_alter_table('groups', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_groups_owner_id'), ['owner_id'], unique=False)
+
+    op.create_table('group_members',
+    sa.Column('group_id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['group_id'], ['groups.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('group_id', 'user_id')
+    )
+    with op.batch_alter_table('group_members', schema=None) as batch_op:
+        batch_op.create_index('idx_group_members_user', ['user_id', 'group_id'], unique=False)
+
+    op.create_table('file_access',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('file_id', sa.Integer(), nullable=False),
+    sa.Column('level', sa.SmallInteger(), nullable=False),
+    sa.ForeignKeyConstraint(['file_id'], ['files.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('user_id', 'file_id')
+    )
+    with op.batch_alter_table('file_access', schema=None) as batch_op:
+        batch_op.create_index('idx_file_access_file', ['file_id'], unique=False)
+
+    op.create_table('file_grants',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('file_id', sa.Integer(), nullable=False),
+    sa.Column('grantee_user_id', sa.Integer(), nullable=True),
+    sa.Column('grantee_group_id', sa.Integer(), nullable=True),
+    sa.Column('level', sa.SmallInteger(), nullable=False),
+    sa.Column('created_by', sa.Integer(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.CheckConstraint('(grantee_user_id IS NULL) <> (grantee_group_id IS NULL)', name='ck_file_grants_one_grantee'),
+    sa.ForeignKeyConstraint(['created_by'], ['users.id'], ondelete='SET NULL'),
+    sa.ForeignKeyConstraint(['file_id'], ['files.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['grantee_group_id'], ['groups.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['grantee_user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('file_id', 'grantee_group_id', name='uq_file_grants_file_group'),
+    sa.UniqueConstraint('file_id', 'grantee_user_id', name='uq_file_grants_file_user')
+    )
+    with op.batch_alter_table('file_grants', schema=None) as batch_op:
+        batch_op.create_index('idx_file_grants_group', ['grantee_group_id'], unique=False)
+        batch_op.create_index('idx_file_grants_user', ['grantee_user_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('file_grants', schema=None) as batch_op:
+        batch_op.drop_index('idx_file_grants_user')
+        batch_op.drop_index('idx_file_grants_group')
+
+    op.drop_table('file_grants')
+    with op.batch_alter_table('file_access', schema=None) as batch_op:
+        batch_op.drop_index('idx_file_access_file')
+
+    op.drop_table('file_access')
+    with op.batch_alter_table('group_members', schema=None) as batch_op:
+        batch_op.drop_index('idx_group_members_user')
+
+    op.drop_table('group_members')
+    with op.batch_alter_table('groups', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_groups_owner_id'))
+
+    op.drop_table('groups')
\ No newline at end of file
@@ -0,0 +1,40 @@
+"""blob placement (hot/cold tier, compression) and access statistics
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-19 06:47:47.357105
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0005'
+down_revision: Union[str, Sequence[str], None] = '0004'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.batch_alter_table('blobs', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('tier', sa.String(length=8), server_default='hot', nullable=False))
+        batch_op.add_column(sa.Column('compressed', sa.Boolean(), server_default='0', nullable=False))
+        batch_op.add_column(sa.Column('access_count', sa.BigInteger(), server_default='0', nullable=False))
+        batch_op.add_column(sa.Column('last_accessed_at', sa.DateTime(), nullable=True))
+        batch_op.create_index('ix_blobs_tier_last_accessed', ['tier', 'last_accessed_at'], unique=False)
+    # Existing blobs: last read = stored (the tiering sweep compares it with TIER_COLD_AFTER_DAYS)
+    op.execute("UPDATE blobs SET last_accessed_at = created_at WHERE last_accessed_at IS NULL")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('blobs', schema=None) as batch_op:
+        batch_op.drop_index('ix_blobs_tier_last_accessed')
+        batch_op.drop_column('last_accessed_at')
+        batch_op.drop_column('access_count')
+        batch_op.drop_column('compressed')
+        batch_op.drop_column('tier')
@@ -0,0 +1,36 @@
+"""files.deleted_at (trash); listing index restricted to live files
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-19 06:53:16.950315
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0006'
+down_revision: Union[str, Sequence[str], None] = '0005'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.batch_alter_table('files', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('deleted_at', sa.DateTime(), nullable=True))
+        batch_op.drop_index('ix_files_folder_filename')
+        batch_op.create_index('ix_files_folder_filename', ['folder_id', 'filename', 'id'], unique=False, sqlite_where=sa.text('deleted_at IS NULL'), postgresql_where=sa.text('deleted_at IS NULL'))
+        batch_op.create_index('ix_files_trash', ['deleted_at', 'id'], unique=False, sqlite_where=sa.text('deleted_at IS NOT NULL'), postgresql_where=sa.text('deleted_at IS NOT NULL'))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('files', schema=None) as batch_op:
+        batch_op.drop_index('ix_files_trash', sqlite_where=sa.text('deleted_at IS NOT NULL'), postgresql_where=sa.text('deleted_at IS NOT NULL'))
+        batch_op.drop_index('ix_files_folder_filename')
+        batch_op.drop_column('deleted_at')
+        batch_op.create_index('ix_files_folder_filename', ['folder_id', 'filename', 'id'], unique=False)
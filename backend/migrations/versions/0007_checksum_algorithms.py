@@ -0,0 +1,46 @@
+"""checksum_algo on blobs, file_versions and upload_sessions; blobs.chunk_digests (tree hashes)
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-19 07:06:53.926408
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0007'
+down_revision: Union[str, Sequence[str], None] = '0006'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.batch_alter_table('blobs', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('checksum_algo', sa.String(length=16), server_default='sha256', nullable=False))
+        batch_op.add_column(sa.Column('chunk_digests', sa.LargeBinary(), nullable=True))
+
+    with op.batch_alter_table('file_versions', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('checksum_algo', sa.String(length=16), server_default='sha256', nullable=False))
+
+    with op.batch_alter_table('upload_sessions', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('checksum_algo', sa.String(length=16), server_default='sha256', nullable=False))
+
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('upload_sessions', schema=None) as batch_op:
+        batch_op.drop_column('checksum_algo')
+
+    with op.batch_alter_table('file_versions', schema=None) as batch_op:
+        batch_op.drop_column('checksum_algo')
+
+    with op.batch_alter_table('blobs', schema=None) as batch_op:
+        batch_op.drop_column('chunk_digests')
+        batch_op.drop_column('checksum_algo')
+
@@ -0,0 +1,43 @@
+"""users.file_count / used_bytes (usage, backfilled) and users.deleted_at (account purge)
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-19 07:14:25.611335
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0008'
+down_revision: Union[str, Sequence[str], None] = '0007'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('file_count', sa.Integer(), server_default='0', nullable=False))
+        batch_op.add_column(sa.Column('used_bytes', sa.BigInteger(), server_default='0', nullable=False))
+        batch_op.add_column(sa.Column('deleted_at', sa.DateTime(), nullable=True))
+        batch_op.create_index('idx_users_file_count', ['file_count', 'id'], unique=False)
+        batch_op.create_index('idx_users_used_bytes', ['used_bytes', 'id'], unique=False)
+    op.execute(
+        "UPDATE users SET "
+        "file_count = (SELECT COUNT(*) FROM files WHERE files.uploaded_by = users.id AND files.deleted_at IS NULL), "
+        "used_bytes = (SELECT COALESCE(SUM(files.size), 0) FROM files WHERE files.uploaded_by = users.id AND files.deleted_at IS NULL)"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.drop_index('idx_users_used_bytes')
+        batch_op.drop_index('idx_users_file_count')
+        batch_op.drop_column('deleted_at')
+        batch_op.drop_column('used_bytes')
+        batch_op.drop_column('file_count')
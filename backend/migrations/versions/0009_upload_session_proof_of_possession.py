@@ -0,0 +1,32 @@
+"""upload_sessions.proof_nonce / proof_ranges (proof of possession for preflight dedup)
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-19 07:24:24.423847
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0009'
+down_revision: Union[str, Sequence[str], None] = '0008'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.batch_alter_table('upload_sessions', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('proof_nonce', sa.String(length=32), nullable=True))
+        batch_op.add_column(sa.Column('proof_ranges', sa.JSON(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('upload_sessions', schema=None) as batch_op:
+        batch_op.drop_column('proof_ranges')
+        batch_op.drop_column('proof_nonce')
@@ -127,8 +127,15 @@ const fileService = {
 export const adminService = {
   getAllUsers: async () => {
     try {
-      const response = await api.get('/admin/users');
-      return response.data;
+      // The listing is paginated: follow next_cursor until the last page
+      const users = [];
+      let cursor = null;
+      do {
+        const response = await api.get('/admin/users', { params: { limit: 1000, cursor } });
+        users.push(...response.data.items);
+        cursor = response.data.next_cursor;
+      } while (cursor);
+      return users;
     } catch (error) {
       throw error.response?.data || error;
     }